@@ -2,15 +2,144 @@ import configs_warning
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from threading import Thread
-from data_fetcher import fetch_economic_events
-from data_storer import store_events, get_events
+from data_fetcher import cache_stats
+from refresh_scheduler import RefreshScheduler, DEFAULT_INTERVAL, DEFAULT_FAST_INTERVAL
+from ingest_worker import create_lease_table, get_lease
+from query_cache import (cached_query_events, cached_count_events, cached_query_rollups, cached_date_bounds, cached_distinct_values,
+                         data_fingerprint)
+from storage_backends import shared_backend
 from email_sender import send_email
-from chart_worker import plot_events_by_currency_and_volatility, plot_events_by_time_and_currency
+from chart_worker import plot_events_by_currency_and_volatility, plot_events_by_time_and_currency, LOD_ROW_THRESHOLD
 from st_aggrid import AgGrid, GridOptionsBuilder
+import io
 import os
+import math
 import platform
 
+# Rows per grid page and the columns the grid can be sorted by
+PAGE_SIZES = [25, 50, 100, 250]
+SORT_COLUMNS = {"Date and Time": "Timestamp", "Currency": "Currency", "Volatility": "Volatility", "Event": "Event"}
+
+# Function to get the process-wide background refresh scheduler
+@st.cache_resource
+def get_refresh_scheduler():
+    """
+    Creates and starts the refresh scheduler once per process, shared by every session.
+
+    When EXTERNAL_INGEST is set, a separate ingest worker fetches and stores
+    the events and this instance only reads the database.
+
+    Returns:
+        RefreshScheduler: The running scheduler, or None when ingestion is external.
+    """
+    if os.environ.get("EXTERNAL_INGEST"):
+        # Make sure the lease can be read before the first worker starts
+        create_lease_table()
+        return None
+    scheduler = RefreshScheduler(
+        interval=int(os.environ.get("REFRESH_INTERVAL", DEFAULT_INTERVAL)),
+        fast_interval=int(os.environ.get("REFRESH_FAST_INTERVAL", DEFAULT_FAST_INTERVAL)),
+    )
+    return scheduler.start()
+
+# Function to display the background refresh status
+def refresh_status(scheduler):
+    """
+    Displays the last background refresh time, duration and status in the sidebar.
+
+    Args:
+        scheduler (RefreshScheduler): The scheduler to report on, or None when ingestion is external.
+    """
+    st.sidebar.markdown("### Data Refresh")
+    if scheduler is None:
+        lease = get_lease()
+        if lease is None:
+            st.sidebar.caption("Ingest worker: not running")
+        else:
+            st.sidebar.caption(f"Ingest worker: {lease['holder']}")
+        return
+    status = scheduler.status()
+    if status['last_run'] is None:
+        st.sidebar.caption(f"Status: {status['status']}")
+        return
+    st.sidebar.caption(f"Last run: {status['last_run']:%Y-%m-%d %H:%M:%S} ({status['duration']:.1f}s)")
+    st.sidebar.caption(f"Status: {status['status']}")
+    if status['error']:
+        st.sidebar.caption(f"Error: {status['error']}")
+    if status['next_run'] is not None:
+        st.sidebar.caption(f"Next run: {status['next_run']:%H:%M:%S}")
+
+# Function to display one page of events in the data table
+def paged_events_grid(key, **filters):
+    """
+    Displays the events matching the filters one page at a time.
+
+    The page, page size and sort order are chosen with Streamlit controls and
+    answered with a LIMIT/OFFSET query, so only the rows of the current page
+    are loaded and sent to the browser.
+
+    Args:
+        key (str): Prefix for the widget keys, unique per section.
+        **filters: Filters forwarded to query_events and count_events.
+    """
+    try:
+        total = cached_count_events(**filters)
+    except ValueError as e:
+        st.warning(f"The search could not be run: {e}")
+        return
+    if total == 0:
+        st.info("No events match the selected filters.")
+        return
+
+    size_col, page_col, sort_col, order_col = st.columns(4)
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    page_count = math.ceil(total / page_size)
+    # Keep the selected page in range when the filters or the page size shrink the result
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = page_col.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key=page_key)
+    sort_label = sort_col.selectbox("Sort by", list(SORT_COLUMNS), key=f"{key}_sort")
+    descending = order_col.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Descending"
+
+    offset = (page - 1) * page_size
+    page_df = cached_query_events(**filters, order_by=SORT_COLUMNS[sort_label], descending=descending,
+                                  limit=page_size, offset=offset)
+    st.caption(f"Showing events {offset + 1}-{offset + len(page_df)} of {total}")
+
+    gb = GridOptionsBuilder.from_dataframe(page_df)
+    gb.configure_side_bar()
+    gb.configure_default_column(groupable=True, value=True, enableRowGroup=True, aggFunc="sum", editable=True)
+    gridOptions = gb.build()
+
+    # Display the data table
+    AgGrid(page_df, gridOptions=gridOptions, enable_enterprise_modules=True, height=600, theme='streamlit')
+
+# Function to offer an export of every stored event
+def export_button(label, fmt, file_name, mime):
+    """
+    Displays a button that builds an export of every stored event, then the button to download it.
+
+    The export is only built when it is asked for and is not kept in the query
+    cache, so reruns of the page neither rebuild it nor hold it in memory.
+
+    Args:
+        label (str): The name of the format shown on the buttons.
+        fmt (str): The export format passed to the storage backend's export_events.
+        file_name (str): The name of the downloaded file.
+        mime (str): The MIME type of the downloaded file.
+    """
+    if not st.button(f"Prepare {label}", key=f"export_{fmt}"):
+        return
+    buffer = io.BytesIO()
+    try:
+        with st.spinner(f"Exporting events to {label}..."):
+            shared_backend().export_events(buffer, fmt)
+    except (ImportError, RuntimeError) as e:
+        st.error(f"The export failed: {e}")
+        return
+    st.download_button(f"Download {label}", data=buffer.getvalue(), file_name=file_name, mime=mime, key=f"download_{fmt}")
+
 # Function to configure the sidebar menu
 def sidebar_menu():
     """
@@ -34,37 +163,35 @@ def home():
     st.title("Economic Events Dashboard")
     st.markdown("### Today's Economic Events")
 
-    # Fetch events from the database
-    df = get_events()
-    today_str = datetime.now().strftime('%m/%d/%y')
-    if not df.empty:
-        events_today = df[df['Date'] == today_str]
+    # Find today's filter options in the database
+    today = datetime.now().date()
+    first_date, _ = cached_date_bounds()
+    if first_date is not None:
+        # Today's events are a small range, so they are read with indexed queries rather than the full-history filter index
+        currency_options = cached_distinct_values("Currency", today, today)
 
-        if not events_today.empty:
+        if currency_options:
             # Display filter options
             with st.expander("Filter Options", expanded=True):
                 # Filter options for today's events
-                currencies = st.multiselect("Select Currencies", options=events_today["Currency"].unique(), default=events_today["Currency"].unique())
-                volatilities = st.multiselect("Select Volatility Levels", options=events_today["Volatility"].unique(), default=events_today["Volatility"].unique())
+                volatility_options = cached_distinct_values("Volatility", today, today)
+                currencies = st.multiselect("Select Currencies", options=currency_options, default=currency_options)
+                volatilities = st.multiselect("Select Volatility Levels", options=volatility_options, default=volatility_options)
 
-                # Apply filters to the data
-                filtered_df = events_today[(events_today["Currency"].isin(currencies)) & (events_today["Volatility"].isin(volatilities))]
+                # Load today's events matching the filters for the charts
+                filtered_df = cached_query_events(currencies=currencies, volatilities=volatilities, start_date=today, end_date=today)
 
             st.write("### Filtered Economic Events Data")
-            # Display the filtered data in a table
-            gb = GridOptionsBuilder.from_dataframe(filtered_df)
-            gb.configure_pagination(paginationAutoPageSize=True)
-            gb.configure_side_bar()
-            gb.configure_default_column(groupable=True, value=True, enableRowGroup=True, aggFunc="sum", editable=True)
-            gridOptions = gb.build()
-
-            # Display the data table
-            AgGrid(filtered_df, gridOptions=gridOptions, enable_enterprise_modules=True, height=600, theme='streamlit')
+            # Display one page of the filtered data in a table
+            paged_events_grid("home", currencies=currencies, volatilities=volatilities, start_date=today, end_date=today)
             
             # Create interactive plots
             st.markdown("### Interactive Charts")
-            plot_events_by_currency_and_volatility(filtered_df)
-            plot_events_by_time_and_currency(filtered_df)
+            # Reruns with unchanged data and filters reuse the cached figures
+            chart_key = data_fingerprint(currencies=currencies, volatilities=volatilities, start_date=today, end_date=today)
+            counts = cached_query_rollups(currencies=currencies, volatilities=volatilities, start_date=today, end_date=today)
+            plot_events_by_currency_and_volatility(filtered_df, cache_key=chart_key, counts=counts)
+            plot_events_by_time_and_currency(filtered_df, cache_key=chart_key)
         else:
             st.info("No events for today.")
     else:
@@ -77,11 +204,20 @@ def fetch_store_data():
     """
     st.title("Fetch and Store Data")
     st.write("This section allows you to fetch and store the latest economic events data.")
-    if st.button('Fetch Data'):
-        # Fetch events from the web and store them in the database
-        events = fetch_economic_events()
-        store_events(events)
-        st.success('Data fetched and stored successfully!')
+    scheduler = get_refresh_scheduler()
+    if scheduler is None:
+        st.info("Events are fetched and stored by the ingest worker. This instance only reads the database.")
+    elif st.button('Fetch Data'):
+        # Fetch events from the web and store them, joining the background refresh if one is running
+        job = scheduler.refresh(wait=True)
+        if job.error:
+            st.error(f"Failed to fetch data: {job.error}")
+        else:
+            st.success(f"Data fetched and stored successfully! {job.result['inserted']} new, {job.result['updated']} updated.")
+
+    # Show how many upstream requests the response cache saved
+    st.markdown("### Response Cache")
+    st.json(cache_stats())
 
 # Function for the view stored data section
 def view_stored_data():
@@ -91,39 +227,51 @@ def view_stored_data():
     st.title("View Stored Data")
     st.write("This section allows you to view and filter stored economic events data.")
     
-    # Fetch events from the database
-    df = get_events()
+    # Find the range of stored event dates
+    first_date, last_date = cached_date_bounds()
 
-    if not df.empty:
+    if first_date is not None:
         # Display filter options
         with st.expander("Filter Options", expanded=True):
-            # Filter options for stored events
-            currencies = st.multiselect("Select Currencies", options=df["Currency"].unique(), default=df["Currency"].unique())
-            volatilities = st.multiselect("Select Volatility Levels", options=df["Volatility"].unique(), default=df["Volatility"].unique())
-            try:
-                start_date = st.date_input("Start Date", min_value=datetime.strptime(df["Date"].min(), "%m/%d/%y"), value=datetime.strptime(df["Date"].min(), "%m/%d/%y"))
-                end_date = st.date_input("End Date", min_value=datetime.strptime(df["Date"].min(), "%m/%d/%y"), value=datetime.today())
-            except ValueError:
-                st.error("Date format is incorrect. Please check your data.")
-
-            # Apply filters to the data
-            filtered_df = df[(df["Currency"].isin(currencies)) & (df["Volatility"].isin(volatilities)) & (df["Date"] >= start_date.strftime("%m/%d/%y")) & (df["Date"] <= end_date.strftime("%m/%d/%y"))].copy()
+            # Date range filter
+            start_date = st.date_input("Start Date", min_value=first_date, value=first_date)
+            end_date = st.date_input("End Date", min_value=first_date, value=max(datetime.today().date(), first_date))
+
+            # Filter options for stored events in the selected range
+            currency_options = cached_distinct_values("Currency", start_date, end_date)
+            volatility_options = cached_distinct_values("Volatility", start_date, end_date)
+            currencies = st.multiselect("Select Currencies", options=currency_options, default=currency_options)
+            volatilities = st.multiselect("Select Volatility Levels", options=volatility_options, default=volatility_options)
+
+            # Keyword search over event and currency names, answered by the full-text index
+            search = st.text_input("Search Events", placeholder='CPI, Payroll*, "Nonfarm Payrolls", Currency:EUR',
+                                   help="Words match whole words, * matches a prefix, quotes match a phrase; "
+                                        "combine terms with OR and NOT. The search applies to the table.")
 
         st.write("### Filtered Economic Events Data")
-        # Display the filtered data in a table
-        gb = GridOptionsBuilder.from_dataframe(filtered_df)
-        gb.configure_pagination(paginationAutoPageSize=True)
-        gb.configure_side_bar()
-        gb.configure_default_column(groupable=True, value=True, enableRowGroup=True, aggFunc="sum", editable=True)
-        gridOptions = gb.build()
-
-        # Display the data table
-        AgGrid(filtered_df, gridOptions=gridOptions, enable_enterprise_modules=True, height=600, theme='streamlit')
+        # Display one page of the filtered data in a table
+        paged_events_grid("stored", currencies=currencies, volatilities=volatilities, start_date=start_date, end_date=end_date,
+                          search=search.strip() or None)
+
+        # Download every stored event, written batch by batch from the columnar snapshot
+        with st.expander("Export All Events"):
+            export_button("CSV", 'csv', "economic_events.csv", "text/csv")
+            export_button("Arrow", 'arrow', "economic_events.arrows", "application/vnd.apache.arrow.stream")
         
         # Create interactive plots
         st.markdown("### Interactive Charts")
-        plot_events_by_currency_and_volatility(filtered_df)
-        plot_events_by_time_and_currency(filtered_df)
+        # Reruns with unchanged data and filters reuse the cached figures
+        chart_key = data_fingerprint(currencies=currencies, volatilities=volatilities, start_date=start_date, end_date=end_date)
+        filters = dict(currencies=currencies, volatilities=volatilities, start_date=start_date, end_date=end_date)
+        # Event counts come from the rollup table instead of grouping the loaded events
+        counts = cached_query_rollups(**filters)
+        plot_events_by_currency_and_volatility(None, cache_key=chart_key, counts=counts)
+        if cached_count_events(**filters) > LOD_ROW_THRESHOLD:
+            # Too many events to draw one by one: the heatmap is built from the daily rollups without loading them
+            day_counts = cached_query_rollups(**filters, group_by=['Day', 'Currency', 'Volatility'])
+            plot_events_by_time_and_currency(None, cache_key=chart_key, day_counts=day_counts)
+        else:
+            plot_events_by_time_and_currency(cached_query_events(**filters), cache_key=chart_key)
     else:
         st.info("No data available. Please fetch data first.")
 
@@ -145,11 +293,11 @@ def send_email_section():
     
     if submit_button:
         # Fetch today's events from the database
-        df = get_events()
-        today_str = datetime.now().strftime('%m/%d/%y')
-        if not df.empty:
-            events_today = df[df['Date'] == today_str]
-            
+        today = datetime.now().date()
+        first_date, _ = cached_date_bounds()
+        if first_date is not None:
+            events_today = cached_query_events(start_date=today, end_date=today)
+
             if not events_today.empty:
                 # Send the email with today's events
                 status = send_email(events_today.to_dict('records'), recipient, subject, message)
@@ -159,14 +307,6 @@ def send_email_section():
         else:
             st.warning('No data available to send.')
 
-# Function to automatically fetch and store data
-def auto_fetch_store_data():
-    """
-    Automatically fetch and store economic events data at startup.
-    """
-    events = fetch_economic_events()
-    store_events(events)
-
 # Main configuration of the application
 def main():
     """
@@ -175,12 +315,12 @@ def main():
     # Configure the Streamlit page settings
     st.set_page_config(page_title="Economic Events Dashboard", layout="wide", initial_sidebar_state="expanded")
 
-    # Start a thread to automatically fetch and store data at startup
-    thread = Thread(target=auto_fetch_store_data)
-    thread.start()
+    # Start the shared background refresh once per process, not on every rerun
+    scheduler = get_refresh_scheduler()
 
     # Get the user's menu choice
     choice = sidebar_menu()
+    refresh_status(scheduler)
     
     # Display the appropriate section based on the user's choice
     if choice == "Home":
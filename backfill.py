@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import date, datetime, timedelta
+from data_fetcher import iter_range_pages_async, run_async
+from ingest_queue import get_ingest_queue
+from storage_backends import STORAGE_BACKENDS, DEFAULT_BACKEND, get_backend
+
+# Default backfill settings
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CHECKPOINT_PATH = 'backfill_checkpoint.json'
+
+def parse_date(value):
+    """
+    Convert a 'YYYY-MM-DD' string, datetime or date into a date.
+
+    Args:
+        value (str, datetime or date): The value to convert.
+
+    Returns:
+        date: The converted date.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def split_windows(start_date, end_date, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Split an inclusive date range into consecutive windows.
+
+    Args:
+        start_date (date): First day of the range.
+        end_date (date): Last day of the range.
+        window_days (int): Number of days per window.
+
+    Returns:
+        list: A list of (first_day, last_day) tuples covering the range.
+    """
+    if window_days < 1:
+        raise ValueError("window_days must be at least 1")
+    windows = []
+    current = start_date
+    while current <= end_date:
+        last = min(current + timedelta(days=window_days - 1), end_date)
+        windows.append((current, last))
+        current = last + timedelta(days=1)
+    return windows
+
+def window_key(window):
+    """
+    Return the checkpoint key of a window, e.g. '2024-01-01/2024-01-07'.
+    """
+    return f"{window[0].isoformat()}/{window[1].isoformat()}"
+
+def load_checkpoint(path):
+    """
+    Load the set of completed window keys from a checkpoint file.
+
+    Args:
+        path (str): Path of the checkpoint file.
+
+    Returns:
+        set: The completed window keys, empty if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        return set(json.load(f).get('completed', []))
+
+def save_checkpoint(path, completed):
+    """
+    Atomically write the completed window keys to a checkpoint file.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        completed (set): The completed window keys.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'completed': sorted(completed)}, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def backfill_window_async(window, db_name='economic_events.db', batch_size=DEFAULT_BATCH_SIZE, max_pages=100, storage=None,
+                                stream=False):
+    """
+    Load every page of one window and stream its events into the database in batches.
+
+    Args:
+        window (tuple): The (first_day, last_day) window to load.
+        db_name (str): The name of the database file.
+        batch_size (int): Number of events submitted to the database at a time.
+        max_pages (int): Upper bound on the number of pages requested.
+        storage (object, optional): A backend from storage_backends. Defaults to the SQLite database db_name.
+        stream (bool): Parse pages while they download, so batches fill before a page is complete.
+
+    Returns:
+        int: The number of events fetched for the window.
+    """
+    def store(events):
+        # Windows loaded at the same time share the ingest queue, so their batches are written by one thread
+        return storage.store_events(events) if storage else get_ingest_queue(db_name).store(events)
+
+    batch = []
+    total = 0
+    async for events in iter_range_pages_async(window[0], window[1], max_pages, stream):
+        batch.extend(events)
+        total += len(events)
+        while len(batch) >= batch_size:
+            await asyncio.to_thread(store, batch[:batch_size])
+            batch = batch[batch_size:]
+    if batch:
+        await asyncio.to_thread(store, batch)
+    return total
+
+async def backfill_async(start_date, end_date, window_days=DEFAULT_WINDOW_DAYS, concurrency=DEFAULT_CONCURRENCY,
+                         checkpoint_path=DEFAULT_CHECKPOINT_PATH, db_name='economic_events.db',
+                         batch_size=DEFAULT_BATCH_SIZE, max_pages=100, storage=None, stream=False):
+    """
+    Load calendar history for a date range, resuming from a checkpoint.
+
+    Windows already recorded in the checkpoint are skipped. At most
+    `concurrency` windows are loaded at the same time and each finished window
+    is written to the checkpoint straight away. A failed window is not
+    checkpointed, so the next run retries it.
+
+    Args:
+        start_date (str or date): First day of the range.
+        end_date (str or date): Last day of the range.
+        window_days (int): Number of days per window.
+        concurrency (int): Maximum number of windows loaded at the same time.
+        checkpoint_path (str): Path of the checkpoint file.
+        db_name (str): The name of the database file.
+        batch_size (int): Number of events submitted to the database at a time.
+        max_pages (int): Upper bound on the number of pages requested per window.
+        storage (object, optional): A backend from storage_backends. Defaults to the SQLite database db_name.
+        stream (bool): Parse pages while they download instead of after; streamed pages skip the response cache.
+
+    Returns:
+        dict: Counts of windows, skipped, completed and failed windows, and events.
+    """
+    windows = split_windows(parse_date(start_date), parse_date(end_date), window_days)
+    completed = load_checkpoint(checkpoint_path)
+    pending = [window for window in windows if window_key(window) not in completed]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    summary = {'windows': len(windows), 'skipped': len(windows) - len(pending), 'completed': 0, 'failed': 0, 'events': 0}
+
+    async def run_window(window):
+        async with semaphore:
+            try:
+                count = await backfill_window_async(window, db_name, batch_size, max_pages, storage, stream)
+            except Exception as e:
+                print(f"Backfill of window {window_key(window)} failed: {e}")
+                summary['failed'] += 1
+                return
+        completed.add(window_key(window))
+        save_checkpoint(checkpoint_path, completed)
+        summary['completed'] += 1
+        summary['events'] += count
+
+    await asyncio.gather(*(run_window(window) for window in pending))
+    return summary
+
+def backfill(start_date, end_date, **kwargs):
+    """
+    Blocking wrapper around backfill_async.
+
+    Args:
+        start_date (str or date): First day of the range.
+        end_date (str or date): Last day of the range.
+        **kwargs: Options forwarded to backfill_async.
+
+    Returns:
+        dict: The backfill summary.
+    """
+    return run_async(backfill_async(start_date, end_date, **kwargs))
+
+# Command line entry point, e.g. `python backfill.py 2020-01-01 2023-12-31`
+def main():
+    parser = argparse.ArgumentParser(description="Backfill economic calendar history into the database.")
+    parser.add_argument('start_date', help="First day to load (YYYY-MM-DD).")
+    parser.add_argument('end_date', help="Last day to load (YYYY-MM-DD).")
+    parser.add_argument('--window-days', type=int, default=DEFAULT_WINDOW_DAYS, help="Days per request window.")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Windows loaded at the same time.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Events written per batch.")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint file used to resume.")
+    parser.add_argument('--db', default=None, help="Database file to write to. Defaults to the backend's own file.")
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=sorted(STORAGE_BACKENDS),
+                        help="Storage backend; duckdb suits multi-year history analytics.")
+    parser.add_argument('--stream', action='store_true', help="Parse pages while they download, keeping less of each in memory.")
+    args = parser.parse_args()
+
+    storage = get_backend(args.backend, args.db)
+    summary = backfill(args.start_date, args.end_date, window_days=args.window_days, concurrency=args.concurrency,
+                       checkpoint_path=args.checkpoint, db_name=storage.db_name, batch_size=args.batch_size, storage=storage,
+                       stream=args.stream)
+    print(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache bounded by entry count and, optionally, total size.
+
+    Args:
+        max_entries (int): Maximum number of entries kept.
+        max_bytes (int, optional): Maximum total size of the entries, measured with sizeof.
+        sizeof (callable, optional): Function returning the size of a value in bytes.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value for key and mark it as most recently used.
+
+        Args:
+            key (hashable): The cache key.
+            default (Any): Value returned on a miss.
+
+        Returns:
+            Any: The cached value, or default.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._counters['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """
+        Store a value, evicting least recently used entries beyond the bounds.
+
+        A value larger than max_bytes on its own is not stored.
+
+        Args:
+            key (hashable): The cache key.
+            value (Any): The value to store.
+        """
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self._counters['evictions'] += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key (hashable): The cache key.
+            compute (callable): Function called without arguments to build the value.
+
+        Returns:
+            Any: The cached or newly computed value.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """
+        Return the cache counters and current size.
+
+        Returns:
+            dict: Counts of hits, misses and evictions, plus entries and bytes held.
+        """
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._total_bytes)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -1,44 +1,283 @@
+import pandas as pd
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from cache_utils import LRUCache
+from data_storer import EVENTS_TIME_ZONE
 
-def plot_events_by_currency_and_volatility(df):
+# Order of volatility levels on chart legends
+VOLATILITY_ORDER = ['Low', 'Moderate', 'High']
+# Marker size and heatmap weight of each volatility level
+VOLATILITY_SCORES = {'Low': 1, 'Moderate': 2, 'High': 3}
+
+# Above this many events the time plot switches from markers to an aggregated heatmap
+LOD_ROW_THRESHOLD = 5000
+# Maximum number of time buckets on the heatmap axis
+MAX_TIME_BINS = 200
+# Candidate bucket sizes, from finest to coarsest, with their approximate length in seconds
+TIME_BIN_FREQUENCIES = [('15min', 900), ('h', 3600), ('6h', 21600), ('D', 86400), ('W', 604800),
+                        ('MS', 2678400), ('QS', 7948800), ('YS', 31622400)]
+
+# Figures are cached as JSON, keyed by the caller's fingerprint of the filtered data
+MAX_CACHED_FIGURES = 64
+MAX_CACHED_FIGURE_BYTES = 64 * 1024 * 1024
+FIGURE_CACHE = LRUCache(max_entries=MAX_CACHED_FIGURES, max_bytes=MAX_CACHED_FIGURE_BYTES, sizeof=len)
+
+def _plain_columns(df, columns):
     """
-    Plots events by currency and volatility using a bar chart.
+    Convert categorical columns back to plain values, which plotly express expects.
+
+    Args:
+        df (DataFrame): The frame to convert in place.
+        columns (list): Columns to convert when they are categorical.
+
+    Returns:
+        DataFrame: The converted frame.
+    """
+    for column in columns:
+        if column in df and isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return df
+
+def volatility_scores(volatility):
+    """
+    Map volatility levels to their scores, with 0 for events without a level.
+
+    Args:
+        volatility (Series): Volatility levels, as strings or categoricals.
+
+    Returns:
+        Series: The integer scores.
+    """
+    return volatility.astype(object).map(VOLATILITY_SCORES).fillna(0).astype(int)
+
+def choose_time_bin(start, end, max_bins=MAX_TIME_BINS):
+    """
+    Pick the finest bucket size that covers a time span in at most max_bins buckets.
+
+    Args:
+        start (Timestamp): The first event time.
+        end (Timestamp): The last event time.
+        max_bins (int): Maximum number of buckets.
+
+    Returns:
+        str: A pandas frequency string.
+    """
+    span = (end - start).total_seconds()
+    for freq, seconds in TIME_BIN_FREQUENCIES:
+        if span / seconds < max_bins:
+            return freq
+    return TIME_BIN_FREQUENCIES[-1][0]
+
+def aggregate_time_and_currency(df, max_bins=MAX_TIME_BINS):
+    """
+    Sum the volatility scores of the events per time bucket and currency.
+
+    Args:
+        df (DataFrame): Events with Timestamp, Currency and Volatility columns.
+        max_bins (int): Maximum number of time buckets.
+
+    Returns:
+        DataFrame: One row per currency and one column per time bucket, in the events time zone.
+    """
+    events = df[df['Timestamp'].notna()]
+    if events.empty:
+        return pd.DataFrame()
+    local_times = events['Timestamp'].dt.tz_convert(EVENTS_TIME_ZONE).dt.tz_localize(None)
+    freq = choose_time_bin(local_times.min(), local_times.max(), max_bins)
+    weights = pd.DataFrame({
+        'Bucket': local_times,
+        'Currency': events['Currency'].astype(object).fillna(''),
+        'Score': volatility_scores(events['Volatility']),
+    })
+    grouped = weights.groupby([pd.Grouper(key='Bucket', freq=freq), 'Currency'])['Score'].sum()
+    return grouped.unstack('Bucket', fill_value=0).sort_index()
+
+def aggregate_day_counts(day_counts, max_bins=MAX_TIME_BINS):
+    """
+    Sum the volatility scores of daily event counts per time bucket and currency.
+
+    Buckets are at least a day long, since the counts carry no time of day.
+
+    Args:
+        day_counts (DataFrame): Day, Currency, Volatility and Count columns, e.g. from data_storer.query_rollups.
+        max_bins (int): Maximum number of time buckets.
+
+    Returns:
+        DataFrame: One row per currency and one column per time bucket, in the events time zone.
+    """
+    counts = day_counts[day_counts['Day'] != '']
+    if counts.empty:
+        return pd.DataFrame()
+    days = pd.to_datetime(counts['Day'])
+    freq = choose_time_bin(days.min(), days.max() + pd.Timedelta(days=1), max_bins)
+    if dict(TIME_BIN_FREQUENCIES)[freq] < 86400:
+        freq = 'D'
+    weights = pd.DataFrame({
+        'Bucket': days,
+        'Currency': counts['Currency'].astype(object).fillna(''),
+        'Score': volatility_scores(counts['Volatility']) * counts['Count'],
+    })
+    grouped = weights.groupby([pd.Grouper(key='Bucket', freq=freq), 'Currency'])['Score'].sum()
+    return grouped.unstack('Bucket', fill_value=0).sort_index()
+
+def cached_figure(name, cache_key, build):
+    """
+    Returns a figure from the figure cache, building it on a miss.
+
+    Args:
+        name (str): The chart name, part of the cache key.
+        cache_key (hashable): Fingerprint of the data and options behind the figure, or None to skip the cache.
+        build (callable): Function called without arguments to build the figure.
+
+    Returns:
+        Figure: The plotly figure.
+    """
+    if cache_key is None:
+        return build()
+    figure_json = FIGURE_CACHE.get_or_compute((name, cache_key), lambda: build().to_json())
+    return pio.from_json(figure_json)
+
+def prepare_currency_and_volatility_counts(df):
+    """
+    Counts the events per currency and volatility level.
 
     Args:
         df (DataFrame): Filtered DataFrame containing economic events.
+
+    Returns:
+        DataFrame: Currency, Volatility and Count columns, by descending count.
     """
-    if df.empty:
+    # Count the number of events per currency; observed=True skips empty category combinations
+    return df.groupby(['Currency', 'Volatility'], observed=True).size().reset_index(name='Count')
+
+def build_currency_and_volatility_figure(df_counts):
+    """
+    Builds the bar chart of events by currency and volatility.
+
+    Args:
+        df_counts (DataFrame): Currency, Volatility and Count columns, e.g. from data_storer.query_rollups.
+
+    Returns:
+        Figure: The plotly figure.
+    """
+    # Sort the DataFrame by count in descending order
+    df_counts = _plain_columns(df_counts.sort_values(by='Count', ascending=False), ['Currency', 'Volatility'])
+    return px.bar(df_counts, x='Currency', y='Count', color='Volatility', title='Events by Currency and Volatility', labels={'Count':'Number of Events', 'Volatility':'Volatility'}, category_orders={'Volatility': VOLATILITY_ORDER})
+
+def plot_events_by_currency_and_volatility(df, cache_key=None, counts=None):
+    """
+    Plots events by currency and volatility using a bar chart.
+
+    Args:
+        df (DataFrame): Filtered DataFrame containing economic events. Ignored when counts is given.
+        cache_key (hashable, optional): Fingerprint of the filtered data, e.g. the data version and filters.
+            Reruns with the same key reuse the cached figure.
+        counts (DataFrame, optional): Precomputed Currency, Volatility and Count columns, e.g. from the
+            rollup table, used instead of grouping df.
+    """
+    if (df if counts is None else counts).empty:
         st.warning("No data available for the selected filters.")
         return
 
-    # Count the number of events per currency
-    df_counts = df.groupby(['Currency', 'Volatility']).size().reset_index(name='Count')
+    def build():
+        return build_currency_and_volatility_figure(prepare_currency_and_volatility_counts(df) if counts is None else counts)
+    st.plotly_chart(cached_figure('currency_and_volatility', cache_key, build))
 
-    # Sort the DataFrame by count in descending order
-    df_counts = df_counts.sort_values(by='Count', ascending=False)
+def prepare_time_and_currency_data(df, max_points=LOD_ROW_THRESHOLD, max_bins=MAX_TIME_BINS):
+    """
+    Prepares the events by time and currency data at a level of detail suited to the number of events.
+
+    Up to max_points events are kept as individual points. Above that, the
+    events are aggregated into time buckets per currency weighted by volatility
+    score, so the data size is bounded by max_bins and the number of currencies
+    rather than by the number of events.
+
+    Args:
+        df (DataFrame): Filtered DataFrame containing economic events.
+        max_points (int): Largest number of events kept as individual points.
+        max_bins (int): Maximum number of time buckets in aggregated mode.
+
+    Returns:
+        tuple: ('heatmap', intensity by currency and time bucket) or ('scatter', one row per event).
+    """
+    if len(df) > max_points and 'Timestamp' in df:
+        return 'heatmap', aggregate_time_and_currency(df, max_bins)
+
+    # Convert Volatility to Volatility Score for better visualization
+    points = _plain_columns(df[['Time', 'Event', 'Currency']].copy(), ['Time', 'Event', 'Currency'])
+    points['Volatility Score'] = volatility_scores(df['Volatility'])
+    return 'scatter', points
 
-    # Create a bar chart
-    fig = px.bar(df_counts, x='Currency', y='Count', color='Volatility', title='Events by Currency and Volatility', labels={'Count':'Number of Events', 'Volatility':'Volatility'})
-    st.plotly_chart(fig)
+def build_time_and_currency_heatmap(data):
+    """
+    Builds the heatmap of volatility-weighted events by time bucket and currency.
+
+    Args:
+        data (DataFrame): Intensity by currency and time bucket, from aggregate_time_and_currency or aggregate_day_counts.
+
+    Returns:
+        Figure: The plotly figure.
+    """
+    fig = go.Figure(go.Heatmap(
+        z=data.to_numpy(),
+        x=list(data.columns),
+        y=list(data.index),
+        colorscale='Viridis',
+        colorbar={'title': 'Volatility'},
+        hovertemplate='%{y} at %{x}<br>Volatility-weighted events: %{z}<extra></extra>',
+    ))
+    fig.update_layout(title='Volatility-Weighted Events by Time and Currency', xaxis_title='Time', yaxis_title='Currency')
+    return fig
 
-def plot_events_by_time_and_currency(df):
+def build_time_and_currency_figure(df, max_points=LOD_ROW_THRESHOLD, max_bins=MAX_TIME_BINS):
     """
-    Plots events by time and currency using a scatter plot.
+    Builds the events by time and currency figure: WebGL scatter markers, or a heatmap for many events.
 
     Args:
         df (DataFrame): Filtered DataFrame containing economic events.
+        max_points (int): Largest number of events drawn as individual markers.
+        max_bins (int): Maximum number of time buckets in aggregated mode.
+
+    Returns:
+        Figure: The plotly figure.
+    """
+    kind, data = prepare_time_and_currency_data(df, max_points, max_bins)
+    if kind == 'heatmap':
+        return build_time_and_currency_heatmap(data)
+
+    return px.scatter(data, x='Time', y='Event', color='Currency', title='Events by Time and Currency', size='Volatility Score',
+                      labels={'Volatility Score':'Volatility'}, render_mode='webgl')
+
+def plot_events_by_time_and_currency(df, max_points=LOD_ROW_THRESHOLD, cache_key=None, day_counts=None):
+    """
+    Plots events by time and currency, as a scatter plot or, for many events, an aggregated heatmap.
+
+    Args:
+        df (DataFrame): Filtered DataFrame containing economic events. Ignored when day_counts is given.
+        max_points (int): Largest number of events drawn as individual markers.
+        cache_key (hashable, optional): Fingerprint of the filtered data, e.g. the data version and filters.
+            Reruns with the same key reuse the cached figure.
+        day_counts (DataFrame, optional): Day, Currency, Volatility and Count columns from the rollup table,
+            drawn as a daily heatmap without loading the events.
     """
+    if day_counts is not None:
+        if day_counts.empty:
+            st.warning("No data available for the selected filters.")
+            return
+        st.caption(f"{day_counts['Count'].sum()} events selected: showing volatility-weighted totals per time bucket instead of individual events.")
+        figure = cached_figure('time_and_currency_days', cache_key,
+                               lambda: build_time_and_currency_heatmap(aggregate_day_counts(day_counts)))
+        st.plotly_chart(figure)
+        return
+
     if df.empty:
         st.warning("No data available for the selected filters.")
         return
 
-    # Convert Volatility to Volatility Score for better visualization
-    df = df.copy()
-    df['Volatility Score'] = 0
-    df.loc[df['Volatility'] == 'High', 'Volatility Score'] = 3
-    df.loc[df['Volatility'] == 'Moderate', 'Volatility Score'] = 2
-    df.loc[df['Volatility'] == 'Low', 'Volatility Score'] = 1
-
-    fig = px.scatter(df, x='Time', y='Event', color='Currency', title='Events by Time and Currency', size='Volatility Score', labels={'Volatility Score':'Volatility'})
-    st.plotly_chart(fig)
+    if len(df) > max_points:
+        st.caption(f"{len(df)} events selected: showing volatility-weighted totals per time bucket instead of individual events.")
+    figure = cached_figure('time_and_currency', (cache_key, max_points) if cache_key is not None else None,
+                           lambda: build_time_and_currency_figure(df, max_points))
+    st.plotly_chart(figure)
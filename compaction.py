@@ -0,0 +1,166 @@
+import argparse
+import functools
+import os
+from datetime import datetime, timedelta
+from data_storer import (TABLE_COLUMNS, EVENTS_TIME_ZONE, archive_dir, archive_path, create_archive_table, get_archives,
+                         month_bounds, refresh_snapshots)
+from db_connection import get_connection, transaction, close_connections
+from ingest_queue import get_ingest_queue
+
+# Weeks of recent events kept in the main table; older whole months are archived
+DEFAULT_HOT_WEEKS = 8
+# Attempts at moving a month when other writers keep changing the database
+MAX_ATTEMPTS = 3
+
+# Function to find the first month that stays in the main table
+def hot_cutoff(hot_weeks=DEFAULT_HOT_WEEKS, now=None):
+    """
+    Return the oldest month kept in the main table.
+
+    Parameters:
+    hot_weeks (float): Weeks of recent events kept in the main table.
+    now (datetime): The current time. Default is now.
+
+    Returns:
+    str: The month as 'YYYY-MM'; every earlier month can be archived.
+    """
+    now = now or datetime.now(EVENTS_TIME_ZONE)
+    return (now - timedelta(weeks=hot_weeks)).astimezone(EVENTS_TIME_ZONE).strftime('%Y-%m')
+
+# Function to list the months due for archiving
+def months_to_archive(hot_weeks=DEFAULT_HOT_WEEKS, db_name='economic_events.db', now=None):
+    """
+    Return the months older than the hot window that still have events in the main table.
+
+    Parameters:
+    hot_weeks (float): Weeks of recent events kept in the main table.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    now (datetime): The current time. Default is now.
+
+    Returns:
+    list of str: The months as 'YYYY-MM', oldest first.
+    """
+    rows = get_connection(db_name).execute(
+        "SELECT DISTINCT substr(Day, 1, 7) FROM event_rollups WHERE Day != '' AND Day < ? ORDER BY 1",
+        (hot_cutoff(hot_weeks, now) + '-01',)
+    )
+    archived = set(get_archives(db_name=db_name))
+    return [row[0] for row in rows if row[0] not in archived]
+
+def _write_archive(path, rows):
+    """
+    Create an archive database holding the given rows, replacing any leftover file.
+    """
+    for leftover in (path, path + '-wal', path + '-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    create_archive_table(path)
+    with transaction(path) as conn:
+        conn.executemany(f"INSERT INTO events ({', '.join(TABLE_COLUMNS)}) VALUES ({', '.join('?' * len(TABLE_COLUMNS))})", rows)
+    # Closing the only connection checkpoints the WAL into the file before it is moved
+    close_connections(path)
+
+def _move_month(month, path, temporary, version, db_name):
+    """
+    Put the archive file in place and delete the month from the main table, unless the data version moved.
+
+    Returns:
+    bool: True if the month was moved.
+    """
+    start, end = month_bounds(month)
+    conn = get_connection(db_name)
+    moved = False
+    try:
+        with conn:
+            # Take the write lock before checking the version, so nothing can change between the check and the move
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute("SELECT Value FROM metadata WHERE Key = 'data_version'").fetchone()[0] != version:
+                return False
+            os.replace(temporary, path)
+            moved = True
+            conn.execute('INSERT INTO archives (Month, Start, End) VALUES (?, ?, ?)', (month, start, end))
+            rollups = conn.execute('SELECT Day, Currency, Volatility, Count FROM event_rollups WHERE Day LIKE ?',
+                                   (month + '-%',)).fetchall()
+            conn.execute('DELETE FROM events WHERE Timestamp >= ? AND Timestamp < ?', (start, end))
+            # The events still count: put back the rollups the delete trigger took away
+            conn.execute('DELETE FROM event_rollups WHERE Day LIKE ?', (month + '-%',))
+            conn.executemany('INSERT INTO event_rollups (Day, Currency, Volatility, Count) VALUES (?, ?, ?, ?)', rollups)
+            conn.execute("UPDATE metadata SET Value = Value + 1 WHERE Key = 'data_version'")
+    except Exception:
+        # The transaction rolled back and the month is still in the main table: drop the unregistered archive
+        if moved and os.path.exists(path):
+            os.remove(path)
+        raise
+    return True
+
+# Function to move one month out of the main table
+def archive_month(month, db_name='economic_events.db'):
+    """
+    Move the events of a month from the main table into the month's archive database.
+
+    The archive is written to a temporary file while readers and writers carry
+    on. A short write transaction on the main database, run by the database's
+    ingest queue writer, then checks that the data version did not move, puts
+    the file in place, registers the month, deletes its rows and restores the
+    month's rollups, which the delete trigger decremented. If that transaction
+    fails, the file is removed again. Readers in WAL mode are never blocked:
+    they see the month either in the main table or in the archive.
+
+    Parameters:
+    month (str): The month as 'YYYY-MM'.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    int: The number of events moved; 0 if there were none or other writers kept changing the database.
+    """
+    start, end = month_bounds(month)
+    path = archive_path(month, db_name)
+    temporary = path + '.tmp'
+    os.makedirs(archive_dir(db_name), exist_ok=True)
+    conn = get_connection(db_name)
+    for attempt in range(MAX_ATTEMPTS):
+        version = conn.execute("SELECT Value FROM metadata WHERE Key = 'data_version'").fetchone()[0]
+        rows = conn.execute(f"SELECT {', '.join(TABLE_COLUMNS)} FROM events WHERE Timestamp >= ? AND Timestamp < ? ORDER BY Timestamp, rowid",
+                            (start, end)).fetchall()
+        if not rows:
+            return 0
+        _write_archive(temporary, rows)
+        if get_ingest_queue(db_name).run(functools.partial(_move_month, month, path, temporary, version, db_name)):
+            refresh_snapshots(db_name, {month}, version + 1)
+            return len(rows)
+    print(f"Gave up archiving {month}: the database kept changing.")
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    return 0
+
+# Function to archive every month older than the hot window
+def compact_events(hot_weeks=DEFAULT_HOT_WEEKS, db_name='economic_events.db', now=None):
+    """
+    Archive every whole month older than the hot window, one month per transaction.
+
+    Parameters:
+    hot_weeks (float): Weeks of recent events kept in the main table.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    now (datetime): The current time. Default is now.
+
+    Returns:
+    dict: The number of events moved per month.
+    """
+    moved = {month: archive_month(month, db_name) for month in months_to_archive(hot_weeks, db_name, now)}
+    if moved:
+        # Fold the deletes back into the database file without waiting for readers
+        get_connection(db_name).execute('PRAGMA wal_checkpoint(PASSIVE)')
+    return moved
+
+# Command line entry point, e.g. `python compaction.py --hot-weeks 8`
+def main():
+    parser = argparse.ArgumentParser(description="Move months older than the hot window into per-month archive databases.")
+    parser.add_argument('--db', default='economic_events.db', help="Database file to compact.")
+    parser.add_argument('--hot-weeks', type=float, default=float(os.environ.get('HOT_WEEKS', DEFAULT_HOT_WEEKS)),
+                        help="Weeks of recent events kept in the main table.")
+    args = parser.parse_args()
+
+    print(compact_events(args.hot_weeks, args.db))
+
+if __name__ == "__main__":
+    main()
@@ -1,187 +1,637 @@
+import asyncio
+import json
+import re
+import threading
 import httpx
-from bs4 import BeautifulSoup
 from datetime import datetime
+from event_parser import EventStreamParser, extract_volatility, parse_html
+from response_cache import ResponseCache
 
-def fetch_data(url, headers, cookies, data):
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Investing.com calendar endpoint and the browser-like headers/cookies it expects
+CALENDAR_URL = "https://www.investing.com/economic-calendar/Service/getCalendarFilteredData"
+HEADERS = {
+    "Accept": "*/*",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+    "Cache-Control": "no-cache",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Origin": "https://www.investing.com",
+    "Pragma": "no-cache",
+    "Referer": "https://www.investing.com/economic-calendar/",
+    "Sec-CH-UA": '"Not/A;Brand";v="99", "Microsoft Edge";v="103", "Chromium";v="103"',
+    "Sec-CH-UA-Mobile": "?0",
+    "Sec-CH-UA-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "same-origin",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36",
+    "X-Requested-With": "XMLHttpRequest",
+}
+COOKIES = {
+    "PHPSESSID": "telbckiou16uufp5s2qd09hjsk",
+    "geoC": "BR",
+    "page_equity_viewed": "0",
+    "browser-session-counted": "true",
+    "user-browser-sessions": "1",
+    "adsFreeSalePopUp": "1",
+    "adBlockerNewUserDomains": "1719873801",
+    "gtmFired": "OK",
+    "nyxDorf": "MzQ%2BZTNlZDw0aGhlNzZkZT5lMTthMjsxMzBlbDE%2FZm0xZmM3b2M1M2MxPmNhaWVhYmRiYj5uYjY0PWI6NmVnNzM1PmczZ2RrNGdobA%3D%3D",
+    "udid": "a2bcb6d6a827d4f0c8a40b509bebfc97",
+    "smd": "a2bcb6d6a827d4f0c8a40b509bebfc97-1719873800",
+    "__cf_bm": "LgiKTZ_0yCSBLMRzRnvQGb.8Ll3Hb4hC6dSRgM0thyY-1719873801-1.0.1.1-rcgh3yYXQAmuR8W.eSdtHNrZnUskd6DtqLHhfuIhr710F72p3rz12awhmqZdXSs.vsiOZ20.fvf6kGlstf2DwDdj9M1zJyYSPD5JpcOOCRE",
+    "__cflb": "0H28vY1WcQgbwwJpSw5YiDRSJhpofbxeRRLrHXVwGLk",
+    "usprivacy": "1YNN",
+    "_gid": "GA1.2.1187722834.1719873897",
+    "_imntz_error": "0",
+    "cf_clearance": "pMZ1PhsuQCp.DisOWWk0YFPCpXuHdJEM6i0T1xDihSQ-1719873802-1.0.1.1-fCy3zIDGNe1DHIxiBWfmnpbng6c2WoH3AOMkJy2bVnEOmRnUH0UCDGHLYg_QNpizqfw.d_OsQLVr7zZoUyAo4w",
+    "_hjSessionUser_174945": "eyJpZCI6IjNiNjFhZTM5LTI1MGQtNWVkZC04ZDJiLTQwZTUxNmNiNDBmNSIsImNyZWF0ZWQiOjE3MTU5MDY2NzkxMjAsImV4aXN0aW5nIjp0cnVlfQ==",
+    "_hjSession_174945": "eyJpZCI6IjU2OTk2ZGFhLTkzYWEtNDZjMS04MDdlLTZmNDY5YzhhZjI4YSIsImMiOjE3MTk4NzM4OTc2NjEsInMiOjAsInIiOjAsInNiIjowLCJzciI6MCwic2UiOjAsImZzIjowLCJzcCI6MH0=",
+    "_ga": "GA1.1.1966211167.1719873897",
+    "__eventn_id": "a2bcb6d6a827d4f0c8a40b509bebfc97",
+    "OneTrustWPCCPAGoogleOptOut": "false",
+    "editionPostpone": "1719873903113",
+    "r_p_s_n": "1",
+    "reg_trk_ep": "exit popup banner",
+    "_cc_id": "4efdbc1d588793a09f80532ba4b8edfe",
+    "panoramaId_expiry": "1720478612700",
+    "panoramaId": "c56eb0a4c51e0dde4dd50475cca7185ca02c976eb81b2e083e31bb96de376b9e",
+    "panoramaIdType": "panoDevice",
+    "cto_bundle": "75gbl19UY3V5SWZRWXZJMk0mMExEdUZlWmNBM1gybHRGR2ZGeTB0Uk1rek9LMExyMFhFbFJ6amIwaUZhNzk3cnJncDVRTkZ4NjBoNU9OU2VaNkRwdW1hN0Zjck52U3RpNXZteGxBYTdkTFRYeVNJMFAzUUN5bm1odEpWRG9mMzRGTjE5Rg",
+    "gcc": "BR",
+    "gsc": "SP",
+    "invpc": "2",
+    "page_view_count": "2",
+    "lifetime_page_view_count": "1",
+    "reg_trk_ep": "google%20one%20tap",
+    "_hjHasCachedUserAttributes": "true",
+    "_ga_C4NDLGKVMK": "GS1.1.1719873897.1.1.1719874719.60.0.0",
+    "pm_score": "clear",
+}
+
+# Country ids requested from the calendar and the week tabs fetched on every refresh
+COUNTRIES = [
+    "25", "32", "6", "37", "72", "22", "17", "39", "14", "10",
+    "35", "43", "56", "36", "110", "11", "26", "12", "4", "5"
+]
+WEEK_TABS = ("thisWeek", "nextWeek")
+
+# Connection pool settings for the shared async client
+CLIENT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+CLIENT_TIMEOUT = httpx.Timeout(15.0)
+
+# Background event loop that owns the long-lived async client
+_loop = None
+_loop_lock = threading.Lock()
+_async_client = None
+
+# On-disk response cache shared by every fetch, whose directory is created by the first stored response;
+# set to None to disable caching
+RESPONSE_CACHE = ResponseCache()
+
+def cache_stats():
+    """
+    Return the response cache counters.
+
+    Returns:
+        dict: Counts of cache hits, misses, skipped unchanged bodies and evictions.
+    """
+    return RESPONSE_CACHE.stats() if RESPONSE_CACHE else {}
+
+# A run of JSON string content made of whole characters and whole escapes
+_STRING_RUN = re.compile(r'(?:[^"\\]+|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*')
+# The escape of a high surrogate, the first half of a character outside the BMP
+_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}')
+
+class PayloadStream:
+    """
+    Incremental decoder of a JSON payload whose large string field is handed out as it arrives.
+
+    The calendar endpoint returns its HTML as the 'data' string of a JSON
+    object. Chunks of the body are fed in as they download; feed returns the
+    decoded text of the field found in each chunk, and close returns the other
+    fields once the body is complete, so the HTML is never held in one piece.
+
+    Args:
+        field (str): The top-level string field to stream.
+    """
+
+    def __init__(self, field='data'):
+        self.field = field
+        self._rest = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._expect_key = False
+        self._key = None
+        self._in_value = False
+        # Inside the streamed string, the start of an escape that was cut off by the chunk end
+        self._streaming = False
+        self._pending = ''
+
+    def feed(self, text):
+        """
+        Decode the next chunk of the body.
+
+        Args:
+            text (str): The next chunk of the body.
+
+        Returns:
+            str: The decoded text of the streamed field within the chunk, possibly empty.
+        """
+        decoded = []
+        while text:
+            if self._streaming:
+                text = self._feed_string(text, decoded)
+            else:
+                text = self._feed_outer(text)
+        return ''.join(decoded)
+
+    def close(self):
+        """
+        Finish decoding and return the rest of the payload.
+
+        Returns:
+            dict: The payload without the streamed field.
+
+        Raises:
+            ValueError: If the body ended inside the streamed field or is not valid JSON.
+        """
+        if self._streaming:
+            raise ValueError(f"The payload ended inside the '{self.field}' field.")
+        payload = json.loads(''.join(self._rest))
+        payload.pop(self.field, None)
+        return payload
+
+    def _feed_outer(self, text):
+        """
+        Scan the object around the streamed field until its value starts, returning the unread text.
+        """
+        for index, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = ''.join(self._string)
+                        self._expect_key = False
+                    self._string = []
+                    continue
+                if self._depth == 1 and self._expect_key:
+                    self._string.append(char)
+            elif char == '"':
+                if self._depth == 1 and self._in_value and self._key == self.field:
+                    # The value is left out of the rest of the payload and streamed instead
+                    self._rest.append(text[:index] + '""')
+                    self._in_value = False
+                    self._streaming = True
+                    return text[index + 1:]
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                self._expect_key = char == '{' and self._depth == 1
+            elif char in '}]':
+                self._depth -= 1
+            elif self._depth == 1 and char == ':':
+                self._in_value = True
+                continue
+            elif self._depth == 1 and char == ',':
+                self._expect_key = True
+            if not char.isspace():
+                self._in_value = False
+        self._rest.append(text)
+        return ''
+
+    def _feed_string(self, text, decoded):
+        """
+        Decode the streamed string up to its closing quote or the last complete escape, returning the unread text.
+        """
+        text = self._pending + text
+        self._pending = ''
+        cut = _STRING_RUN.match(text).end()
+        if cut < len(text) and text[cut] == '"':
+            end = cut
+        else:
+            end = None
+            if len(text) - cut >= 6:
+                raise ValueError("The payload holds an invalid escape.")
+            # An escape cut off by the end of the chunk is decoded with the next one
+            self._pending = text[cut:]
+            if _ends_with_high_surrogate(text, cut):
+                # Keep the two halves of a surrogate pair together
+                cut -= 6
+                self._pending = text[cut:]
+        if cut:
+            decoded.append(json.loads(f'"{text[:cut]}"'))
+        if end is None:
+            return ''
+        self._streaming = False
+        return text[end + 1:]
+
+def _ends_with_high_surrogate(text, end):
+    """
+    Check whether text[:end] ends with the \\uXXXX escape of a high surrogate.
+    """
+    start = end - 6
+    if start < 0 or not _HIGH_SURROGATE.fullmatch(text, start, end):
+        return False
+    # The backslash starts an escape only if an even number of backslashes precede it
+    backslashes = 0
+    while start - backslashes > 0 and text[start - backslashes - 1] == '\\':
+        backslashes += 1
+    return backslashes % 2 == 0
+
+def build_form_data(tab, countries=None, limit_from="0"):
+    """
+    Build the form payload sent to the calendar endpoint.
+
+    Args:
+        tab (str): The calendar tab to request, e.g. 'thisWeek' or 'nextWeek'.
+        countries (list, optional): Country ids to include. Defaults to COUNTRIES.
+        limit_from (str): Paging offset expected by the endpoint.
+
+    Returns:
+        dict: The form data for the POST request.
+    """
+    return {
+        "country[]": list(countries if countries is not None else COUNTRIES),
+        "timeZone": "8",
+        "timeFilter": "timeRemain",
+        "currentTab": tab,
+        "limit_from": limit_from
+    }
+
+def build_range_form_data(date_from, date_to, limit_from="0", last_time_scope=None, countries=None):
+    """
+    Build the form payload for a custom date range of the calendar.
+
+    Args:
+        date_from (date): First day of the range.
+        date_to (date): Last day of the range.
+        limit_from (str): Page number to request, starting at "0".
+        last_time_scope (str, optional): Scope marker returned by the previous page.
+        countries (list, optional): Country ids to include. Defaults to COUNTRIES.
+
+    Returns:
+        dict: The form data for the POST request.
+    """
+    data = {
+        "country[]": list(countries if countries is not None else COUNTRIES),
+        "dateFrom": date_from.strftime('%Y-%m-%d'),
+        "dateTo": date_to.strftime('%Y-%m-%d'),
+        "timeZone": "8",
+        "timeFilter": "timeOnly",
+        "currentTab": "custom",
+        "submitFilters": "1",
+        "limit_from": limit_from
+    }
+    if last_time_scope is not None:
+        data["last_time_scope"] = last_time_scope
+    return data
+
+def split_countries(countries, groups):
+    """
+    Split the country list into roughly equal groups for parallel requests.
+
+    Args:
+        countries (list): Country ids to split.
+        groups (int): Number of groups to produce.
+
+    Returns:
+        list: A list of non-empty country id lists.
+    """
+    groups = max(1, min(groups, len(countries)))
+    size, remainder = divmod(len(countries), groups)
+    chunks = []
+    start = 0
+    for index in range(groups):
+        end = start + size + (1 if index < remainder else 0)
+        chunks.append(countries[start:end])
+        start = end
+    return chunks
+
+def merge_events(event_lists):
+    """
+    Merge event lists, dropping duplicates by Date, Time, Currency and Event.
+
+    Args:
+        event_lists (list): Lists of event dictionaries, in priority order.
+
+    Returns:
+        list: The merged events, keeping the first occurrence of each event.
+    """
+    seen = set()
+    merged = []
+    for events in event_lists:
+        for event in events:
+            key = (event['Date'], event['Time'], event['Currency'], event['Event'])
+            if key not in seen:
+                seen.add(key)
+                merged.append(event)
+    return merged
+
+def _sort_key(event):
+    """
+    Chronological sort key for an event dictionary.
+    """
+    return (datetime.strptime(event['Date'], '%m/%d/%y'), event['Time'] or '')
+
+def _get_event_loop():
+    """
+    Return the background event loop used for async fetches, starting it on first use.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running background loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="fetch-event-loop", daemon=True)
+            thread.start()
+    return _loop
+
+def get_async_client():
+    """
+    Return the shared, pooled async HTTP client, creating it on first use.
+
+    The client keeps connections alive between refreshes and uses HTTP/2 when
+    the h2 package is installed. It must only be used from the background loop.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            cookies=COOKIES,
+            limits=CLIENT_LIMITS,
+            timeout=CLIENT_TIMEOUT,
+        )
+    return _async_client
+
+def run_async(coro):
+    """
+    Run a coroutine on the background loop and block until it finishes.
+
+    Args:
+        coro (coroutine): The coroutine to run.
+
+    Returns:
+        Any: The coroutine's result.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+async def fetch_page_async(url, headers, data, max_age=None):
     """
-    Fetch data from the given URL using HTTP POST request.
+    Fetch one calendar page with the shared async client.
+
+    Fresh responses are served from RESPONSE_CACHE without contacting upstream.
 
     Args:
         url (str): The URL to send the request to.
         headers (dict): HTTP headers to include in the request.
-        cookies (dict): Cookies to include in the request.
         data (dict): Data to send in the body of the request.
+        max_age (float, optional): Caps the cache TTL of the tab, 0 always goes to the network.
 
     Returns:
-        dict or None: Parsed JSON data if the request is successful, None otherwise.
+        dict or None: The full JSON payload if the request is successful, None otherwise.
     """
+    cache = RESPONSE_CACHE
+    if cache:
+        key = cache.key(url, data)
+        ttl = cache.ttl_for(data) if max_age is None else min(cache.ttl_for(data), max_age)
+        cached = cache.get(key, ttl)
+        if cached is not None:
+            return cached
     try:
-        # Use HTTPX client to send a POST request
-        with httpx.Client(follow_redirects=True, cookies=cookies) as client:
-            response = client.post(url, headers=headers, data=data)
-            if response.status_code == 200:
-                return response.json().get('data')
-            print(f"Failed to get data: {response.status_code}")
-            return None
+        response = await get_async_client().post(url, headers=headers, data=data)
+        if response.status_code == 200:
+            payload = response.json()
+            if cache:
+                cache.put(key, payload)
+            return payload
+        print(f"Failed to get data: {response.status_code}")
+        return None
     except Exception as e:
         print(f"An error occurred: {e}")
         return None
 
-def extract_volatility(cell_html):
+async def fetch_data_async(url, headers, data, max_age=None):
     """
-    Extract the volatility level from the HTML content of a cell.
+    Fetch data from the given URL with the shared async client.
 
     Args:
-        cell_html (str): The HTML content of the cell.
+        url (str): The URL to send the request to.
+        headers (dict): HTTP headers to include in the request.
+        data (dict): Data to send in the body of the request.
+        max_age (float, optional): Caps the cache TTL of the tab, 0 always goes to the network.
 
     Returns:
-        str or None: Volatility level if found, None otherwise.
+        str or None: The HTML content if the request is successful, None otherwise.
+    """
+    payload = await fetch_page_async(url, headers, data, max_age)
+    return payload.get('data') if payload else None
+
+async def stream_page_async(url, headers, data, payload):
+    """
+    Fetch one calendar page and yield its events while the body downloads.
+
+    The body is decoded with a PayloadStream and its HTML fed to an
+    EventStreamParser chunk by chunk, so events are yielded as their rows
+    close and the page is never held whole. A fresh page in RESPONSE_CACHE is
+    parsed from the cache; streamed pages are not written to it.
+
+    Args:
+        url (str): The URL to send the request to.
+        headers (dict): HTTP headers to include in the request.
+        data (dict): Data to send in the body of the request.
+        payload (dict): Filled with the other fields of the JSON payload, e.g. rows_num, once the body is read.
+
+    Yields:
+        list: The events completed by each chunk of the body, in page order.
+
+    Raises:
+        RuntimeError: If the request does not succeed.
     """
-    if 'High Volatility Expected' in cell_html:
-        return 'High'
-    if 'Moderate Volatility Expected' in cell_html:
-        return 'Moderate'
-    if 'Low Volatility Expected' in cell_html:
-        return 'Low'
-    return None
+    cache = RESPONSE_CACHE
+    if cache:
+        cached = cache.get(cache.key(url, data), cache.ttl_for(data))
+        if cached is not None:
+            payload.update(cached)
+            html = payload.pop('data', None)
+            yield parse_html(html) if html else []
+            return
+    decoder = PayloadStream()
+    parser = EventStreamParser()
+    async with get_async_client().stream('POST', url, headers=headers, data=data) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to get data: {response.status_code}")
+        async for text in response.aiter_text():
+            parser.feed(decoder.feed(text))
+            events = parser.pop_events()
+            if events:
+                yield events
+    parser.close()
+    payload.update(decoder.close())
+    yield parser.pop_events()
 
-def parse_html(html_content):
+async def iter_range_pages_async(date_from, date_to, max_pages=100, stream=False):
     """
-    Parse HTML content to extract economic events.
+    Yield parsed events page by page for a custom date range, following limit_from paging.
+
+    Paging stops when the endpoint no longer asks for more rows, a page comes
+    back empty or max_pages is reached.
 
     Args:
-        html_content (str): HTML content to parse.
+        date_from (date): First day of the range.
+        date_to (date): Last day of the range.
+        max_pages (int): Upper bound on the number of pages requested.
+        stream (bool): Parse each page while it downloads, yielding its events as their rows close
+            instead of once the page is complete.
+
+    Yields:
+        list: The events of each page, or of each downloaded chunk when streaming.
+
+    Raises:
+        RuntimeError: If a page cannot be fetched, so the range is not reported as complete.
+    """
+    last_time_scope = None
+    for page in range(max_pages):
+        data = build_range_form_data(date_from, date_to, str(page), last_time_scope)
+        if stream:
+            payload = {}
+            count = 0
+            try:
+                async for events in stream_page_async(CALENDAR_URL, HEADERS, data, payload):
+                    if events:
+                        count += len(events)
+                        yield events
+            except (httpx.HTTPError, RuntimeError, ValueError) as e:
+                raise RuntimeError(f"Failed to fetch page {page} for {date_from} - {date_to}: {e}") from e
+            if not count:
+                return
+        else:
+            payload = await fetch_page_async(CALENDAR_URL, HEADERS, data)
+            if payload is None:
+                raise RuntimeError(f"Failed to fetch page {page} for {date_from} - {date_to}")
+            html = payload.get('data')
+            events = parse_html(html) if html else []
+            if not events:
+                return
+            yield events
+        if not payload.get('bind_scroll_handler') or not payload.get('rows_num'):
+            return
+        last_time_scope = payload.get('last_time_scope')
+
+async def fetch_tab_async(tab, country_groups=1, skip_unchanged=False, processed=None, max_age=None):
+    """
+    Fetch and parse one calendar tab, optionally fanning countries out into parallel requests.
+
+    Args:
+        tab (str): The calendar tab to request.
+        country_groups (int): Number of parallel per-country-group requests.
+        skip_unchanged (bool): Skip bodies identical to the last ones parsed for the same request.
+        processed (list, optional): Collects the (key, body) pairs of the parsed pages instead of
+            marking them processed, so the caller can mark them once their events are stored.
+        max_age (float, optional): Caps the cache TTL of the tab, 0 always goes to the network.
 
     Returns:
-        list: A list of dictionaries containing event details.
-    """
-    soup = BeautifulSoup(html_content, 'html.parser')
-    events = []
-    current_date = None
-
-    # Iterate over rows in the HTML to extract event details
-    for row in soup.find_all(['tr', 'td'], {'class': ['js-event-item', 'theDay']}):
-        if 'theDay' in row.get('class', []):
-            current_date = row.get_text(strip=True)
-        elif 'js-event-item' in row.get('class', []):
-            row_html = str(row)
-            volatility = extract_volatility(row_html)
-            event = {
-                'Date': datetime.strptime(current_date, '%A, %B %d, %Y').strftime('%m/%d/%y'),
-                'Time': row.find('td', class_='js-time').get_text(strip=True) if row.find('td', class_='js-time') else None,
-                'Currency': row.find('td', class_='flagCur').get_text(strip=True) if row.find('td', class_='flagCur') else None,
-                'Volatility': volatility,
-                'Event': row.find('td', class_='event').get_text(strip=True) if row.find('td', class_='event') else None,
-                'Forecast': row.find('td', class_='fore').get_text(strip=True) if row.find('td', class_='fore') else None,
-                'Previous': row.find('td', class_='prev').get_text(strip=True) if row.find('td', class_='prev') else None,
-            }
-            events.append(event)
+        list: A list of dictionaries containing event details for the tab.
+    """
+    groups = split_countries(COUNTRIES, country_groups)
+    forms = [build_form_data(tab, group) for group in groups]
+    pages = await asyncio.gather(*(fetch_data_async(CALENDAR_URL, HEADERS, data, max_age) for data in forms))
+    cache = RESPONSE_CACHE
+    parsed = []
+    for data, html in zip(forms, pages):
+        if not html:
+            continue
+        if cache:
+            key = cache.key(CALENDAR_URL, data)
+            if skip_unchanged and cache.is_unchanged(key, html):
+                continue
+            if processed is None:
+                cache.mark_processed(key, html)
+            else:
+                processed.append((key, html))
+        parsed.append(parse_html(html))
+    events = merge_events(parsed)
+    if len(groups) > 1:
+        events.sort(key=_sort_key)
     return events
 
-def fetch_economic_events():
+async def fetch_economic_events_async(tabs=WEEK_TABS, country_groups=1, skip_unchanged=False, processed=None,
+                                      max_age=None):
+    """
+    Fetch economic events for several calendar tabs concurrently.
+
+    Args:
+        tabs (tuple): The calendar tabs to request. Defaults to this week and next week.
+        country_groups (int): Number of parallel per-country-group requests per tab.
+        skip_unchanged (bool): Leave out pages whose body did not change since they were last parsed.
+        processed (list, optional): Collects the (key, body) pairs of the parsed pages instead of
+            marking them processed.
+        max_age (float, optional): Caps the cache TTL of every tab, 0 always goes to the network.
+
+    Returns:
+        list: A list of dictionaries containing economic event details, without duplicates.
+    """
+    results = await asyncio.gather(*(fetch_tab_async(tab, country_groups, skip_unchanged, processed, max_age) for tab in tabs))
+    return merge_events(results)
+
+def fetch_economic_events(tabs=WEEK_TABS, country_groups=1, skip_unchanged=False, processed=None, max_age=None):
     """
     Fetch economic events data from the Investing.com economic calendar.
 
+    This is a blocking wrapper around fetch_economic_events_async, so all tabs
+    are requested at the same time over the shared connection pool.
+
+    Args:
+        tabs (tuple): The calendar tabs to request. Defaults to this week and next week.
+        country_groups (int): Number of parallel per-country-group requests per tab.
+        skip_unchanged (bool): Leave out pages whose body did not change since they were last
+            parsed, so an unchanged calendar returns an empty list and nothing needs storing.
+        processed (list, optional): Collects the (key, body) pairs of the parsed pages instead of
+            marking them processed. Pass them to mark_processed once the events are stored, so a
+            failed store does not make the retry skip them as unchanged.
+        max_age (float, optional): Caps the cache TTL of every tab, 0 always goes to the network.
+
     Returns:
         list: A list of dictionaries containing economic event details.
     """
+    pending = None if processed is None else []
     try:
-        url = "https://www.investing.com/economic-calendar/Service/getCalendarFilteredData"
-        headers = {
-            "Accept": "*/*",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-            "Cache-Control": "no-cache",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Origin": "https://www.investing.com",
-            "Pragma": "no-cache",
-            "Referer": "https://www.investing.com/economic-calendar/",
-            "Sec-CH-UA": '"Not/A;Brand";v="99", "Microsoft Edge";v="103", "Chromium";v="103"',
-            "Sec-CH-UA-Mobile": "?0",
-            "Sec-CH-UA-Platform": '"Windows"',
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-origin",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36",
-            "X-Requested-With": "XMLHttpRequest",
-        }
-        cookies = {
-            "PHPSESSID": "telbckiou16uufp5s2qd09hjsk",
-            "geoC": "BR",
-            "page_equity_viewed": "0",
-            "browser-session-counted": "true",
-            "user-browser-sessions": "1",
-            "adsFreeSalePopUp": "1",
-            "adBlockerNewUserDomains": "1719873801",
-            "gtmFired": "OK",
-            "nyxDorf": "MzQ%2BZTNlZDw0aGhlNzZkZT5lMTthMjsxMzBlbDE%2FZm0xZmM3b2M1M2MxPmNhaWVhYmRiYj5uYjY0PWI6NmVnNzM1PmczZ2RrNGdobA%3D%3D",
-            "udid": "a2bcb6d6a827d4f0c8a40b509bebfc97",
-            "smd": "a2bcb6d6a827d4f0c8a40b509bebfc97-1719873800",
-            "__cf_bm": "LgiKTZ_0yCSBLMRzRnvQGb.8Ll3Hb4hC6dSRgM0thyY-1719873801-1.0.1.1-rcgh3yYXQAmuR8W.eSdtHNrZnUskd6DtqLHhfuIhr710F72p3rz12awhmqZdXSs.vsiOZ20.fvf6kGlstf2DwDdj9M1zJyYSPD5JpcOOCRE",
-            "__cflb": "0H28vY1WcQgbwwJpSw5YiDRSJhpofbxeRRLrHXVwGLk",
-            "usprivacy": "1YNN",
-            "_gid": "GA1.2.1187722834.1719873897",
-            "_imntz_error": "0",
-            "cf_clearance": "pMZ1PhsuQCp.DisOWWk0YFPCpXuHdJEM6i0T1xDihSQ-1719873802-1.0.1.1-fCy3zIDGNe1DHIxiBWfmnpbng6c2WoH3AOMkJy2bVnEOmRnUH0UCDGHLYg_QNpizqfw.d_OsQLVr7zZoUyAo4w",
-            "_hjSessionUser_174945": "eyJpZCI6IjNiNjFhZTM5LTI1MGQtNWVkZC04ZDJiLTQwZTUxNmNiNDBmNSIsImNyZWF0ZWQiOjE3MTU5MDY2NzkxMjAsImV4aXN0aW5nIjp0cnVlfQ==",
-            "_hjSession_174945": "eyJpZCI6IjU2OTk2ZGFhLTkzYWEtNDZjMS04MDdlLTZmNDY5YzhhZjI4YSIsImMiOjE3MTk4NzM4OTc2NjEsInMiOjAsInIiOjAsInNiIjowLCJzciI6MCwic2UiOjAsImZzIjowLCJzcCI6MH0=",
-            "_ga": "GA1.1.1966211167.1719873897",
-            "__eventn_id": "a2bcb6d6a827d4f0c8a40b509bebfc97",
-            "OneTrustWPCCPAGoogleOptOut": "false",
-            "editionPostpone": "1719873903113",
-            "r_p_s_n": "1",
-            "reg_trk_ep": "exit popup banner",
-            "_cc_id": "4efdbc1d588793a09f80532ba4b8edfe",
-            "panoramaId_expiry": "1720478612700",
-            "panoramaId": "c56eb0a4c51e0dde4dd50475cca7185ca02c976eb81b2e083e31bb96de376b9e",
-            "panoramaIdType": "panoDevice",
-            "cto_bundle": "75gbl19UY3V5SWZRWXZJMk0mMExEdUZlWmNBM1gybHRGR2ZGeTB0Uk1rek9LMExyMFhFbFJ6amIwaUZhNzk3cnJncDVRTkZ4NjBoNU9OU2VaNkRwdW1hN0Zjck52U3RpNXZteGxBYTdkTFRYeVNJMFAzUUN5bm1odEpWRG9mMzRGTjE5Rg",
-            "gcc": "BR",
-            "gsc": "SP",
-            "invpc": "2",
-            "page_view_count": "2",
-            "lifetime_page_view_count": "1",
-            "reg_trk_ep": "google%20one%20tap",
-            "_hjHasCachedUserAttributes": "true",
-            "_ga_C4NDLGKVMK": "GS1.1.1719873897.1.1.1719874719.60.0.0",
-            "pm_score": "clear",
-        }
-
-        # Fetch data for this week and next week
-        data_this_week = {
-            "country[]": [
-                "25", "32", "6", "37", "72", "22", "17", "39", "14", "10",
-                "35", "43", "56", "36", "110", "11", "26", "12", "4", "5"
-            ],
-            "timeZone": "8",
-            "timeFilter": "timeRemain",
-            "currentTab": "thisWeek",
-            "limit_from": "0"
-        }
-
-        data_next_week = {
-            "country[]": [
-                "25", "32", "6", "37", "72", "22", "17", "39", "14", "10",
-                "35", "43", "56", "36", "110", "11", "26", "12", "4", "5"
-            ],
-            "timeZone": "8",
-            "timeFilter": "timeRemain",
-            "currentTab": "nextWeek",
-            "limit_from": "0"
-        }
-
-        # Fetch HTML content for both this week and next week
-        html_this_week = fetch_data(url, headers, cookies, data_this_week)
-        html_next_week = fetch_data(url, headers, cookies, data_next_week)
-
-        # Parse HTML content to extract events
-        events_this_week = parse_html(html_this_week) if html_this_week else []
-        events_next_week = parse_html(html_next_week) if html_next_week else []
-
-        # Combine events from both weeks
-        all_events = events_this_week + events_next_week
-
-        return all_events
+        events = run_async(fetch_economic_events_async(tabs, country_groups, skip_unchanged, pending, max_age))
     except Exception as e:
         print(f"An error occurred while fetching economic events: {e}")
         return []
+    if pending:
+        processed.extend(pending)
+    return events
+
+# Function to record calendar bodies whose events were stored
+def mark_processed(pages):
+    """
+    Mark fetched calendar bodies as processed, so unchanged copies are skipped next time.
+
+    Args:
+        pages (list): The (key, body) pairs collected by fetch_economic_events.
+    """
+    cache = RESPONSE_CACHE
+    if cache:
+        for key, body in pages:
+            cache.mark_processed(key, body)
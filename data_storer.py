@@ -1,59 +1,1569 @@
+import functools
+import hashlib
+import json
+import os
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from db_connection import get_connection, transaction
+from event_snapshots import (PYARROW_AVAILABLE, UNDATED_PARTITION, write_partition, remove_partitions,
+                             read_manifest, write_manifest, read_snapshot, export_snapshot)
+
+# Time zone of the stored Date/Time values; matches the timeZone id "8" sent by data_fetcher
+EVENTS_TIME_ZONE = ZoneInfo('America/New_York')
+
+# Columns that can be selected, filtered on and ordered by in query_events
+EVENT_COLUMNS = ['Date', 'Time', 'Currency', 'Volatility', 'Event', 'Forecast', 'Previous', 'Actual', 'Timestamp']
+
+# Fields upstream revises after an event is first published, covered by the RowHash of each row
+REVISED_COLUMNS = ['Volatility', 'Forecast', 'Previous', 'Actual']
+
+# Ordered volatility levels, so comparisons like >= 'Moderate' work on loaded frames
+VOLATILITY_DTYPE = pd.CategoricalDtype(['Low', 'Moderate', 'High'], ordered=True)
+
+# Low-cardinality text columns loaded as categoricals
+CATEGORICAL_COLUMNS = ['Date', 'Time', 'Currency', 'Event']
+
+# Columns stored as integer ids into a dimension table: column -> (dimension table, id column of events)
+DIMENSIONS = {'Currency': ('currencies', 'CurrencyId'), 'Event': ('event_types', 'EventId')}
+
+# Columns of the events table as stored, in the order of EVENT_COLUMNS
+STORED_COLUMNS = [DIMENSIONS[column][1] if column in DIMENSIONS else column for column in EVENT_COLUMNS]
+
+# Every column of the events table, as written by the upsert and copied into archives
+TABLE_COLUMNS = STORED_COLUMNS + ['RowHash']
+
+# Natural key of an event; NULL parts are folded to '' or 0 so they still collide
+NATURAL_KEY = "Date, IFNULL(Time, ''), IFNULL(CurrencyId, 0), IFNULL(EventId, 0)"
+
+# Upsert statement: insert new events, update the revisable fields of existing ones only when their hash changed.
+# {schema} is 'main' or the schema an archive is attached under.
+UPSERT_SQL = f'''INSERT INTO {{schema}}.events ({', '.join(TABLE_COLUMNS)})
+                 VALUES ({', '.join('?' * len(TABLE_COLUMNS))})
+                 ON CONFLICT({NATURAL_KEY}) DO UPDATE SET
+                     Volatility = excluded.Volatility,
+                     Forecast = excluded.Forecast,
+                     Previous = excluded.Previous,
+                     Actual = excluded.Actual,
+                     RowHash = excluded.RowHash
+                 WHERE RowHash IS NOT excluded.RowHash'''
+
+# Stored rowid and hash of the events matching a JSON array of natural keys, looked up through the unique key index
+STORED_HASHES_SQL = '''SELECT events.rowid, events.Date, IFNULL(events.Time, ''), IFNULL(events.CurrencyId, 0),
+                              IFNULL(events.EventId, 0), events.RowHash
+                       FROM json_each(?) AS incoming
+                       JOIN {schema}.events AS events ON events.Date = json_extract(incoming.value, '$[0]')
+                                  AND IFNULL(events.Time, '') = json_extract(incoming.value, '$[1]')
+                                  AND IFNULL(events.CurrencyId, 0) = json_extract(incoming.value, '$[2]')
+                                  AND IFNULL(events.EventId, 0) = json_extract(incoming.value, '$[3]')'''
+
+# Columns of the append-only revisions log, after Version and Change
+REVISION_COLUMNS = (['Date', 'Time', 'CurrencyId', 'EventId', 'Timestamp'] + REVISED_COLUMNS
+                    + ['Old' + column for column in REVISED_COLUMNS])
+
+# Day of an events row as 'YYYY-MM-DD' in the events time zone, from its Timestamp and the UTC offset in
+# effect at that moment; '' when the date could not be parsed
+ROLLUP_DAY_SQL = ("CASE WHEN {row}.Timestamp IS NULL THEN '' ELSE "
+                  "date({row}.Timestamp + (SELECT Offset FROM time_zone_offsets WHERE Start <= {row}.Timestamp "
+                  "ORDER BY Start DESC LIMIT 1), 'unixepoch') END")
+
+# Currency name of an events row, '' when it has none
+ROLLUP_CURRENCY_SQL = "IFNULL((SELECT Name FROM currencies WHERE Id = {row}.CurrencyId), '')"
+
+# Events with their currency and event names, for ad hoc SQL and tools reading the database directly
+NAMED_EVENTS_VIEW = '''CREATE VIEW IF NOT EXISTS named_events AS
+    SELECT events.Date, events.Time, currencies.Name AS Currency, events.Volatility, event_types.Name AS Event,
+           events.Forecast, events.Previous, events.Actual, events.Timestamp
+    FROM events
+    LEFT JOIN currencies ON currencies.Id = events.CurrencyId
+    LEFT JOIN event_types ON event_types.Id = events.EventId'''
+
+# Triggers keeping event_rollups in step with events, inside the transaction of each write.
+# NULL currencies and volatilities are counted under ''.
+ROLLUP_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS events_rollup_insert AFTER INSERT ON events BEGIN
+        INSERT INTO event_rollups (Day, Currency, Volatility, Count)
+        VALUES ({ROLLUP_DAY_SQL.format(row='NEW')}, {ROLLUP_CURRENCY_SQL.format(row='NEW')}, IFNULL(NEW.Volatility, ''), 1)
+        ON CONFLICT(Day, Currency, Volatility) DO UPDATE SET Count = Count + 1;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS events_rollup_delete AFTER DELETE ON events BEGIN
+        UPDATE event_rollups SET Count = Count - 1
+        WHERE Day = {ROLLUP_DAY_SQL.format(row='OLD')} AND Currency = {ROLLUP_CURRENCY_SQL.format(row='OLD')} AND Volatility = IFNULL(OLD.Volatility, '');
+        DELETE FROM event_rollups
+        WHERE Day = {ROLLUP_DAY_SQL.format(row='OLD')} AND Currency = {ROLLUP_CURRENCY_SQL.format(row='OLD')} AND Volatility = IFNULL(OLD.Volatility, '')
+          AND Count <= 0;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS events_rollup_update AFTER UPDATE OF Date, CurrencyId, Volatility, Timestamp ON events BEGIN
+        UPDATE event_rollups SET Count = Count - 1
+        WHERE Day = {ROLLUP_DAY_SQL.format(row='OLD')} AND Currency = {ROLLUP_CURRENCY_SQL.format(row='OLD')} AND Volatility = IFNULL(OLD.Volatility, '');
+        INSERT INTO event_rollups (Day, Currency, Volatility, Count)
+        VALUES ({ROLLUP_DAY_SQL.format(row='NEW')}, {ROLLUP_CURRENCY_SQL.format(row='NEW')}, IFNULL(NEW.Volatility, ''), 1)
+        ON CONFLICT(Day, Currency, Volatility) DO UPDATE SET Count = Count + 1;
+        DELETE FROM event_rollups
+        WHERE Day = {ROLLUP_DAY_SQL.format(row='OLD')} AND Currency = {ROLLUP_CURRENCY_SQL.format(row='OLD')} AND Volatility = IFNULL(OLD.Volatility, '')
+          AND Count <= 0;
+    END''',
+]
+
+# Triggers adding every new (event, currency) pair to event_series, and each new series to the full-text index.
+# Missing events and currencies are recorded as id 0.
+SERIES_TRIGGER = '''CREATE TRIGGER IF NOT EXISTS events_series_insert AFTER INSERT ON events BEGIN
+    INSERT OR IGNORE INTO event_series (EventId, CurrencyId) VALUES (IFNULL(NEW.EventId, 0), IFNULL(NEW.CurrencyId, 0));
+END'''
+SEARCH_TRIGGER = '''CREATE TRIGGER IF NOT EXISTS event_series_search AFTER INSERT ON event_series BEGIN
+    INSERT INTO event_search (rowid, Event, Currency)
+    VALUES (NEW.Id, (SELECT Name FROM event_types WHERE Id = NEW.EventId), (SELECT Name FROM currencies WHERE Id = NEW.CurrencyId));
+END'''
+
+def _fts5_available():
+    """
+    Check whether the SQLite library was built with the FTS5 extension.
+    """
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute('CREATE VIRTUAL TABLE search_check USING fts5(Name)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+FTS5_AVAILABLE = _fts5_available()
+
+# Serializes snapshot refreshes within the process
+SNAPSHOT_LOCK = threading.Lock()
+# UTC offsets of the events time zone, computed on first use by zone_offsets
+_zone_offsets = None
+
+# In-memory copies of the dimension tables: {(db_name, column): (ids by name, names by id)}
+_dimensions = {}
+_dimensions_lock = threading.Lock()
+
+# Function to convert a stored Date/Time pair into a UTC epoch timestamp
+def event_timestamp(date_str, time_str):
+    """
+    Convert an event's Date and Time into a UTC epoch timestamp.
+
+    Times that are not in HH:MM format, such as 'All Day' or 'Tentative', map to
+    the start of the day.
+
+    Parameters:
+    date_str (str): The event date in '%m/%d/%y' format.
+    time_str (str): The event time in '%H:%M' format, or any other label.
+
+    Returns:
+    int: Seconds since the epoch, or None if the date cannot be parsed.
+    """
+    try:
+        day = datetime.strptime(date_str, '%m/%d/%y').date()
+    except (TypeError, ValueError):
+        return None
+    try:
+        moment = datetime.strptime(time_str, '%H:%M').time()
+    except (TypeError, ValueError):
+        moment = time(0, 0)
+    return int(datetime.combine(day, moment, EVENTS_TIME_ZONE).timestamp())
+
+# Function to name the month of an event
+def event_month(timestamp):
+    """
+    Return the month of an event in the events time zone, which names its archive and snapshot partition.
+
+    Parameters:
+    timestamp (int): The event Timestamp, None when the date could not be parsed.
+
+    Returns:
+    str: 'YYYY-MM', or UNDATED_PARTITION.
+    """
+    if timestamp is None:
+        return UNDATED_PARTITION
+    # The events time zone is a whole number of hours from UTC, so a month always starts on an hour
+    return _hour_month(timestamp // 3600)
+
+@functools.lru_cache(maxsize=65536)
+def _hour_month(hour):
+    return datetime.fromtimestamp(hour * 3600, EVENTS_TIME_ZONE).strftime('%Y-%m')
+
+# Function to convert a date range into the matching Timestamp bounds
+def day_bounds(start_date, end_date):
+    """
+    Return the half-open Timestamp range covering whole days in the events time zone.
+
+    Parameters:
+    start_date (date): The first day of the range.
+    end_date (date): The last day of the range, inclusive.
+
+    Returns:
+    tuple: (start, end) epoch seconds, to be used as start <= Timestamp < end.
+    """
+    start = datetime.combine(start_date, time(0, 0), EVENTS_TIME_ZONE)
+    end = datetime.combine(end_date + timedelta(days=1), time(0, 0), EVENTS_TIME_ZONE)
+    return int(start.timestamp()), int(end.timestamp())
+
+# Function to list the UTC offsets of the events time zone
+def zone_offsets():
+    """
+    Return the UTC offsets of the events time zone and the moments they take effect.
+
+    Dates are parsed with a two-digit year, so every Timestamp falls between
+    1969 and 2068; the list covers those years, and its first offset also
+    applies to anything earlier.
+
+    Returns:
+    list of tuple: (start, offset) pairs in epoch seconds, in start order.
+    """
+    global _zone_offsets
+    if _zone_offsets is None:
+        def offset(moment):
+            return int(datetime.fromtimestamp(moment, EVENTS_TIME_ZONE).utcoffset().total_seconds())
+
+        start = int(datetime(1969, 1, 1, tzinfo=timezone.utc).timestamp())
+        end = int(datetime(2069, 1, 1, tzinfo=timezone.utc).timestamp())
+        pairs = [(-2**62, offset(start))]
+        # Offsets change at most twice a year, so check once a day and search the day of each change
+        for moment in range(start + 86400, end, 86400):
+            if offset(moment) != pairs[-1][1]:
+                low, high = moment - 86400, moment
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if offset(middle) == pairs[-1][1]:
+                        low = middle
+                    else:
+                        high = middle
+                pairs.append((high, offset(high)))
+        _zone_offsets = pairs
+    return _zone_offsets
+
+# Function to compute the content hash of an event's revisable fields
+def row_hash(values):
+    """
+    Return a 64-bit hash of the revisable fields of an event.
+
+    Two rows of the same event have the same hash exactly when their
+    Volatility, Forecast, Previous and Actual values are all equal, so an
+    upstream revision is detected by comparing one integer.
+
+    Parameters:
+    values (tuple): The values of REVISED_COLUMNS, None for missing ones.
+
+    Returns:
+    int: The hash, as a signed 64-bit integer SQLite can store.
+    """
+    digest = hashlib.blake2b(json.dumps(list(values)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+# Function to add the normalized Timestamp column and its index
+def migrate_timestamp(conn):
+    """
+    Add the indexed Timestamp column and fill it for rows that do not have one yet.
+
+    Parameters:
+    conn (sqlite3.Connection): An open connection to the database.
+    """
+    c = conn.cursor()
+    columns = [row[1] for row in c.execute('PRAGMA table_info(events)')]
+    if 'Timestamp' not in columns:
+        c.execute('ALTER TABLE events ADD COLUMN Timestamp INTEGER')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (Timestamp)')
+    rows = c.execute('SELECT rowid, Date, Time FROM events WHERE Timestamp IS NULL').fetchall()
+    c.executemany('UPDATE events SET Timestamp = ? WHERE rowid = ?',
+                  [(event_timestamp(date_str, time_str), rowid) for rowid, date_str, time_str in rows])
+
+# Function to add the Actual and RowHash columns
+def migrate_row_hash(conn, schema='main'):
+    """
+    Add the Actual and RowHash columns, filling the hash of every row when the column is new.
+
+    Parameters:
+    conn (sqlite3.Connection): An open connection to the database.
+    schema (str): The schema of the events table. Default is 'main'.
+    """
+    c = conn.cursor()
+    columns = [row[1] for row in c.execute(f'PRAGMA {schema}.table_info(events)')]
+    if 'Actual' not in columns:
+        c.execute(f'ALTER TABLE {schema}.events ADD COLUMN Actual TEXT')
+    if 'RowHash' in columns:
+        return
+    c.execute(f'ALTER TABLE {schema}.events ADD COLUMN RowHash INTEGER')
+    rows = c.execute(f"SELECT rowid, {', '.join(REVISED_COLUMNS)} FROM {schema}.events").fetchall()
+    c.executemany(f'UPDATE {schema}.events SET RowHash = ? WHERE rowid = ?', [(row_hash(row[1:]), row[0]) for row in rows])
+
+# Function to add the unique natural key index, removing duplicates left by older versions first
+def migrate_unique_key(conn):
+    """
+    Create the unique index on the natural key of the events table.
+
+    Databases written before the index existed can hold duplicate events, so
+    duplicates are removed first, keeping the most recently inserted row of
+    each event. Does nothing if the index already exists.
+
+    Parameters:
+    conn (sqlite3.Connection): An open connection to the database.
+    """
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_events_natural_key'")
+    if c.fetchone():
+        return
+    c.execute(f'''DELETE FROM events WHERE rowid NOT IN
+                  (SELECT MAX(rowid) FROM events GROUP BY {NATURAL_KEY})''')
+    c.execute(f'CREATE UNIQUE INDEX idx_events_natural_key ON events ({NATURAL_KEY})')
+
+# Function to add the rollup table and the triggers that maintain it
+def migrate_rollups(conn):
+    """
+    Create the event_rollups table, fill it from the stored events when it is new, and create its triggers.
+
+    event_rollups holds the number of events per day, currency and volatility
+    level. Triggers on events keep it current in the same transaction as every
+    insert, update and delete, so aggregate queries never scan the events. The
+    day of an event is its Timestamp's date in the events time zone, read
+    through the time_zone_offsets table. Rollups of databases created before
+    that table existed took the day from the two-digit-year Date, so they are
+    counted again with new triggers.
+
+    Parameters:
+    conn (sqlite3.Connection): An open connection to the database.
+
+    Returns:
+    bool: True when the rollups were counted again and the archived months need recounting too.
+    """
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='time_zone_offsets'")
+    recount = not c.fetchone()
+    if recount:
+        c.execute('CREATE TABLE time_zone_offsets (Start INTEGER PRIMARY KEY, Offset INTEGER NOT NULL)')
+        c.executemany('INSERT INTO time_zone_offsets (Start, Offset) VALUES (?, ?)', zone_offsets())
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_rollups'")
+    if not c.fetchone():
+        c.execute('''CREATE TABLE event_rollups
+                     (Day TEXT, Currency TEXT, Volatility TEXT, Count INTEGER,
+                      PRIMARY KEY (Day, Currency, Volatility))''')
+        recount = True
+    elif recount:
+        for trigger in ('events_rollup_insert', 'events_rollup_delete', 'events_rollup_update'):
+            c.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        c.execute('DELETE FROM event_rollups')
+    if recount:
+        c.execute(f'''INSERT INTO event_rollups (Day, Currency, Volatility, Count)
+                      SELECT {ROLLUP_DAY_SQL.format(row='events')}, {ROLLUP_CURRENCY_SQL.format(row='events')},
+                             IFNULL(Volatility, ''), COUNT(*)
+                      FROM events GROUP BY 1, 2, 3''')
+    for trigger in ROLLUP_TRIGGERS:
+        c.execute(trigger)
+    return recount
+
+# Function to add the full-text index over event names
+def migrate_search(conn):
+    """
+    Create the event_series table and, when SQLite has FTS5, the event_search index and their triggers.
+
+    event_series holds every distinct (event, currency) pair once, and
+    event_search indexes the names of each pair, so a text search reads a
+    few thousand index entries instead of every event. Both are filled from
+    the stored events when they are new.
+
+    Parameters:
+    conn (sqlite3.Connection): An open connection to the database.
+
+    Returns:
+    bool: True if event_series was created, so archived events still need to be added.
+    """
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_series'")
+    created = not c.fetchone()
+    c.execute('''CREATE TABLE IF NOT EXISTS event_series
+                 (Id INTEGER PRIMARY KEY, EventId INTEGER NOT NULL, CurrencyId INTEGER NOT NULL, UNIQUE (EventId, CurrencyId))''')
+    if FTS5_AVAILABLE:
+        c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_search'")
+        if not c.fetchone():
+            # Prefix indexes make queries like 'Payroll*' as fast as whole words
+            c.execute("CREATE VIRTUAL TABLE event_search USING fts5(Event, Currency, prefix='2 3')")
+            c.execute('''INSERT INTO event_search (rowid, Event, Currency)
+                         SELECT event_series.Id, event_types.Name, currencies.Name FROM event_series
+                         LEFT JOIN event_types ON event_types.Id = event_series.EventId
+                         LEFT JOIN currencies ON currencies.Id = event_series.CurrencyId''')
+        c.execute(SEARCH_TRIGGER)
+    c.execute(SERIES_TRIGGER)
+    if created:
+        c.execute('''INSERT OR IGNORE INTO event_series (EventId, CurrencyId)
+                     SELECT DISTINCT IFNULL(EventId, 0), IFNULL(CurrencyId, 0) FROM events''')
+    return created
+
+# Function to replace the Currency and Event names of the events table with dimension ids
+def migrate_dimensions(conn, schema='main'):
+    """
+    Move the Currency and Event names of an events table into the dimension tables.
+
+    Tables written before the dimension tables existed store both names as
+    text on every row. Their names are added to currencies and event_types,
+    and the table is rebuilt with CurrencyId and EventId columns, keeping
+    each row's rowid. Indexes and triggers go with the old table, so they are
+    created again afterwards. Does nothing if the table already stores ids.
+
+    Parameters:
+    conn (sqlite3.Connection): An open connection to the database, holding the dimension tables in main.
+    schema (str): The schema of the events table, e.g. an attached archive. Default is 'main'.
+    """
+    c = conn.cursor()
+    columns = [row[1] for row in c.execute(f'PRAGMA {schema}.table_info(events)')]
+    if 'CurrencyId' in columns:
+        return
+    for column, (table, id_column) in DIMENSIONS.items():
+        c.execute(f'''INSERT OR IGNORE INTO main.{table} (Name)
+                      SELECT DISTINCT {column} FROM {schema}.events WHERE {column} IS NOT NULL ORDER BY {column}''')
+    c.execute(f'''CREATE TABLE {schema}.events_normalized
+                  (Date TEXT, Time TEXT, CurrencyId INTEGER, Volatility TEXT, EventId INTEGER, Forecast TEXT, Previous TEXT,
+                   Timestamp INTEGER)''')
+    c.execute(f'''INSERT INTO {schema}.events_normalized
+                  (rowid, Date, Time, CurrencyId, Volatility, EventId, Forecast, Previous, Timestamp)
+                  SELECT events.rowid, events.Date, events.Time, currencies.Id, events.Volatility, event_types.Id,
+                         events.Forecast, events.Previous, events.Timestamp
+                  FROM {schema}.events AS events
+                  LEFT JOIN main.currencies AS currencies ON currencies.Name = events.Currency
+                  LEFT JOIN main.event_types AS event_types ON event_types.Name = events.Event''')
+    c.execute(f'DROP TABLE {schema}.events')
+    c.execute(f'ALTER TABLE {schema}.events_normalized RENAME TO events')
 
 # Function to create the events table if it does not exist
 def create_table(db_name='economic_events.db'):
     """
     Create the events table if it does not exist.
 
+    Currency and Event names are stored once in the currencies and event_types
+    dimension tables and referenced from events by integer id. Their
+    combinations are indexed for full-text search in event_search. Every row
+    carries a RowHash of its revisable fields, and each insert or revision is
+    appended to the event_revisions log under the data version that wrote it.
+
     Parameters:
     db_name (str): The name of the database file. Default is 'economic_events.db'.
     """
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS events
-                 (Date TEXT, Time TEXT, Currency TEXT, Volatility TEXT, Event TEXT, Forecast TEXT, Previous TEXT)''')
-    conn.commit()
-    conn.close()
+    # The file may be new, so the in-memory dimension copies are read again on next use
+    with _dimensions_lock:
+        for column in DIMENSIONS:
+            _dimensions.pop((db_name, column), None)
+    with transaction(db_name) as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS events
+                     (Date TEXT, Time TEXT, CurrencyId INTEGER, Volatility TEXT, EventId INTEGER, Forecast TEXT,
+                      Previous TEXT, Timestamp INTEGER, Actual TEXT, RowHash INTEGER)''')
+        for table, id_column in DIMENSIONS.values():
+            c.execute(f'CREATE TABLE IF NOT EXISTS {table} (Id INTEGER PRIMARY KEY, Name TEXT NOT NULL UNIQUE)')
+        migrate_timestamp(conn)
+        migrate_dimensions(conn)
+        migrate_row_hash(conn)
+        migrate_unique_key(conn)
+        c.execute('CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (Timestamp)')
+        recount_archives = migrate_rollups(conn)
+        index_archives = migrate_search(conn)
+        c.execute('CREATE INDEX IF NOT EXISTS idx_events_currency_timestamp ON events (CurrencyId, Timestamp)')
+        # History of one event type
+        c.execute('CREATE INDEX IF NOT EXISTS idx_events_event_timestamp ON events (EventId, Timestamp)')
+        # Views created before the Actual column existed are replaced
+        view_columns = [row[1] for row in c.execute('PRAGMA table_info(named_events)')]
+        if view_columns and 'Actual' not in view_columns:
+            c.execute('DROP VIEW named_events')
+        c.execute(NAMED_EVENTS_VIEW)
+        c.execute('CREATE TABLE IF NOT EXISTS metadata (Key TEXT PRIMARY KEY, Value INTEGER)')
+        c.execute("INSERT OR IGNORE INTO metadata (Key, Value) VALUES ('data_version', 0)")
+        # Months moved out of events into archive databases, with their Timestamp range
+        c.execute('CREATE TABLE IF NOT EXISTS archives (Month TEXT PRIMARY KEY, Start INTEGER NOT NULL, End INTEGER NOT NULL)')
+        # Append-only log of inserted and revised events, read by get_revisions_since
+        c.execute(f'''CREATE TABLE IF NOT EXISTS event_revisions
+                      (Version INTEGER NOT NULL, Change TEXT NOT NULL, Date TEXT, Time TEXT, CurrencyId INTEGER,
+                       EventId INTEGER, Timestamp INTEGER, {', '.join(column + ' TEXT' for column in REVISION_COLUMNS[5:])})''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_event_revisions_version ON event_revisions (Version)')
+    # Archives written by older versions still store names or lack the RowHash column, and their rollups may
+    # still hold days read from the two-digit-year Date
+    for month in get_archives(db_name=db_name):
+        _migrate_archive(month, db_name)
+        if recount_archives:
+            _attach_archives(get_connection(db_name), [month], db_name)
+            with transaction(db_name) as conn:
+                _recount_month_rollups(conn.cursor(), month, _archive_schema(month), db_name)
+        if index_archives:
+            pairs = get_connection(archive_path(month, db_name)).execute(
+                'SELECT DISTINCT IFNULL(EventId, 0), IFNULL(CurrencyId, 0) FROM events').fetchall()
+            with transaction(db_name) as conn:
+                conn.executemany('INSERT OR IGNORE INTO event_series (EventId, CurrencyId) VALUES (?, ?)', pairs)
+
+# Function to name the archive directory of a database
+def archive_dir(db_name='economic_events.db'):
+    """
+    Return the directory holding the per-month archive databases of a database.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    str: The directory, next to the database file.
+    """
+    return f"{os.path.splitext(db_name)[0]}_archive"
+
+# Function to name the archive database of a month
+def archive_path(month, db_name='economic_events.db'):
+    """
+    Return the archive database file of a month.
+
+    Parameters:
+    month (str): The month as 'YYYY-MM'.
+    db_name (str): The name of the main database file. Default is 'economic_events.db'.
+
+    Returns:
+    str: The archive database file.
+    """
+    return os.path.join(archive_dir(db_name), f"{month}.db")
+
+# Function to convert a month into the matching Timestamp bounds
+def month_bounds(month):
+    """
+    Return the half-open Timestamp range of a month in the events time zone.
+
+    Parameters:
+    month (str): The month as 'YYYY-MM'.
+
+    Returns:
+    tuple: (start, end) epoch seconds, to be used as start <= Timestamp < end.
+    """
+    year, number = map(int, month.split('-'))
+    first = date(year, number, 1)
+    last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return day_bounds(first, last)
+
+# Function to create the events table of an archive database
+def create_archive_table(db_name):
+    """
+    Create the events table of an archive database, with the indexes of the main table and no triggers.
+
+    Archives have no dimension tables: their CurrencyId and EventId refer to the main database's.
+
+    Parameters:
+    db_name (str): The name of the archive database file.
+    """
+    with transaction(db_name) as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS events
+                        (Date TEXT, Time TEXT, CurrencyId INTEGER, Volatility TEXT, EventId INTEGER, Forecast TEXT,
+                         Previous TEXT, Timestamp INTEGER, Actual TEXT, RowHash INTEGER)''')
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_events_natural_key ON events ({NATURAL_KEY})')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (Timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_events_currency_timestamp ON events (CurrencyId, Timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_events_event_timestamp ON events (EventId, Timestamp)')
+
+def _migrate_archive(month, db_name):
+    """
+    Bring an archive written by an older version up to the current layout.
+
+    Names are moved into the main database's dimension tables, then the Actual
+    and RowHash columns are added.
+    """
+    path = archive_path(month, db_name)
+    columns = [row[1] for row in get_connection(path).execute('PRAGMA table_info(events)')]
+    if 'RowHash' in columns:
+        return
+    if 'CurrencyId' not in columns:
+        schema = _attach_archives(get_connection(db_name), [month], db_name)[0]
+        with transaction(db_name) as conn:
+            migrate_dimensions(conn, schema)
+    with transaction(path) as conn:
+        migrate_row_hash(conn)
+    create_archive_table(path)
+
+# Function to list the archived months
+def get_archives(start_date=None, end_date=None, db_name='economic_events.db'):
+    """
+    Retrieve the archived months, optionally only those overlapping a date range.
+
+    Parameters:
+    start_date (date): The first day of the range.
+    end_date (date): The last day of the range, inclusive.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    list of str: The months as 'YYYY-MM', oldest first.
+    """
+    clauses = []
+    params = []
+    if start_date is not None:
+        clauses.append('End > ?')
+        params.append(day_bounds(start_date, start_date)[0])
+    if end_date is not None:
+        clauses.append('Start < ?')
+        params.append(day_bounds(end_date, end_date)[1])
+    where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    rows = get_connection(db_name).execute(f'SELECT Month FROM archives{where_sql} ORDER BY Month', params)
+    return [row[0] for row in rows]
+
+def _archive_schema(month):
+    """
+    Return the name an archive is attached under.
+    """
+    return 'archive_' + month.replace('-', '_')
+
+# Function to attach the archives a query reads
+def _attach_archives(conn, months, db_name):
+    """
+    Attach the archives of the given months to a connection, detaching other archives to make room.
+
+    Returns:
+    list of str: The schema names of the archives.
+    """
+    schemas = {_archive_schema(month): month for month in months}
+    attached = [row[1] for row in conn.execute('PRAGMA database_list') if row[1].startswith('archive_')]
+    for schema in attached:
+        if schema not in schemas:
+            conn.execute(f'DETACH DATABASE {schema}')
+    for schema, month in schemas.items():
+        if schema not in attached:
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (archive_path(month, db_name),))
+    return list(schemas)
+
+# Function to group the partitions a date range touches
+def _partition_groups(start_date=None, end_date=None, db_name='economic_events.db'):
+    """
+    Yield the schemas holding the events of a date range, attaching the archives they need.
+
+    The first group holds the main table and the oldest archives overlapping
+    the range. When the archives do not fit within SQLite's limit on attached databases, they are
+    yielded in groups, each attached in turn, and the caller combines the
+    results of the groups.
+
+    Yields:
+    list of tuple: (part, schema) pairs, where part numbers the partitions across every group.
+    """
+    months = get_archives(start_date, end_date, db_name)
+    conn = get_connection(db_name)
+    size = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    for index in range(0, max(len(months), 1), size):
+        group = months[index:index + size]
+        schemas = _attach_archives(conn, group, db_name) if group else []
+        parts = [(index + part, schema) for part, schema in enumerate(schemas)]
+        # The main table holds the newest months, so it is numbered after the archives
+        yield ([(len(months), 'main')] if index == 0 else []) + parts
+
+def _load_dimension(conn, column):
+    """
+    Read a dimension table into (ids by name, names by id) maps.
+    """
+    ids = dict(conn.execute(f'SELECT Name, Id FROM {DIMENSIONS[column][0]}').fetchall())
+    return ids, {dimension_id: name for name, dimension_id in ids.items()}
+
+def _dimension(column, db_name, reload=False):
+    """
+    Return the in-memory copy of a dimension table, reading it on first use or when asked to reload.
+    """
+    key = (db_name, column)
+    with _dimensions_lock:
+        maps = _dimensions.get(key)
+    if maps is None or reload:
+        maps = _load_dimension(get_connection(db_name), column)
+        with _dimensions_lock:
+            _dimensions[key] = maps
+    return maps
+
+# Function to look up the ids of stored names
+def lookup_ids(column, names, db_name='economic_events.db'):
+    """
+    Return the dimension ids of the given names, skipping names that were never stored.
+
+    The dimension table is read again once when a name is missing from the
+    in-memory copy, since another process may have added it.
+
+    Parameters:
+    column (str): 'Currency' or 'Event'.
+    names (list of str): The names to look up.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    list of int: The ids of the known names, in the order of names.
+    """
+    ids = _dimension(column, db_name)[0]
+    if any(name not in ids for name in names):
+        ids = _dimension(column, db_name, reload=True)[0]
+    return [ids[name] for name in names if name in ids]
+
+# Function to look up the names of dimension ids
+def lookup_names(column, ids, db_name='economic_events.db'):
+    """
+    Return the names of the given dimension ids, reading the dimension table again if an id is unknown.
+
+    Parameters:
+    column (str): 'Currency' or 'Event'.
+    ids (iterable of int): The ids to look up.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    dict: The name of each id.
+    """
+    ids = set(ids)
+    names = _dimension(column, db_name)[1]
+    if not ids.issubset(names):
+        names = _dimension(column, db_name, reload=True)[1]
+    return {dimension_id: names[dimension_id] for dimension_id in ids}
+
+def _intern(column, names, db_name):
+    """
+    Return the ids by name of a dimension once it holds every given name, adding the new names in their own transaction.
+
+    The dimension tables only ever grow, so names added for a write that then
+    fails are harmless, and ids never change once they are in the in-memory copy.
+    """
+    ids = _dimension(column, db_name)[0]
+    missing = sorted(name for name in names if name is not None and name not in ids)
+    if not missing:
+        return ids
+    with transaction(db_name) as conn:
+        conn.executemany(f'INSERT OR IGNORE INTO {DIMENSIONS[column][0]} (Name) VALUES (?)', [(name,) for name in missing])
+    return _dimension(column, db_name, reload=True)[0]
+
+def _decode_dimension(values, column, db_name):
+    """
+    Turn a column of dimension ids into a categorical of their names, built straight from the codes.
+
+    The categories are the names present, sorted, as astype('category') would give.
+    """
+    ids = pd.to_numeric(values).fillna(0).astype('int64').to_numpy()
+    present = np.unique(ids)
+    present = present[present > 0]
+    names = lookup_names(column, present.tolist(), db_name)
+    order = sorted(present.tolist(), key=names.__getitem__)
+    # Position of each id among the sorted names; id 0 stands for a missing value
+    codes = np.full(ids.max(initial=0) + 1, -1, dtype='int64')
+    codes[order] = np.arange(len(order))
+    return pd.Categorical.from_codes(codes[ids], [names[dimension_id] for dimension_id in order])
 
 # Function to store events in the database
 def store_events(events, db_name='economic_events.db'):
     """
     Store events in the database.
 
+    All events are upserted in a single transaction. New events are inserted and
+    existing events get their Volatility, Forecast, Previous and Actual values
+    updated when their RowHash shows they changed upstream; every insert and
+    update is appended to the event_revisions log. Events of archived months are upserted into
+    their archive database in the same transaction. The data version is bumped whenever a row
+    changes, and the snapshot partitions of the months in the batch are
+    refreshed after the commit.
+
     Parameters:
     events (list of dict): A list of events, where each event is a dictionary containing event details.
     db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    dict: The number of 'inserted' and 'updated' events.
     """
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-    
-    # Add only new events
-    for event in events:
-        c.execute('''SELECT * FROM events WHERE Date=? AND Time=? AND Currency=? AND Event=?''',
-                  (event['Date'], event['Time'], event['Currency'], event['Event']))
-        if not c.fetchone():
-            c.execute('INSERT INTO events (Date, Time, Currency, Volatility, Event, Forecast, Previous) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                      (event['Date'], event['Time'], event['Currency'], event['Volatility'], event['Event'], event['Forecast'], event['Previous']))
-    
-    conn.commit()
-    conn.close()
+    return store_event_batches([events], db_name)[0]
+
+# Function to store several batches of events in one transaction
+def store_event_batches(batches, db_name='economic_events.db'):
+    """
+    Store several batches of events in one transaction, counting the changes of each batch.
+
+    Batches are upserted in order, so each one sees the rows of the batches
+    before it, exactly as consecutive store_events calls would, but the write
+    lock, the data version bump and the snapshot refresh are paid once.
+    Currency and Event names are resolved to their dimension ids through the
+    in-memory interning maps; only names never seen before touch the
+    dimension tables. The hash of each event is compared with the stored
+    RowHash before anything is written, so unchanged events cost one index
+    lookup and no write. The archives of the archived months in the batches
+    are attached to the same transaction, so a failed write leaves neither
+    the archives nor the main table changed.
+
+    Parameters:
+    batches (list of list of dict): The batches of events.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    list of dict: The number of 'inserted' and 'updated' events of each batch.
+    """
+    currencies = _intern('Currency', {event['Currency'] for events in batches for event in events}, db_name)
+    event_types = _intern('Event', {event['Event'] for events in batches for event in events}, db_name)
+    # Events of archived months go to their archive, the rest to the main table
+    archived = set(get_archives(db_name=db_name))
+    hot_rows = [[] for _ in batches]
+    cold_rows = {}
+    partitions = set()
+    for index, events in enumerate(batches):
+        for event in events:
+            # Events from older callers may carry no Actual value
+            revised = (event['Volatility'], event['Forecast'], event['Previous'], event.get('Actual'))
+            row = (event['Date'], event['Time'], currencies.get(event['Currency']), event['Volatility'],
+                   event_types.get(event['Event']), event['Forecast'], event['Previous'], event.get('Actual'),
+                   event_timestamp(event['Date'], event['Time']), row_hash(revised))
+            month = event_month(row[8])
+            partitions.add(month)
+            if month in archived:
+                cold_rows.setdefault(month, [[] for _ in batches])[index].append(row)
+            else:
+                hot_rows[index].append(row)
+    # Every archive written by a transaction is attached to it, so a call touching more archived months than
+    # SQLite can attach is written in several transactions; almost every call touches at most one
+    months = sorted(cold_rows)
+    size = get_connection(db_name).getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    groups = [months[index:index + size] for index in range(0, len(months), size)] or [[]]
+    changes = [0] * len(batches)
+    inserted = [0] * len(batches)
+    data_version = None
+    for number, group in enumerate(groups):
+        # The main table is written with the last group
+        group_hot = hot_rows if number == len(groups) - 1 else [[] for _ in batches]
+        group_changes, group_inserted, group_version = _write_rows(group_hot, {month: cold_rows[month] for month in group}, db_name)
+        changes = [total + count for total, count in zip(changes, group_changes)]
+        inserted = [total + count for total, count in zip(inserted, group_inserted)]
+        data_version = group_version or data_version
+    if data_version is not None:
+        # Rewrite the snapshot months these batches touched, now that the rows are committed
+        refresh_snapshots(db_name, partitions, data_version)
+    return [{'inserted': batch_inserted, 'updated': batch_changes - batch_inserted}
+            for batch_changes, batch_inserted in zip(changes, inserted)]
+
+def _write_rows(hot_rows, cold_rows, db_name):
+    """
+    Upsert the rows of every batch into the main table and the archives of their months in one transaction.
+
+    The archives are attached to the main database's connection, so the
+    archive rows, the main rows, the rollups, the revisions log and the data
+    version bump commit or roll back together.
+
+    Returns:
+    tuple: (changes, inserts) per batch, and the new data version or None if nothing changed.
+    """
+    conn = get_connection(db_name)
+    # ATTACH is not allowed inside a transaction
+    schemas = dict(zip(cold_rows, _attach_archives(conn, list(cold_rows), db_name))) if cold_rows else {}
+    changes = [0] * len(hot_rows)
+    inserted = [0] * len(hot_rows)
+    revisions = []
+    changed_months = []
+    with transaction(db_name) as conn:
+        c = conn.cursor()
+        for month, month_batches in cold_rows.items():
+            month_changed = False
+            for index, rows in enumerate(month_batches):
+                batch_revisions = _upsert_rows(c, rows, schemas[month])
+                changes[index] += len(batch_revisions)
+                inserted[index] += sum(change == 'insert' for change, row, old in batch_revisions)
+                revisions.extend(batch_revisions)
+                month_changed = month_changed or bool(batch_revisions)
+            if month_changed:
+                changed_months.append(month)
+        for index, rows in enumerate(hot_rows):
+            batch_revisions = _upsert_rows(c, rows)
+            changes[index] += len(batch_revisions)
+            inserted[index] += sum(change == 'insert' for change, row, old in batch_revisions)
+            revisions.extend(batch_revisions)
+        # Archives have no triggers, so their months' rollups are recounted and their series added here
+        for month in changed_months:
+            _recount_month_rollups(c, month, schemas[month], db_name)
+        c.executemany('INSERT OR IGNORE INTO event_series (EventId, CurrencyId) VALUES (?, ?)',
+                      {(row[4] or 0, row[2] or 0) for month in changed_months for rows in cold_rows[month] for row in rows})
+        if not any(changes):
+            return changes, inserted, None
+        # Bump the data version in the same transaction so cached reads see the change
+        c.execute("UPDATE metadata SET Value = Value + 1 WHERE Key = 'data_version'")
+        data_version = c.execute("SELECT Value FROM metadata WHERE Key = 'data_version'").fetchone()[0]
+        c.executemany(f"INSERT INTO event_revisions (Version, Change, {', '.join(REVISION_COLUMNS)}) "
+                      f"VALUES ({', '.join('?' * (len(REVISION_COLUMNS) + 2))})",
+                      [(data_version, change, row[0], row[1], row[2], row[4], row[8], row[3], row[5], row[6], row[7])
+                       + (old or (None,) * len(REVISED_COLUMNS)) for change, row, old in revisions])
+    return changes, inserted, data_version
+
+def _upsert_rows(c, rows, schema='main'):
+    """
+    Upsert the rows whose hash differs from the stored one into the events table of a schema of the cursor's connection.
+
+    The stored rowid and RowHash of every key in the batch are read in one
+    query through the unique key index; only rows that are new or changed are
+    written, and only the changed rows have their previous values read.
+
+    Returns:
+    list of tuple: (change, row, old values) of every row written, in order;
+        change is 'insert' or 'update', and old values is None for inserts.
+    """
+    if not rows:
+        return []
+    if not c.connection.in_transaction:
+        # Take the write lock before reading the stored hashes, so no other writer changes them before the upsert
+        c.execute('BEGIN IMMEDIATE')
+    keys = [(row[0], row[1] or '', row[2] or 0, row[4] or 0) for row in rows]
+    stored = {tuple(found[1:5]): (found[0], found[5])
+              for found in c.execute(STORED_HASHES_SQL.format(schema=schema), (json.dumps(list(set(keys))),))}
+    hashes = {key: stored_hash for key, (rowid, stored_hash) in stored.items()}
+    # Values of the rows written earlier in this batch, which later rows of the same event revise
+    written = {}
+    writes = []
+    for key, row in zip(keys, rows):
+        # A NULL Date never matches the unique key, so such rows are always new
+        if key[0] is not None and key in hashes:
+            if hashes[key] == row[9]:
+                continue
+            writes.append(('update', row, written.get(key), key))
+        else:
+            writes.append(('insert', row, None, key))
+        if key[0] is not None:
+            hashes[key] = row[9]
+            written[key] = (row[3], row[5], row[6], row[7])
+    if not writes:
+        return []
+    rowids = [stored[key][0] for change, row, old, key in writes if change == 'update' and old is None]
+    previous = {found[0]: found[1:] for found in c.execute(
+        f"SELECT rowid, {', '.join(REVISED_COLUMNS)} FROM {schema}.events WHERE rowid IN (SELECT value FROM json_each(?))",
+        (json.dumps(rowids),))}
+    c.executemany(UPSERT_SQL.format(schema=schema), [row for change, row, old, key in writes])
+    return [(change, row, old if change == 'insert' or old is not None else previous[stored[key][0]])
+            for change, row, old, key in writes]
+
+def _recount_month_rollups(c, month, schema, db_name):
+    """
+    Replace the rollups of an archived month with counts read from its archive, attached under schema.
+    """
+    counts = c.execute(
+        f"""SELECT {ROLLUP_DAY_SQL.format(row='events')}, CurrencyId, IFNULL(Volatility, ''), COUNT(*)
+            FROM {schema}.events AS events GROUP BY 1, 2, 3"""
+    ).fetchall()
+    names = lookup_names('Currency', [currency_id for day, currency_id, volatility, count in counts if currency_id], db_name)
+    c.execute('DELETE FROM event_rollups WHERE Day LIKE ?', (month + '-%',))
+    c.executemany('INSERT INTO event_rollups (Day, Currency, Volatility, Count) VALUES (?, ?, ?, ?)',
+                  [(day, names.get(currency_id, ''), volatility, count) for day, currency_id, volatility, count in counts])
+
+# Function to read the data version bumped by every write
+def get_data_version(db_name='economic_events.db'):
+    """
+    Retrieve the data version, a counter bumped by every store_events call that changes rows.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    int: The current data version.
+    """
+    row = get_connection(db_name).execute("SELECT Value FROM metadata WHERE Key = 'data_version'").fetchone()
+    return row[0] if row else 0
+
+# Function to read the inserts and revisions committed after a data version
+def get_revisions_since(version=0, db_name='economic_events.db'):
+    """
+    Retrieve the events inserted or revised after a data version, from the append-only event_revisions log.
+
+    Each row is one change: the event, its values after the change and, for
+    an 'update', its values before. A consumer polls with the largest Version
+    it has seen instead of reading the events table again.
+
+    Parameters:
+    version (int): The data version already seen. Default returns the whole log.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    pandas.DataFrame: Version, Change, the EVENT_COLUMNS of the event and the Old values of REVISED_COLUMNS,
+        in the order the changes were written.
+    """
+    old_columns = ', '.join(f'event_revisions.Old{column}' for column in REVISED_COLUMNS)
+    df = pd.read_sql_query(
+        f'''SELECT event_revisions.Version, event_revisions.Change, event_revisions.Date, event_revisions.Time,
+                   currencies.Name AS Currency, event_revisions.Volatility, event_types.Name AS Event,
+                   event_revisions.Forecast, event_revisions.Previous, event_revisions.Actual, event_revisions.Timestamp,
+                   {old_columns}
+            FROM event_revisions
+            LEFT JOIN currencies ON currencies.Id = event_revisions.CurrencyId
+            LEFT JOIN event_types ON event_types.Id = event_revisions.EventId
+            WHERE event_revisions.Version > ?
+            ORDER BY event_revisions.Version, event_revisions.rowid''',
+        get_connection(db_name), params=(version,)
+    )
+    df = to_compact_frame(df)
+    df['OldVolatility'] = df['OldVolatility'].astype(VOLATILITY_DTYPE)
+    return df
+
+# Function to convert a loaded frame to compact, typed columns
+def to_compact_frame(df):
+    """
+    Convert the columns of a loaded events frame to memory-efficient types.
+
+    Date, Time, Currency and Event become categoricals, Volatility becomes an
+    ordered categorical (Low < Moderate < High) and Timestamp becomes a UTC
+    datetime64 column. Forecast and Previous stay as strings.
+
+    Parameters:
+    df (pandas.DataFrame): A frame loaded from the events table.
+
+    Returns:
+    pandas.DataFrame: The same frame with converted columns.
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    if 'Volatility' in df:
+        df['Volatility'] = df['Volatility'].astype(VOLATILITY_DTYPE)
+    if 'Timestamp' in df:
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='s', utc=True)
+    return df
 
 # Function to retrieve events from the database
 def get_events(db_name='economic_events.db'):
     """
-    Retrieve events from the database.
+    Retrieve events from the database, including archived months.
 
     Parameters:
     db_name (str): The name of the database file. Default is 'economic_events.db'.
 
     Returns:
-    pandas.DataFrame: A DataFrame containing all events from the database.
+    pandas.DataFrame: A DataFrame containing all events from the database, with compact column types.
     """
-    conn = sqlite3.connect(db_name)
-    df = pd.read_sql_query('SELECT * FROM events', conn)
-    conn.close()
-    return df
+    return query_events(order_by=None, db_name=db_name)
+
+# Function to build the WHERE clause shared by the query functions
+def _build_filters(currencies=None, volatilities=None, start_date=None, end_date=None, event_names=None, resolve=None):
+    """
+    Build a parameterized WHERE clause from the event filters.
+
+    Parameters:
+    currencies (list): Currencies to keep. None keeps all of them.
+    volatilities (list): Volatility levels to keep; None inside the list matches events without one.
+    start_date (date): The first day to keep.
+    end_date (date): The last day to keep, inclusive.
+    event_names (list): Event names to keep. None keeps all of them.
+    resolve (callable): Maps a column and a list of names to dimension ids. When given, currencies and
+        event names are compared by id on CurrencyId and EventId, as stored in the SQLite events table.
+
+    Returns:
+    tuple: (where_sql, params), where where_sql is empty when there is nothing to filter.
+    """
+    clauses = []
+    params = []
+    for column, names in (('Currency', currencies), ('Event', event_names)):
+        if names is not None:
+            values = list(names)
+            if resolve is not None:
+                column, values = DIMENSIONS[column][1], resolve(column, values)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else '0')
+            params.extend(values)
+    if volatilities is not None:
+        values = [value for value in volatilities if value is not None]
+        parts = [f"Volatility IN ({', '.join('?' * len(values))})"] if values else []
+        if len(values) != len(list(volatilities)):
+            parts.append('Volatility IS NULL')
+        clauses.append(f"({' OR '.join(parts)})" if parts else '0')
+        params.extend(values)
+    if start_date is not None:
+        clauses.append('Timestamp >= ?')
+        params.append(day_bounds(start_date, start_date)[0])
+    if end_date is not None:
+        clauses.append('Timestamp < ?')
+        params.append(day_bounds(end_date, end_date)[1])
+    where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where_sql, params
+
+# Function to build the WHERE clause of rollup queries
+def _build_rollup_filters(currencies=None, volatilities=None, start_date=None, end_date=None):
+    """
+    Build a parameterized WHERE clause over event_rollups with the semantics of _build_filters.
+
+    Parameters:
+    currencies (list): Currencies to keep. None keeps all of them.
+    volatilities (list): Volatility levels to keep; None inside the list matches events without one.
+    start_date (date): The first day to keep.
+    end_date (date): The last day to keep, inclusive.
+
+    Returns:
+    tuple: (where_sql, params), where where_sql is empty when there is nothing to filter.
+    """
+    clauses = []
+    params = []
+    for column, values in (('Currency', currencies), ('Volatility', volatilities)):
+        if values is not None:
+            values = ['' if value is None else value for value in values]
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else '0')
+            params.extend(values)
+    if start_date is not None or end_date is not None:
+        # Events without a Timestamp are counted under Day '' and never match a date range
+        clauses.append("Day != ''")
+    if start_date is not None:
+        clauses.append('Day >= ?')
+        params.append(start_date.isoformat())
+    if end_date is not None:
+        clauses.append('Day <= ?')
+        params.append(end_date.isoformat())
+    where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where_sql, params
+
+# Function to find the event series matching a text search
+def search_series(search, db_name='economic_events.db'):
+    """
+    Return the (event, currency) pairs whose names match a full-text query.
+
+    With FTS5 the query uses its syntax: words match whole tokens in any
+    order, 'Payroll*' matches a prefix, '"Nonfarm Payrolls"' a phrase, and
+    'Currency:USD' restricts a word to one column; OR and NOT combine terms.
+    Without FTS5, every word of the query must appear in the event or
+    currency name, ignoring case.
+
+    Parameters:
+    search (str): The query.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    list of tuple: (EventId, CurrencyId) pairs, with 0 standing for a missing event or currency.
+
+    Raises:
+    ValueError: If the query is not valid FTS5 syntax.
+    """
+    conn = get_connection(db_name)
+    if FTS5_AVAILABLE:
+        try:
+            return conn.execute('''SELECT event_series.EventId, event_series.CurrencyId FROM event_search
+                                   JOIN event_series ON event_series.Id = event_search.rowid
+                                   WHERE event_search MATCH ?''', (search,)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {search!r}: {e}") from e
+    words = [word.strip('"*').lower() for word in search.split()]
+    rows = conn.execute('''SELECT event_series.EventId, event_series.CurrencyId,
+                                 lower(IFNULL(event_types.Name, '') || ' ' || IFNULL(currencies.Name, '')) FROM event_series
+                          LEFT JOIN event_types ON event_types.Id = event_series.EventId
+                          LEFT JOIN currencies ON currencies.Id = event_series.CurrencyId''')
+    return [(event_id, currency_id) for event_id, currency_id, text in rows if all(word in text for word in words)]
+
+def _stored_filters(currencies=None, volatilities=None, start_date=None, end_date=None, event_names=None, search=None,
+                    db_name='economic_events.db'):
+    """
+    Build the WHERE clause of _build_filters over the stored events table, with names resolved to dimension ids
+    and the events of the series matching search kept.
+    """
+    where_sql, params = _build_filters(currencies, volatilities, start_date, end_date, event_names,
+                                       resolve=lambda column, names: lookup_ids(column, names, db_name))
+    if search and search.strip():
+        pairs = search_series(search, db_name)
+        event_ids = sorted({event_id for event_id, currency_id in pairs})
+        # The list of event ids lets SQLite use the (EventId, Timestamp) index, the pairs then keep the right currencies.
+        # Events without a name are only matched through IFNULL, which cannot use the index.
+        event_sql = 'IFNULL(EventId, 0)' if 0 in event_ids else 'EventId'
+        clause = (f'''({event_sql} IN (SELECT value FROM json_each(?)) AND (IFNULL(EventId, 0), IFNULL(CurrencyId, 0)) IN
+                      (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)))'''
+                  if pairs else '0')
+        where_sql = f"{where_sql} AND {clause}" if where_sql else f" WHERE {clause}"
+        if pairs:
+            params = params + [json.dumps(event_ids), json.dumps(pairs)]
+    return where_sql, params
+
+def _select_column(column):
+    """
+    Return the select expression of an events column, reading dimension ids under the column's name.
+    """
+    return f"{DIMENSIONS[column][1]} AS {column}" if column in DIMENSIONS else column
+
+def _order_column(column, stored):
+    """
+    Return the ORDER BY expression of an events column; dimension columns sort by name rather than by id.
+    """
+    if column not in DIMENSIONS:
+        return column
+    table, id_column = DIMENSIONS[column]
+    return f"(SELECT Name FROM main.{table} WHERE Id = {id_column if stored else column})"
+
+def _check_columns(columns):
+    """
+    Validate column names against EVENT_COLUMNS before they are placed in SQL.
+    """
+    unknown = [column for column in columns if column not in EVENT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown event columns: {unknown}")
+    return list(columns)
+
+# Function to query events with filters pushed down to SQL
+def query_events(currencies=None, volatilities=None, start_date=None, end_date=None, columns=None,
+                 order_by='Timestamp', descending=False, limit=None, offset=None, event_names=None, search=None,
+                 db_name='economic_events.db'):
+    """
+    Retrieve events matching the given filters with a single parameterized query.
+
+    Filtering, projection, ordering and paging all run in SQLite, so the cost
+    depends on the number of rows returned rather than on the size of the table.
+    Archived months overlapping the date range are attached and read through
+    one UNION ALL with the main table; the others are not read at all.
+    Currency and Event are read as dimension ids and turned into categoricals
+    straight from the codes, and filtering on them compares integers.
+
+    Parameters:
+    currencies (list): Currencies to keep. None keeps all of them.
+    volatilities (list): Volatility levels to keep; None inside the list matches events without one.
+    start_date (date): The first day to keep.
+    end_date (date): The last day to keep, inclusive.
+    columns (list): Columns to return. Default returns every column in EVENT_COLUMNS.
+    order_by (str or list): Column(s) to order by. Default is 'Timestamp'.
+    descending (bool): Sort in descending order. Default is False.
+    limit (int): Maximum number of rows to return.
+    offset (int): Number of rows to skip.
+    event_names (list): Event names to keep, e.g. to read the history of one release. None keeps all of them.
+    search (str): Full-text query on the event and currency names, see search_series. None keeps every event.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    pandas.DataFrame: A DataFrame containing the matching events, with compact column types.
+
+    Raises:
+    ValueError: If a column or order_by name is not in EVENT_COLUMNS, or the search query is not valid.
+    """
+    selected = _check_columns(columns or EVENT_COLUMNS)
+    where_sql, params = _stored_filters(currencies, volatilities, start_date, end_date, event_names, search, db_name)
+    order_columns = _check_columns([order_by] if isinstance(order_by, str) else order_by) if order_by else []
+    direction = ' DESC' if descending else ''
+    paged = limit is not None or offset is not None
+    select_sql = ', '.join(_select_column(column) for column in selected)
+    frames = []
+    for parts in _partition_groups(start_date, end_date, db_name):
+        if parts == [(0, 'main')]:
+            sql = f"SELECT {select_sql} FROM events{where_sql}"
+            # rowid breaks ties so consecutive pages neither repeat nor skip rows
+            ties = ['rowid']
+            part_params = list(params)
+        else:
+            # Rows of the main table and the attached archives, tagged so ties still break the same way
+            sql = 'SELECT * FROM (' + ' UNION ALL '.join(
+                f"SELECT {select_sql}, {part} AS Part, rowid AS RowId FROM {schema}.events{where_sql}"
+                for part, schema in parts
+            ) + ')'
+            ties = ['Part', 'RowId']
+            part_params = params * len(parts)
+        if order_columns:
+            sql += ' ORDER BY ' + ', '.join(_order_column(column, ties == ['rowid']) + direction
+                                            for column in order_columns) + ''.join(f', {tie}{direction}' for tie in ties)
+        if paged and len(frames) == 0 and ties == ['rowid']:
+            sql += ' LIMIT ? OFFSET ?'
+            part_params += [-1 if limit is None else int(limit), int(offset or 0)]
+        elif paged and limit is not None:
+            # A page may take rows from any group, so each group returns every row up to the end of the page
+            sql += ' LIMIT ?'
+            part_params.append(int(offset or 0) + int(limit))
+        frames.append(pd.read_sql_query(sql, get_connection(db_name), params=part_params))
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    for column in DIMENSIONS:
+        if column in df:
+            # Categories sorted by name, so sorting the frame below orders by name as SQLite did
+            df[column] = _decode_dimension(df[column], column, db_name)
+    if 'Part' not in df:
+        return to_compact_frame(df)
+    if order_columns and len(frames) > 1:
+        # SQLite sorts NULLs as the smallest values
+        df = df.sort_values(order_columns + ['Part', 'RowId'], ascending=not descending,
+                            na_position='last' if descending else 'first', kind='stable', ignore_index=True)
+    if paged:
+        start = int(offset or 0)
+        df = df.iloc[start:None if limit is None else start + int(limit)].reset_index(drop=True)
+        for column in DIMENSIONS:
+            if column in df:
+                df[column] = df[column].cat.remove_unused_categories()
+    return to_compact_frame(df.drop(columns=['Part', 'RowId']))
+
+# Function to count the events matching the filters
+def count_events(currencies=None, volatilities=None, start_date=None, end_date=None, search=None, db_name='economic_events.db'):
+    """
+    Count the events matching the given filters, to size the pages of a paged view.
+
+    The rollup table answers the count unless a search is given, in which
+    case the matching events are counted through the search index.
+
+    Parameters:
+    currencies (list): Currencies to keep. None keeps all of them.
+    volatilities (list): Volatility levels to keep; None inside the list matches events without one.
+    start_date (date): The first day to keep.
+    end_date (date): The last day to keep, inclusive.
+    search (str): Full-text query on the event and currency names, see search_series.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    int: The number of matching events.
+
+    Raises:
+    ValueError: If the search query is not valid.
+    """
+    if search and search.strip():
+        where_sql, params = _stored_filters(currencies, volatilities, start_date, end_date, search=search, db_name=db_name)
+        total = 0
+        for parts in _partition_groups(start_date, end_date, db_name):
+            for part, schema in parts:
+                total += get_connection(db_name).execute(f"SELECT COUNT(*) FROM {schema}.events{where_sql}", params).fetchone()[0]
+        return total
+    where_sql, params = _build_rollup_filters(currencies, volatilities, start_date, end_date)
+    return get_connection(db_name).execute(f"SELECT IFNULL(SUM(Count), 0) FROM event_rollups{where_sql}", params).fetchone()[0]
+
+# Function to read event counts from the rollup table
+def query_rollups(currencies=None, volatilities=None, start_date=None, end_date=None, group_by=('Currency', 'Volatility'),
+                  db_name='economic_events.db'):
+    """
+    Count the events matching the filters per group, reading the rollup table instead of the events.
+
+    The cost depends on the number of days, currencies and volatility levels
+    in the range rather than on the number of events.
+
+    Parameters:
+    currencies (list): Currencies to keep. None keeps all of them.
+    volatilities (list): Volatility levels to keep; None inside the list matches events without one.
+    start_date (date): The first day to keep.
+    end_date (date): The last day to keep, inclusive.
+    group_by (list): Columns to group by, from 'Day', 'Currency' and 'Volatility'. Default is ('Currency', 'Volatility').
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    pandas.DataFrame: The group_by columns plus Count, with None for missing currencies and volatilities.
+
+    Raises:
+    ValueError: If a group_by column is not a rollup column.
+    """
+    group_by = list(group_by)
+    unknown = [column for column in group_by if column not in ('Day', 'Currency', 'Volatility')]
+    if unknown:
+        raise ValueError(f"Unknown rollup columns: {unknown}")
+    where_sql, params = _build_rollup_filters(currencies, volatilities, start_date, end_date)
+    select_sql = ', '.join(group_by + ['SUM(Count) AS Count'])
+    group_sql = f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ''
+    df = pd.read_sql_query(f"SELECT {select_sql} FROM event_rollups{where_sql}{group_sql}", get_connection(db_name), params=params)
+    for column in ('Currency', 'Volatility'):
+        if column in df:
+            df[column] = df[column].where(df[column] != '', None)
+    return df[df['Count'].notna()].reset_index(drop=True)
+
+# Function to retrieve the distinct values of a column for filter options
+def get_distinct_values(column, start_date=None, end_date=None, db_name='economic_events.db'):
+    """
+    Retrieve the distinct values of a column, optionally within a date range.
+
+    Parameters:
+    column (str): The column to read, e.g. 'Currency' or 'Volatility'.
+    start_date (date): The first day to consider.
+    end_date (date): The last day to consider, inclusive.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    list: The distinct values in ascending order.
+    """
+    column = _check_columns([column])[0]
+    where_sql, params = _build_filters(start_date=start_date, end_date=end_date)
+    stored = STORED_COLUMNS[EVENT_COLUMNS.index(column)]
+    values = set()
+    for parts in _partition_groups(start_date, end_date, db_name):
+        union = ' UNION '.join(f"SELECT {stored} FROM {schema}.events{where_sql}" for part, schema in parts)
+        values.update(row[0] for row in get_connection(db_name).execute(union, params * len(parts)))
+    if column in DIMENSIONS:
+        names = lookup_names(column, values - {None}, db_name)
+        values = {names.get(value) for value in values}
+    # Same order as ORDER BY: NULL first, then ascending values
+    return sorted(values, key=lambda value: (value is not None, value))
+
+# Function to retrieve events within a date range
+def get_events_between(start_date, end_date, db_name='economic_events.db'):
+    """
+    Retrieve events whose Timestamp falls within a date range, using the Timestamp index.
+
+    Parameters:
+    start_date (date): The first day of the range.
+    end_date (date): The last day of the range, inclusive.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    pandas.DataFrame: A DataFrame containing the events in the range, in chronological order.
+    """
+    return query_events(start_date=start_date, end_date=end_date, db_name=db_name)
+
+# Function to retrieve the first and last event dates
+def get_date_bounds(db_name='economic_events.db'):
+    """
+    Retrieve the dates of the earliest and latest stored events.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    tuple: (first_date, last_date) as dates in the events time zone, or (None, None) if there are no events.
+    """
+    sql = 'SELECT MIN(Timestamp), MAX(Timestamp) FROM events'
+    bounds = [get_connection(db_name).execute(sql).fetchone()]
+    months = get_archives(db_name=db_name)
+    # Archives hold whole months, so the oldest and newest ones bound every archived event
+    for month in sorted(set(months[:1] + months[-1:])):
+        bounds.append(get_connection(archive_path(month, db_name)).execute(sql).fetchone())
+    firsts = [first for first, last in bounds if first is not None]
+    if not firsts:
+        return None, None
+    first, last = min(firsts), max(last for first, last in bounds if last is not None)
+    return (datetime.fromtimestamp(first, EVENTS_TIME_ZONE).date(),
+            datetime.fromtimestamp(last, EVENTS_TIME_ZONE).date())
+
+# Function to find the next event at or after a point in time
+def get_next_event_timestamp(after, volatilities=None, db_name='economic_events.db'):
+    """
+    Retrieve the Timestamp of the first event at or after a point in time.
+
+    Parameters:
+    after (int): Epoch seconds to search from.
+    volatilities (list): Volatility levels to consider. None considers every event.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    int: The event's epoch seconds, or None if there is no such event.
+    """
+    where_sql, params = _build_filters(volatilities=volatilities)
+    # Only months older than the hot window are archived, so upcoming events are always in the main table
+    where_sql = f"{where_sql} AND Timestamp >= ?" if where_sql else " WHERE Timestamp >= ?"
+    row = get_connection(db_name).execute(f"SELECT MIN(Timestamp) FROM events{where_sql}", params + [int(after)]).fetchone()
+    return row[0]
+
+# Function to name the snapshot directory of a database
+def snapshot_dir(db_name='economic_events.db'):
+    """
+    Return the directory holding the columnar snapshot of a database.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    str: The directory, next to the database file.
+    """
+    return f"{os.path.splitext(db_name)[0]}_snapshots"
+
+def _named_rows(rows, db_name):
+    """
+    Replace the dimension ids of stored events rows with their names.
+    """
+    currencies = lookup_names('Currency', {row[2] for row in rows} - {None}, db_name)
+    event_types = lookup_names('Event', {row[4] for row in rows} - {None}, db_name)
+    return [(row[0], row[1], currencies.get(row[2]), row[3], event_types.get(row[4])) + row[5:] for row in rows]
+
+# Function to read the rows of one snapshot partition
+def _partition_rows(partition, archived, db_name):
+    """
+    Return the events rows of a month partition, in Timestamp order, from the main table or the month's archive.
+    """
+    columns = ', '.join(STORED_COLUMNS)
+    if partition == UNDATED_PARTITION:
+        rows = get_connection(db_name).execute(f'SELECT {columns} FROM events WHERE Timestamp IS NULL ORDER BY rowid').fetchall()
+    else:
+        source = get_connection(archive_path(partition, db_name) if partition in archived else db_name)
+        rows = source.execute(f'SELECT {columns} FROM events WHERE Timestamp >= ? AND Timestamp < ? ORDER BY Timestamp, rowid',
+                              month_bounds(partition)).fetchall()
+    return _named_rows(rows, db_name)
+
+# Function to rewrite every snapshot partition in one pass over the events
+def _rebuild_snapshot(archived, directory, db_name):
+    """
+    Write every month partition from a single scan of the main table in Timestamp order
+    plus one read per archive, and remove the partitions left empty.
+    """
+    written = set()
+    for month in sorted(archived):
+        write_partition(directory, month, _partition_rows(month, archived, db_name))
+        written.add(month)
+    cursor = get_connection(db_name).execute(f"SELECT {', '.join(STORED_COLUMNS)} FROM events ORDER BY Timestamp, rowid")
+    partition, rows = None, []
+    for row in cursor:
+        name = event_month(row[8])
+        if name != partition:
+            if rows:
+                write_partition(directory, partition, _named_rows(rows, db_name))
+                written.add(partition)
+            partition, rows = name, []
+        rows.append(row)
+    if rows:
+        write_partition(directory, partition, _named_rows(rows, db_name))
+        written.add(partition)
+    remove_partitions(directory, written)
+
+# Function to bring the columnar snapshot up to date
+def refresh_snapshots(db_name='economic_events.db', partitions=None, data_version=None):
+    """
+    Refresh the columnar snapshot of the events table.
+
+    The snapshot is one Arrow IPC file per month (plus one for undated events)
+    in snapshot_dir(db_name), and a manifest with the data version it matches.
+    Given the partitions a commit touched and the data version it produced,
+    only those months are rewritten, provided the snapshot was current just
+    before that commit; otherwise every partition is rebuilt. A manifest that
+    does not match the data version is never trusted by readers, so a refresh
+    that fails or races with another writer only costs a rebuild later.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    partitions (set of str): The partitions to rewrite. Default rebuilds every partition.
+    data_version (int): The data version produced by the commit. Default is the current one.
+
+    Returns:
+    bool: True if the snapshot was refreshed, False if pyarrow is missing or the refresh failed.
+    """
+    if not PYARROW_AVAILABLE:
+        return False
+    directory = snapshot_dir(db_name)
+    try:
+        with SNAPSHOT_LOCK:
+            if data_version is None:
+                data_version = get_data_version(db_name)
+            archived = set(get_archives(db_name=db_name))
+            if partitions is None or read_manifest(directory) != data_version - 1:
+                _rebuild_snapshot(archived, directory, db_name)
+            else:
+                for partition in sorted(partitions):
+                    write_partition(directory, partition, _partition_rows(partition, archived, db_name))
+            write_manifest(directory, data_version)
+        return True
+    except Exception as e:
+        print(f"Error refreshing the snapshot of {db_name}: {e}")
+        return False
+
+# Function to make sure the snapshot matches the database
+def _current_snapshot(db_name):
+    """
+    Return the snapshot directory once it matches the data version, or None if it cannot be refreshed.
+    """
+    directory = snapshot_dir(db_name)
+    if read_manifest(directory) == get_data_version(db_name) or refresh_snapshots(db_name):
+        return directory
+    return None
+
+# Function to load every event from the columnar snapshot
+def load_snapshot_events(db_name='economic_events.db'):
+    """
+    Load every event from the memory-mapped columnar snapshot.
+
+    The Arrow files are mapped rather than read, and the dictionary-encoded
+    columns convert straight into categoricals, so no row goes through the
+    sqlite3 cursor. A missing or stale snapshot is rebuilt first. Without
+    pyarrow the events are read with query_events instead.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    pandas.DataFrame: Every event in Timestamp order, with the compact column types of query_events.
+    """
+    directory = _current_snapshot(db_name) if PYARROW_AVAILABLE else None
+    if directory is None:
+        return query_events(db_name=db_name)
+    df = read_snapshot(directory).to_pandas(split_blocks=True, self_destruct=True)
+    # Sort the categories like astype('category') does, so the frame matches one loaded by query_events
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    return to_compact_frame(df)
+
+# Function to export every event from the columnar snapshot
+def export_events(sink, fmt='arrow', db_name='economic_events.db'):
+    """
+    Stream every event into a file, one snapshot record batch at a time.
+
+    Parameters:
+    sink (str or file-like): Path or writable binary file to write to.
+    fmt (str): 'arrow' for an Arrow IPC stream, or 'csv'.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Raises:
+    ImportError: If pyarrow is not installed.
+    RuntimeError: If the snapshot could not be refreshed.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Exporting events requires the pyarrow package.")
+    directory = _current_snapshot(db_name)
+    if directory is None:
+        raise RuntimeError(f"The snapshot of {db_name} could not be refreshed.")
+    export_snapshot(directory, sink, fmt)
 
 # Initialize the database and create the table if it does not exist
 create_table()
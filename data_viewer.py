@@ -1,9 +1,6 @@
-import sqlite3
 import pandas as pd
+from db_connection import get_connection
 
 # Function to retrieve events from the database
 def get_events():
-    conn = sqlite3.connect('economic_events.db')
-    df = pd.read_sql_query('SELECT * FROM events', conn)
-    conn.close()
-    return df
+    return pd.read_sql_query('SELECT * FROM named_events', get_connection('economic_events.db'))
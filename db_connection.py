@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas applied to every new connection
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 20000
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Connections are reused per thread, keyed by database file name
+_local = threading.local()
+
+def _configure(conn):
+    """
+    Apply the WAL journal and performance pragmas to a new connection.
+
+    Parameters:
+    conn (sqlite3.Connection): The connection to configure.
+    """
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+# Function to get the calling thread's connection to a database
+def get_connection(db_name='economic_events.db'):
+    """
+    Return the calling thread's connection to a database, opening it on first use.
+
+    Connections run in WAL mode with synchronous=NORMAL, so readers in other
+    threads are not blocked while the background fetch writes.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Returns:
+    sqlite3.Connection: The reused connection.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_name)
+    if conn is None:
+        conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            _configure(conn)
+        except Exception:
+            conn.close()
+            raise
+        connections[db_name] = conn
+    return conn
+
+# Function to run statements in a transaction on the calling thread's connection
+@contextmanager
+def transaction(db_name='economic_events.db'):
+    """
+    Context manager that yields the thread's connection inside a transaction.
+
+    The transaction is committed on success and rolled back on error.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+
+    Yields:
+    sqlite3.Connection: The connection running the transaction.
+    """
+    conn = get_connection(db_name)
+    with conn:
+        yield conn
+
+# Function to close the calling thread's connections
+def close_connections(db_name=None):
+    """
+    Close the calling thread's connections.
+
+    Parameters:
+    db_name (str): Close only the connection to this database. Default closes all of them.
+    """
+    connections = getattr(_local, 'connections', {})
+    names = [db_name] if db_name else list(connections)
+    for name in names:
+        conn = connections.pop(name, None)
+        if conn is not None:
+            conn.close()
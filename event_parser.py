@@ -0,0 +1,328 @@
+from bs4 import BeautifulSoup
+from datetime import datetime
+from html.parser import HTMLParser
+
+# lxml is optional; without it the BeautifulSoup backend is used
+try:
+    from lxml import etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Date format of the theDay headers and the format events are stored with
+DAY_HEADER_FORMAT = '%A, %B %d, %Y'
+EVENT_DATE_FORMAT = '%m/%d/%y'
+
+# Cell class -> event field, read in a single pass over each row
+CELL_FIELDS = {
+    'js-time': 'Time',
+    'flagCur': 'Currency',
+    'event': 'Event',
+    'fore': 'Forecast',
+    'prev': 'Previous',
+    'act': 'Actual',
+}
+
+def extract_volatility(cell_html):
+    """
+    Extract the volatility level from the HTML content of a cell.
+
+    Args:
+        cell_html (str): The HTML content of the cell.
+
+    Returns:
+        str or None: Volatility level if found, None otherwise.
+    """
+    if 'High Volatility Expected' in cell_html:
+        return 'High'
+    if 'Moderate Volatility Expected' in cell_html:
+        return 'Moderate'
+    if 'Low Volatility Expected' in cell_html:
+        return 'Low'
+    return None
+
+def parse_html_bs4(html_content):
+    """
+    Parse HTML content with BeautifulSoup to extract economic events.
+
+    This is the reference backend; other backends must produce the same events.
+
+    Args:
+        html_content (str): HTML content to parse.
+
+    Returns:
+        list: A list of dictionaries containing event details.
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    events = []
+    current_date = None
+
+    # Iterate over rows in the HTML to extract event details
+    for row in soup.find_all(['tr', 'td'], {'class': ['js-event-item', 'theDay']}):
+        if 'theDay' in row.get('class', []):
+            current_date = row.get_text(strip=True)
+        elif 'js-event-item' in row.get('class', []):
+            row_html = str(row)
+            volatility = extract_volatility(row_html)
+            event = {
+                'Date': datetime.strptime(current_date, DAY_HEADER_FORMAT).strftime(EVENT_DATE_FORMAT),
+                'Time': row.find('td', class_='js-time').get_text(strip=True) if row.find('td', class_='js-time') else None,
+                'Currency': row.find('td', class_='flagCur').get_text(strip=True) if row.find('td', class_='flagCur') else None,
+                'Volatility': volatility,
+                'Event': row.find('td', class_='event').get_text(strip=True) if row.find('td', class_='event') else None,
+                'Forecast': row.find('td', class_='fore').get_text(strip=True) if row.find('td', class_='fore') else None,
+                'Previous': row.find('td', class_='prev').get_text(strip=True) if row.find('td', class_='prev') else None,
+                'Actual': row.find('td', class_='act').get_text(strip=True) if row.find('td', class_='act') else None,
+            }
+            events.append(event)
+    return events
+
+def _stripped_text(element):
+    """
+    Return the text of an element the way BeautifulSoup's get_text(strip=True) does.
+    """
+    return ''.join(text.strip() for text in element.itertext())
+
+if LXML_AVAILABLE:
+    # Event rows and day headers, in document order
+    _ROW_XPATH = etree.XPath(
+        "//*[self::tr or self::td]"
+        "[contains(concat(' ', normalize-space(@class), ' '), ' js-event-item ')"
+        " or contains(concat(' ', normalize-space(@class), ' '), ' theDay ')]"
+    )
+
+def parse_html_lxml(html_content):
+    """
+    Parse HTML content with lxml to extract economic events.
+
+    Each row is walked once: cells are dispatched on their class, volatility is
+    read from the cell title attributes and each theDay header is parsed once.
+
+    Args:
+        html_content (str): HTML content to parse.
+
+    Returns:
+        list: A list of dictionaries containing event details.
+    """
+    if not html_content or not html_content.strip():
+        return []
+
+    root = lxml.html.document_fromstring(html_content)
+    events = []
+    header = None
+    current_date = None
+
+    for row in _ROW_XPATH(root):
+        classes = row.get('class', '').split()
+        if 'theDay' in classes:
+            text = _stripped_text(row)
+            if text != header:
+                header = text
+                current_date = None
+        elif 'js-event-item' in classes:
+            if current_date is None:
+                current_date = datetime.strptime(header, DAY_HEADER_FORMAT).strftime(EVENT_DATE_FORMAT)
+            event = {
+                'Date': current_date,
+                'Time': None,
+                'Currency': None,
+                'Volatility': None,
+                'Event': None,
+                'Forecast': None,
+                'Previous': None,
+                'Actual': None,
+            }
+            seen = set()
+            volatility_title = None
+            for cell in row.iterdescendants('td'):
+                title = cell.get('title')
+                if volatility_title is None and title and 'Volatility Expected' in title:
+                    volatility_title = title
+                for cell_class in cell.get('class', '').split():
+                    field = CELL_FIELDS.get(cell_class)
+                    if field and field not in seen:
+                        seen.add(field)
+                        event[field] = _stripped_text(cell)
+            if volatility_title:
+                event['Volatility'] = extract_volatility(volatility_title)
+            events.append(event)
+    return events
+
+class EventStreamParser(HTMLParser):
+    """
+    Event-driven parser that turns calendar HTML into events while it is being fed.
+
+    An event is complete as soon as its js-event-item row closes, so a page can
+    be parsed chunk by chunk while it downloads, without building a tree. Text
+    is read the way BeautifulSoup's get_text(strip=True) reads it, so the
+    events match the reference backend.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._events = []
+        self._header = None
+        self._date = None
+        self._event = None
+        self._seen = set()
+        self._volatility = []
+        # Fields the text of the open cell goes to, or 'theDay' for a day header
+        self._cell = None
+        self._parts = []
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        self._end_text()
+        if self._event is not None:
+            self._volatility.extend(value for name, value in attrs if value and 'Volatility Expected' in value)
+        classes = (dict(attrs).get('class') or '').split()
+        if tag == 'tr' and 'js-event-item' in classes:
+            self._end_row()
+            if self._date is None:
+                self._date = datetime.strptime(self._header, DAY_HEADER_FORMAT).strftime(EVENT_DATE_FORMAT)
+            self._event = {
+                'Date': self._date,
+                'Time': None,
+                'Currency': None,
+                'Volatility': None,
+                'Event': None,
+                'Forecast': None,
+                'Previous': None,
+                'Actual': None,
+            }
+        elif tag == 'td':
+            self._end_cell()
+            if 'theDay' in classes:
+                self._cell = 'theDay'
+            elif self._event is not None:
+                fields = [CELL_FIELDS[cell_class] for cell_class in classes
+                          if cell_class in CELL_FIELDS and CELL_FIELDS[cell_class] not in self._seen]
+                self._seen.update(fields)
+                self._cell = fields or None
+
+    def handle_endtag(self, tag):
+        self._end_text()
+        if tag == 'td':
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._end_text()
+
+    def close(self):
+        super().close()
+        self._end_text()
+        self._end_row()
+
+    def pop_events(self):
+        """
+        Return the events completed since the last call.
+
+        Returns:
+            list: A list of dictionaries containing event details.
+        """
+        events, self._events = self._events, []
+        return events
+
+    def _end_text(self):
+        # A text node can arrive in several pieces, so it is stripped only once complete
+        if self._text:
+            text = ''.join(self._text).strip()
+            if text:
+                self._parts.append(text)
+            self._text = []
+
+    def _end_cell(self):
+        if self._cell is None:
+            return
+        text = ''.join(self._parts)
+        if self._cell == 'theDay':
+            if text != self._header:
+                self._header = text
+                self._date = None
+        else:
+            for field in self._cell:
+                self._event[field] = text
+        self._cell = None
+        self._parts = []
+
+    def _end_row(self):
+        self._end_cell()
+        if self._event is None:
+            return
+        self._event['Volatility'] = extract_volatility(' '.join(self._volatility))
+        self._events.append(self._event)
+        self._event = None
+        self._seen = set()
+        self._volatility = []
+
+def iter_events(chunks):
+    """
+    Parse calendar HTML arriving in chunks, yielding each event as soon as its row closes.
+
+    Args:
+        chunks (iterable of str): Consecutive pieces of the HTML content.
+
+    Yields:
+        dict: The details of each event, in page order.
+    """
+    parser = EventStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_events()
+    parser.close()
+    yield from parser.pop_events()
+
+def parse_html_stream(html_content):
+    """
+    Parse HTML content with the event-driven stream parser.
+
+    Args:
+        html_content (str): HTML content to parse.
+
+    Returns:
+        list: A list of dictionaries containing event details.
+    """
+    return list(iter_events([html_content]))
+
+# Registry of available parser backends
+PARSER_BACKENDS = {'bs4': parse_html_bs4, 'stream': parse_html_stream}
+if LXML_AVAILABLE:
+    PARSER_BACKENDS['lxml'] = parse_html_lxml
+
+DEFAULT_BACKEND = 'lxml' if LXML_AVAILABLE else 'bs4'
+
+def register_backend(name, parser):
+    """
+    Register a parser backend.
+
+    Args:
+        name (str): The backend name used to select it.
+        parser (callable): A function taking HTML content and returning a list of events.
+    """
+    PARSER_BACKENDS[name] = parser
+
+def parse_html(html_content, backend=None):
+    """
+    Parse HTML content to extract economic events.
+
+    Args:
+        html_content (str): HTML content to parse.
+        backend (str, optional): Name of the parser backend. Defaults to DEFAULT_BACKEND.
+
+    Returns:
+        list: A list of dictionaries containing event details.
+
+    Raises:
+        ValueError: If the backend is not registered.
+    """
+    name = backend or DEFAULT_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}")
+    return PARSER_BACKENDS[name](html_content)
@@ -0,0 +1,207 @@
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Partition holding the events whose date could not be parsed
+UNDATED_PARTITION = 'undated'
+PARTITION_SUFFIX = '.arrow'
+MANIFEST_FILE = 'manifest.json'
+# Formats accepted by export_snapshot
+EXPORT_FORMATS = ['arrow', 'csv']
+
+# Low-cardinality text columns are stored dictionary-encoded, so they load straight into categoricals
+DICTIONARY_COLUMNS = ['Date', 'Time', 'Currency', 'Volatility', 'Event']
+STRING_COLUMNS = ['Forecast', 'Previous', 'Actual']
+# Columns of a snapshot partition, recorded in the manifest so files of an older layout are rebuilt
+SNAPSHOT_COLUMNS = DICTIONARY_COLUMNS + STRING_COLUMNS + ['Timestamp']
+
+def snapshot_schema():
+    """
+    Return the Arrow schema of a snapshot partition, in the column order of the events table.
+
+    Returns:
+    pyarrow.Schema: The schema.
+    """
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [(column, dictionary) for column in DICTIONARY_COLUMNS]
+        + [(column, pa.string()) for column in STRING_COLUMNS]
+        + [('Timestamp', pa.int64())]
+    )
+
+def _partition_path(directory, partition):
+    return os.path.join(directory, partition + PARTITION_SUFFIX)
+
+def _replace(path, write):
+    """
+    Write a file through a temporary file and move it into place, so readers never see a partial file.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+# Function to write one partition of the snapshot
+def write_partition(directory, partition, rows):
+    """
+    Replace a partition with the given rows, or remove it when there are none.
+
+    Parameters:
+    directory (str): The snapshot directory.
+    partition (str): The partition name, a month as 'YYYY-MM' or UNDATED_PARTITION.
+    rows (list of tuple): The events rows, in the column order of the events table.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = _partition_path(directory, partition)
+    if not rows:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    schema = snapshot_schema()
+    values = list(zip(*rows))
+    arrays = [pa.array(column, type=pa.string()).dictionary_encode() if field.name in DICTIONARY_COLUMNS
+              else pa.array(column, type=field.type)
+              for field, column in zip(schema, values)]
+    table = pa.Table.from_arrays(arrays, schema=schema)
+
+    def write(target):
+        with ipc.new_file(target, schema) as writer:
+            writer.write_table(table)
+
+    _replace(path, write)
+
+# Function to list the partitions of the snapshot
+def list_partitions(directory):
+    """
+    Return the names of the partitions in the snapshot directory, in Timestamp order.
+
+    Undated events come first, as missing Timestamps sort first in SQLite.
+
+    Parameters:
+    directory (str): The snapshot directory.
+
+    Returns:
+    list of str: The partition names.
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = [name[:-len(PARTITION_SUFFIX)] for name in os.listdir(directory) if name.endswith(PARTITION_SUFFIX)]
+    return sorted(names, key=lambda name: (name != UNDATED_PARTITION, name))
+
+# Function to remove the partitions not in a set
+def remove_partitions(directory, keep):
+    """
+    Remove every partition whose name is not in keep.
+
+    Parameters:
+    directory (str): The snapshot directory.
+    keep (set of str): The partitions to keep.
+    """
+    for partition in list_partitions(directory):
+        if partition not in keep:
+            os.remove(_partition_path(directory, partition))
+
+# Function to read the data version a snapshot was written at
+def read_manifest(directory):
+    """
+    Return the data version recorded by the last completed snapshot refresh.
+
+    Parameters:
+    directory (str): The snapshot directory.
+
+    Returns:
+    int or None: The data version, or None if there is no snapshot or it was written with other columns.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('columns') != SNAPSHOT_COLUMNS:
+        return None
+    return manifest.get('data_version')
+
+# Function to record the data version of a snapshot
+def write_manifest(directory, data_version):
+    """
+    Record the data version the snapshot matches.
+
+    Parameters:
+    directory (str): The snapshot directory.
+    data_version (int): The data version.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    def write(target):
+        with open(target, 'w') as f:
+            json.dump({'data_version': data_version, 'columns': SNAPSHOT_COLUMNS}, f)
+
+    _replace(os.path.join(directory, MANIFEST_FILE), write)
+
+# Function to iterate over the record batches of the snapshot
+def iter_batches(directory):
+    """
+    Yield the record batches of every partition, memory-mapped rather than read.
+
+    Each batch references the mapped file directly, so only the pages that are
+    actually touched are read from disk.
+
+    Parameters:
+    directory (str): The snapshot directory.
+
+    Yields:
+    pyarrow.RecordBatch: The batches, in the order of list_partitions.
+    """
+    for partition in list_partitions(directory):
+        try:
+            source = pa.memory_map(_partition_path(directory, partition), 'r')
+        except FileNotFoundError:
+            # Removed by a concurrent refresh
+            continue
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+# Function to load the whole snapshot
+def read_snapshot(directory):
+    """
+    Load every partition into one table without copying the column buffers.
+
+    Parameters:
+    directory (str): The snapshot directory.
+
+    Returns:
+    pyarrow.Table: The events of the snapshot.
+    """
+    return pa.Table.from_batches(list(iter_batches(directory)), schema=snapshot_schema())
+
+# Function to stream the snapshot into a file
+def export_snapshot(directory, sink, fmt='arrow'):
+    """
+    Write every event of the snapshot to a file, one record batch at a time.
+
+    Parameters:
+    directory (str): The snapshot directory.
+    sink (str or file-like): Path or writable binary file to write to.
+    fmt (str): 'arrow' for an Arrow IPC stream, or 'csv'.
+
+    Raises:
+    ValueError: If the format is not supported.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    schema = snapshot_schema()
+    writer_class = ipc.new_stream if fmt == 'arrow' else pa_csv.CSVWriter
+    with writer_class(sink, schema) as writer:
+        for batch in iter_batches(directory):
+            writer.write_batch(batch)
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from data_storer import day_bounds
+
+# Columns that get one bitmap per distinct value
+INDEXED_COLUMNS = ['Currency', 'Volatility']
+
+class FilterIndex:
+    """
+    In-memory filter engine over a compact events frame.
+
+    The frame is kept sorted by Timestamp, so a date range is a contiguous
+    slice found with a binary search. Currency and Volatility get one boolean
+    bitmap per value (plus None for missing values), so any combination of
+    multiselects is answered by OR-ing the selected bitmaps within the slice
+    and AND-ing the columns, without string comparisons or isin over the frame.
+
+    Filters follow the semantics of data_storer.query_events: None keeps every
+    value, an empty list keeps nothing, and None inside a list matches missing
+    values.
+
+    Args:
+        frame (pandas.DataFrame): Events with compact column types, as returned by query_events.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame.sort_values('Timestamp', kind='stable', na_position='first').reset_index(drop=True)
+        # Epoch nanoseconds; missing timestamps become the smallest int64 and sort first
+        self._timestamps = pd.DatetimeIndex(self.frame['Timestamp']).asi8
+        self._undated = int(self.frame['Timestamp'].isna().sum())
+        self._bitmaps = {column: self._build_bitmaps(self.frame[column]) for column in INDEXED_COLUMNS}
+
+    @staticmethod
+    def _build_bitmaps(series):
+        codes = series.cat.codes.to_numpy()
+        bitmaps = {}
+        for code, value in enumerate(series.cat.categories):
+            bitmap = codes == code
+            if bitmap.any():
+                bitmaps[value] = bitmap
+        missing = codes == -1
+        if missing.any():
+            bitmaps[None] = missing
+        return bitmaps
+
+    def _rows(self, start_date=None, end_date=None):
+        """
+        Return the slice of rows whose Timestamp falls within the date range.
+
+        Like the SQL comparisons, any bound leaves out events without a Timestamp.
+        """
+        lo, hi = 0, len(self._timestamps)
+        if start_date is not None or end_date is not None:
+            lo = self._undated
+        if start_date is not None:
+            start = day_bounds(start_date, start_date)[0] * 10**9
+            lo = max(lo, int(np.searchsorted(self._timestamps, start, side='left')))
+        if end_date is not None:
+            end = day_bounds(end_date, end_date)[1] * 10**9
+            hi = int(np.searchsorted(self._timestamps, end, side='left'))
+        return slice(lo, max(lo, hi))
+
+    def _union(self, column, values, rows):
+        """
+        Return the bitmap of rows in the slice holding any of the values.
+        """
+        bitmaps = self._bitmaps[column]
+        result = np.zeros(rows.stop - rows.start, dtype=bool)
+        for value in values:
+            bitmap = bitmaps.get(value)
+            if bitmap is not None:
+                result |= bitmap[rows]
+        return result
+
+    def mask(self, currencies=None, volatilities=None, start_date=None, end_date=None):
+        """
+        Intersect the filters into a bitmap over the rows of the date range.
+
+        Args:
+            currencies (list, optional): Currencies to keep. None keeps all of them.
+            volatilities (list, optional): Volatility levels to keep.
+            start_date (date, optional): The first day to keep.
+            end_date (date, optional): The last day to keep, inclusive.
+
+        Returns:
+            tuple: (rows, bitmap), the slice of the date range and the matching rows within it.
+        """
+        rows = self._rows(start_date, end_date)
+        bitmap = np.ones(rows.stop - rows.start, dtype=bool)
+        for column, values in (('Currency', currencies), ('Volatility', volatilities)):
+            if values is not None:
+                bitmap &= self._union(column, values, rows)
+        return rows, bitmap
+
+    def positions(self, **filters):
+        """
+        Return the positions of the matching rows in self.frame, in chronological order.
+
+        Args:
+            **filters: Filters accepted by mask.
+
+        Returns:
+            numpy.ndarray: The row positions.
+        """
+        rows, bitmap = self.mask(**filters)
+        return np.flatnonzero(bitmap) + rows.start
+
+    def select(self, **filters):
+        """
+        Return the matching events.
+
+        Args:
+            **filters: Filters accepted by mask.
+
+        Returns:
+            pandas.DataFrame: The matching events in chronological order.
+        """
+        return self.frame.iloc[self.positions(**filters)]
+
+    def count(self, **filters):
+        """
+        Return the number of matching events.
+
+        Args:
+            **filters: Filters accepted by mask.
+
+        Returns:
+            int: The number of matching events.
+        """
+        return int(self.mask(**filters)[1].sum())
+
+    def options(self, column, start_date=None, end_date=None):
+        """
+        Return the values of an indexed column present within a date range.
+
+        The order matches data_storer.get_distinct_values: None first, then ascending values.
+
+        Args:
+            column (str): 'Currency' or 'Volatility'.
+            start_date (date, optional): The first day to consider.
+            end_date (date, optional): The last day to consider, inclusive.
+
+        Returns:
+            list: The distinct values.
+        """
+        rows = self._rows(start_date, end_date)
+        present = [value for value, bitmap in self._bitmaps[column].items() if bitmap[rows].any()]
+        return sorted(present, key=lambda value: (value is not None, value or ''))
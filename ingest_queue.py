@@ -0,0 +1,297 @@
+import atexit
+import queue
+import threading
+import time
+from data_storer import store_event_batches
+
+# Default batching settings
+DEFAULT_MAX_BATCH = 2000
+DEFAULT_MAX_DELAY = 0.1
+DEFAULT_MAX_PENDING = 256
+
+class IngestTicket:
+    """
+    One submission to an IngestQueue, which its producer can wait on.
+
+    Args:
+        events (list of dict): The submitted events.
+        flush (bool): Write the batch being collected as soon as this ticket is reached.
+        task (callable, optional): Function the writer thread calls once the batch before it is written.
+    """
+
+    def __init__(self, events, flush=False, task=None):
+        self.events = events
+        self.flush = flush
+        self.task = task
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        """
+        Wait until the events are committed or their batch failed.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the ticket finished.
+        """
+        return self.done.wait(timeout)
+
+class IngestQueue:
+    """
+    Single writer thread behind a bounded queue of event submissions.
+
+    Producers submit events without touching the database. The writer thread
+    takes submissions in order and combines them into one transaction once it
+    holds `max_batch` events or `max_delay` seconds after the first one, so
+    concurrent producers never contend for the SQLite write lock. When
+    `max_pending` submissions are waiting, submit blocks, or raises queue.Full
+    if asked not to block.
+
+    Args:
+        db_name (str): The name of the database file.
+        max_batch (int): Events that end a batch early.
+        max_delay (float): Seconds a batch waits for more submissions.
+        max_pending (int): Submissions held before producers are pushed back.
+        store (callable, optional): Function called with a list of event batches and db_name,
+            returning the counts of each batch.
+    """
+
+    def __init__(self, db_name='economic_events.db', max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY,
+                 max_pending=DEFAULT_MAX_PENDING, store=store_event_batches):
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._store = store
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'submitted': 0, 'events': 0, 'transactions': 0, 'errors': 0}
+
+    def start(self):
+        """
+        Start the writer thread if it is not running yet.
+
+        Returns:
+            IngestQueue: The queue itself.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_forever, name="ingest-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Write everything submitted so far, then stop the writer thread.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait for the thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def submit(self, events, block=True, timeout=None):
+        """
+        Queue events for the writer thread.
+
+        Args:
+            events (list of dict): The events to store.
+            block (bool): Wait for room when the queue is full.
+            timeout (float, optional): Maximum number of seconds to wait for room.
+
+        Returns:
+            IngestTicket: The ticket to wait on for confirmation.
+
+        Raises:
+            queue.Full: If the queue stays full.
+        """
+        ticket = IngestTicket(list(events))
+        self._queue.put(ticket, block, timeout)
+        with self._lock:
+            self._stats['submitted'] += 1
+        return ticket
+
+    def store(self, events, timeout=None):
+        """
+        Queue events and wait until they are committed, like a direct store_events call.
+
+        Args:
+            events (list of dict): The events to store.
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+            dict: The number of 'inserted' and 'updated' events.
+
+        Raises:
+            TimeoutError: If the events were not written in time.
+            Exception: The error of the transaction the events were part of.
+        """
+        if not events:
+            return {'inserted': 0, 'updated': 0}
+        ticket = self.submit(events, timeout=timeout)
+        if not ticket.wait(timeout):
+            raise TimeoutError("The ingest queue did not write the events in time.")
+        if ticket.error is not None:
+            raise ticket.error
+        return ticket.result
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything submitted before the call is written.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if everything was written in time.
+        """
+        ticket = IngestTicket([], flush=True)
+        self._queue.put(ticket, timeout=timeout)
+        return ticket.wait(timeout)
+
+    def run(self, task, timeout=None):
+        """
+        Run a write function on the writer thread, after everything submitted before it, and wait for it.
+
+        Writers other than store, such as compaction, use it so the database
+        still has a single writing thread.
+
+        Args:
+            task (callable): Function called without arguments.
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+            The value returned by the function.
+
+        Raises:
+            TimeoutError: If the function did not finish in time.
+            Exception: The error raised by the function.
+        """
+        ticket = IngestTicket([], flush=True, task=task)
+        self._queue.put(ticket, timeout=timeout)
+        if not ticket.wait(timeout):
+            raise TimeoutError("The ingest queue did not run the task in time.")
+        if ticket.error is not None:
+            raise ticket.error
+        return ticket.result
+
+    def pending(self):
+        """
+        Return the number of submissions waiting for the writer.
+        """
+        return self._queue.qsize()
+
+    def stats(self):
+        """
+        Return the counts of submissions, written events, committed transactions and failed submissions.
+
+        Returns:
+            dict: A copy of the counters.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _next_batch(self, first):
+        """
+        Collect the submissions following `first` until the batch is full, lingers too long or reaches a flush or task.
+
+        Returns:
+            tuple: (tickets, stop), where stop is True once the stop marker was taken.
+        """
+        tickets = [first]
+        count = len(first.events)
+        deadline = time.monotonic() + self.max_delay
+        while not tickets[-1].flush and count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                ticket = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if ticket is None:
+                return tickets, True
+            tickets.append(ticket)
+            count += len(ticket.events)
+        return tickets, False
+
+    def _write(self, tickets):
+        writes = [ticket for ticket in tickets if ticket.events]
+        if writes:
+            self._commit(writes)
+        for ticket in tickets:
+            if ticket.task is not None:
+                self._run_task(ticket)
+            ticket.done.set()
+
+    def _run_task(self, ticket):
+        """
+        Call the function of a run ticket, keeping its result or error on the ticket.
+        """
+        try:
+            ticket.result = ticket.task()
+        except Exception as e:
+            print(f"Ingest task failed: {e}")
+            ticket.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+
+    def _commit(self, writes):
+        """
+        Store the events of several tickets in one transaction.
+        """
+        try:
+            results = self._store([ticket.events for ticket in writes], self.db_name)
+        except Exception as e:
+            if len(writes) > 1:
+                # Retry one submission at a time, so a bad submission fails alone
+                for ticket in writes:
+                    self._commit([ticket])
+                return
+            print(f"Ingest of {len(writes[0].events)} events failed: {e}")
+            writes[0].error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            return
+        for ticket, result in zip(writes, results):
+            ticket.result = result
+        with self._lock:
+            self._stats['transactions'] += 1
+            self._stats['events'] += sum(len(ticket.events) for ticket in writes)
+
+    def _run_forever(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            tickets, stop = self._next_batch(first)
+            self._write(tickets)
+
+# Process-wide ingest queues, one per database file
+_queues = {}
+_queues_lock = threading.Lock()
+
+# Function to get the process-wide ingest queue of a database
+def get_ingest_queue(db_name='economic_events.db'):
+    """
+    Return the running ingest queue of a database, starting it on first use.
+
+    Every writer in the process should go through this queue, so a database
+    only ever has one writing thread. Pending events are written when the
+    process exits.
+
+    Args:
+        db_name (str): The name of the database file.
+
+    Returns:
+        IngestQueue: The running queue.
+    """
+    with _queues_lock:
+        ingest_queue = _queues.get(db_name)
+        if ingest_queue is None:
+            ingest_queue = _queues[db_name] = IngestQueue(db_name)
+            atexit.register(ingest_queue.stop)
+        return ingest_queue.start()
@@ -0,0 +1,226 @@
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from db_connection import get_connection, transaction
+from refresh_scheduler import RefreshScheduler, DEFAULT_INTERVAL, DEFAULT_FAST_INTERVAL, refresh_events
+
+# Name of the lease row that elects the ingest leader
+INGEST_LEASE = 'ingest'
+# Seconds a lease stays valid without being renewed
+DEFAULT_LEASE_TTL = 120
+# SQLite database holding the leases, whichever storage backend holds the events
+DEFAULT_LEASE_DB = 'economic_events.db'
+
+# Acquire or renew the lease if it is free, expired or already ours, in one atomic statement
+ACQUIRE_LEASE_SQL = '''
+    INSERT INTO leases (Name, Holder, ExpiresAt) VALUES (?, ?, ?)
+    ON CONFLICT(Name) DO UPDATE SET Holder = excluded.Holder, ExpiresAt = excluded.ExpiresAt
+    WHERE leases.Holder = excluded.Holder OR leases.ExpiresAt < ?
+'''
+
+# Function to create the leases table
+def create_lease_table(db_name='economic_events.db'):
+    """
+    Create the leases table if it doesn't exist.
+
+    Parameters:
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    """
+    with transaction(db_name) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                Name TEXT PRIMARY KEY,
+                Holder TEXT NOT NULL,
+                ExpiresAt REAL NOT NULL
+            )
+        ''')
+
+# Function to build an identifier for this process
+def default_holder():
+    """
+    Return an identifier for this process, unique across hosts.
+
+    Returns:
+    str: The host name and process id.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# Function to take or renew a lease
+def acquire_lease(name, holder, ttl=DEFAULT_LEASE_TTL, db_name='economic_events.db', now=None):
+    """
+    Take the lease if it is free or expired, or renew it if the holder already owns it.
+
+    Parameters:
+    name (str): The lease name.
+    holder (str): The identifier of the caller.
+    ttl (float): Seconds the lease stays valid from now.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    now (float): Current epoch seconds. Default is time.time().
+
+    Returns:
+    bool: True if the caller holds the lease.
+    """
+    now = time.time() if now is None else now
+    with transaction(db_name) as conn:
+        cursor = conn.execute(ACQUIRE_LEASE_SQL, (name, holder, now + ttl, now))
+        return cursor.rowcount == 1
+
+# Function to give up a lease
+def release_lease(name, holder, db_name='economic_events.db'):
+    """
+    Release the lease if the holder owns it, so another process can take over at once.
+
+    Parameters:
+    name (str): The lease name.
+    holder (str): The identifier of the caller.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    """
+    with transaction(db_name) as conn:
+        conn.execute('DELETE FROM leases WHERE Name = ? AND Holder = ?', (name, holder))
+
+# Function to read the current lease
+def get_lease(name=INGEST_LEASE, db_name='economic_events.db', now=None):
+    """
+    Return the current holder of a lease.
+
+    Parameters:
+    name (str): The lease name. Default is the ingest lease.
+    db_name (str): The name of the database file. Default is 'economic_events.db'.
+    now (float): Current epoch seconds. Default is time.time().
+
+    Returns:
+    dict or None: The 'holder' and 'expires_at' of a valid lease, or None.
+    """
+    now = time.time() if now is None else now
+    try:
+        row = get_connection(db_name).execute(
+            'SELECT Holder, ExpiresAt FROM leases WHERE Name = ? AND ExpiresAt >= ?', (name, now)
+        ).fetchone()
+    except Exception as e:
+        print(f"Error reading lease {name}: {e}")
+        return None
+    if row is None:
+        return None
+    return {'holder': row[0], 'expires_at': row[1]}
+
+# Function to keep a lease while work runs
+@contextmanager
+def lease_heartbeat(name, holder, ttl=DEFAULT_LEASE_TTL, db_name=DEFAULT_LEASE_DB, interval=None):
+    """
+    Renew a lease from a background thread until the block exits.
+
+    Parameters:
+    name (str): The lease name.
+    holder (str): The identifier of the caller, which must hold the lease.
+    ttl (float): Seconds the lease stays valid from each renewal.
+    db_name (str): The name of the database file holding the lease. Default is 'economic_events.db'.
+    interval (float): Seconds between renewals. Default is a third of the TTL.
+
+    Yields:
+    threading.Event: Set if a renewal found the lease taken by another holder; renewals stop then.
+    """
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def beat():
+        while not stop.wait(ttl / 3 if interval is None else interval):
+            try:
+                if not acquire_lease(name, holder, ttl, db_name):
+                    lost.set()
+                    return
+            except Exception as e:
+                print(f"Error renewing the {name} lease: {e}")
+
+    thread = threading.Thread(target=beat, name=f"{name}-lease-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        stop.set()
+        thread.join()
+
+# Function to run the ingest loop
+def run_worker(holder=None, lease_ttl=DEFAULT_LEASE_TTL, interval=DEFAULT_INTERVAL, fast_interval=DEFAULT_FAST_INTERVAL,
+               db_name=None, refresh=refresh_events, stop_event=None, lease_db=DEFAULT_LEASE_DB):
+    """
+    Refresh the events table while holding the ingest lease.
+
+    Every worker polls the lease at a third of its TTL. The one holding it
+    renews it and runs the refresh on the scheduler's interval, renewing it
+    from a heartbeat while the refresh runs so a slow refresh keeps the
+    lease; the others stay idle and take over once the lease expires or is
+    released. A leader that loses the lease during a refresh cancels it
+    before it stores anything and goes back to polling.
+
+    Parameters:
+    holder (str): The identifier of this worker. Default is the host name and process id.
+    lease_ttl (float): Seconds the lease stays valid without being renewed.
+    interval (float): Seconds between refreshes when nothing important is close.
+    fast_interval (float): Seconds between refreshes around high-volatility events.
+    db_name (str): The database file of the storage backend. Default is the backend's own file.
+    refresh (callable): Function called with db_name, max_age and cancel to run one refresh.
+    stop_event (threading.Event): Set it to stop the loop. Default runs forever.
+    lease_db (str): The SQLite database file holding the lease. Default is 'economic_events.db'.
+    """
+    holder = holder or default_holder()
+    stop_event = stop_event or threading.Event()
+    scheduler = RefreshScheduler(interval=interval, fast_interval=fast_interval, db_name=db_name, refresh=refresh)
+    create_lease_table(lease_db)
+    poll = lease_ttl / 3
+    next_refresh = 0
+    leader = False
+    try:
+        while not stop_event.is_set():
+            try:
+                is_leader = acquire_lease(INGEST_LEASE, holder, lease_ttl, lease_db)
+            except Exception as e:
+                print(f"Error acquiring the ingest lease: {e}")
+                is_leader = False
+            if is_leader != leader:
+                print(f"{holder} {'is now' if is_leader else 'is no longer'} the ingest leader")
+                leader = is_leader
+                next_refresh = 0
+            if leader and time.time() >= next_refresh:
+                with lease_heartbeat(INGEST_LEASE, holder, lease_ttl, lease_db, poll) as lost:
+                    scheduler.refresh(wait=True, cancel=lost)
+                if lost.is_set():
+                    # Another worker owns the lease now, so this one must not write again until it wins it back
+                    print(f"{holder} lost the ingest lease during a refresh")
+                    leader = False
+                    continue
+                next_refresh = time.time() + scheduler.next_interval()
+            delay = min(poll, next_refresh - time.time()) if leader else poll
+            stop_event.wait(max(delay, 0))
+    finally:
+        if leader:
+            release_lease(INGEST_LEASE, holder, lease_db)
+
+# Command line entry point, e.g. `python ingest_worker.py`
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and store economic events while holding the ingest lease.")
+    parser.add_argument('--db', default=None, help="Database file to write to. Defaults to the storage backend's own file.")
+    parser.add_argument('--lease-db', default=DEFAULT_LEASE_DB, help="SQLite database file holding the ingest lease.")
+    parser.add_argument('--holder', default=None, help="Worker identifier. Defaults to host name and process id.")
+    parser.add_argument('--lease-ttl', type=float, default=DEFAULT_LEASE_TTL, help="Seconds the lease stays valid without renewal.")
+    parser.add_argument('--interval', type=float, default=float(os.environ.get("REFRESH_INTERVAL", DEFAULT_INTERVAL)),
+                        help="Seconds between refreshes.")
+    parser.add_argument('--fast-interval', type=float, default=float(os.environ.get("REFRESH_FAST_INTERVAL", DEFAULT_FAST_INTERVAL)),
+                        help="Seconds between refreshes around high-volatility events.")
+    args = parser.parse_args()
+
+    # Release the lease on shutdown so another worker takes over without waiting for it to expire
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    try:
+        run_worker(holder=args.holder, lease_ttl=args.lease_ttl, interval=args.interval,
+                   fast_interval=args.fast_interval, db_name=args.db, stop_event=stop_event,
+                   lease_db=args.lease_db)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
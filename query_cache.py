@@ -0,0 +1,166 @@
+from cache_utils import LRUCache
+from filter_index import FilterIndex
+from storage_backends import shared_backend
+
+# Process-wide cache of query results, shared by every Streamlit session
+MAX_CACHED_QUERIES = 256
+MAX_CACHED_BYTES = 128 * 1024 * 1024
+
+def _sizeof(value):
+    """
+    Return the in-memory size of a cached result in bytes.
+    """
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return 0
+
+QUERY_CACHE = LRUCache(max_entries=MAX_CACHED_QUERIES, max_bytes=MAX_CACHED_BYTES, sizeof=_sizeof)
+
+# Filter indexes cover the whole table, so only the latest data versions are kept
+FILTER_INDEXES = LRUCache(max_entries=2)
+
+def _freeze(value):
+    """
+    Turn list arguments into tuples so they can be part of a cache key.
+    """
+    if isinstance(value, (list, tuple, set)):
+        return tuple(value)
+    return value
+
+def _cache_key(name, storage, kwargs):
+    """
+    Build a cache key from the query name, its arguments, the backend and its current data version.
+
+    Including the data version means a store_events commit makes every older
+    entry unreachable, so stale results are never returned.
+    """
+    params = tuple(sorted((key, _freeze(value)) for key, value in kwargs.items()))
+    return (name, storage.name, storage.db_name, storage.data_version(), params)
+
+# Function to query events through the cache
+def cached_query_events(db_name=None, **kwargs):
+    """
+    Cached version of the storage backend's query_events.
+
+    The returned DataFrame is shared between callers and must be treated as read-only.
+
+    Parameters:
+    db_name (str): The database file. Default is the storage backend's own file.
+    **kwargs: Filters forwarded to query_events.
+
+    Returns:
+    pandas.DataFrame: A DataFrame containing the matching events.
+    """
+    storage = shared_backend(db_name=db_name)
+    key = _cache_key('query_events', storage, kwargs)
+    return QUERY_CACHE.get_or_compute(key, lambda: storage.query_events(**kwargs))
+
+# Function to count events through the cache
+def cached_count_events(db_name=None, **kwargs):
+    """
+    Cached version of the storage backend's count_events.
+
+    Parameters:
+    db_name (str): The database file. Default is the storage backend's own file.
+    **kwargs: Filters forwarded to count_events.
+
+    Returns:
+    int: The number of matching events.
+    """
+    storage = shared_backend(db_name=db_name)
+    key = _cache_key('count_events', storage, kwargs)
+    return QUERY_CACHE.get_or_compute(key, lambda: storage.count_events(**kwargs))
+
+# Function to read rollup counts through the cache
+def cached_query_rollups(db_name=None, **kwargs):
+    """
+    Cached version of the storage backend's aggregate_events.
+
+    The returned DataFrame is shared between callers and must be treated as read-only.
+
+    Parameters:
+    db_name (str): The database file. Default is the storage backend's own file.
+    **kwargs: Filters and grouping forwarded to aggregate_events.
+
+    Returns:
+    pandas.DataFrame: The event counts per group.
+    """
+    storage = shared_backend(db_name=db_name)
+    key = _cache_key('query_rollups', storage, kwargs)
+    return QUERY_CACHE.get_or_compute(key, lambda: storage.aggregate_events(**kwargs))
+
+# Function to read distinct column values through the cache
+def cached_distinct_values(column, start_date=None, end_date=None, db_name=None):
+    """
+    Cached version of the storage backend's distinct_values.
+
+    Parameters:
+    column (str): The column to read.
+    start_date (date): The first day to consider.
+    end_date (date): The last day to consider, inclusive.
+    db_name (str): The database file. Default is the storage backend's own file.
+
+    Returns:
+    list: The distinct values in ascending order.
+    """
+    storage = shared_backend(db_name=db_name)
+    key = _cache_key('distinct_values', storage, {'column': column, 'start_date': start_date, 'end_date': end_date})
+    return list(QUERY_CACHE.get_or_compute(key, lambda: tuple(storage.distinct_values(column, start_date, end_date))))
+
+# Function to read the stored date range through the cache
+def cached_date_bounds(db_name=None):
+    """
+    Cached version of the storage backend's date_bounds.
+
+    Parameters:
+    db_name (str): The database file. Default is the storage backend's own file.
+
+    Returns:
+    tuple: (first_date, last_date), or (None, None) if there are no events.
+    """
+    storage = shared_backend(db_name=db_name)
+    key = _cache_key('date_bounds', storage, {})
+    return QUERY_CACHE.get_or_compute(key, storage.date_bounds)
+
+# Function to get the filter index of the current data version
+def cached_filter_index(db_name=None):
+    """
+    Return the in-memory filter index over every stored event, built once per data version.
+
+    With the SQLite backend the events are loaded from the memory-mapped columnar snapshot.
+
+    Parameters:
+    db_name (str): The database file. Default is the storage backend's own file.
+
+    Returns:
+    FilterIndex: The index of the current data version.
+    """
+    storage = shared_backend(db_name=db_name)
+    key = _cache_key('filter_index', storage, {})
+    return FILTER_INDEXES.get_or_compute(key, lambda: FilterIndex(storage.load_events()))
+
+# Function to fingerprint a filtered selection for downstream caches
+def data_fingerprint(db_name=None, **filters):
+    """
+    Return a cheap key identifying the events selected by a set of filters.
+
+    The key changes whenever the data version or any filter changes, so it can
+    key caches of results derived from the selection, such as chart figures.
+
+    Parameters:
+    db_name (str): The database file. Default is the storage backend's own file.
+    **filters: The filters behind the selection.
+
+    Returns:
+    tuple: The fingerprint.
+    """
+    return _cache_key('selection', shared_backend(db_name=db_name), filters)
+
+def query_cache_stats():
+    """
+    Return the query cache counters.
+
+    Returns:
+    dict: Counts of hits, misses and evictions, plus entries and bytes held.
+    """
+    return QUERY_CACHE.stats()
@@ -0,0 +1,231 @@
+import threading
+import time
+from datetime import datetime
+from data_fetcher import fetch_economic_events, mark_processed
+from storage_backends import shared_backend
+
+# Default refresh timing, in seconds
+DEFAULT_INTERVAL = 900
+DEFAULT_FAST_INTERVAL = 60
+DEFAULT_LEAD_TIME = 1800
+# How long after a high-volatility release the fast interval is kept, to pick up actuals
+DEFAULT_RELEASE_WINDOW = 900
+
+# Function that performs one refresh
+def refresh_events(db_name=None, max_age=None, cancel=None):
+    """
+    Fetch the calendar and store the events that changed in the storage backend of the database.
+
+    With the SQLite backend the events go through the ingest queue of the database.
+
+    Pages are marked processed only after their events are stored, so if the
+    store fails the next refresh parses them again instead of skipping them.
+    When cancel is set by the time the calendar is fetched, nothing is stored.
+
+    Args:
+        db_name (str, optional): The database file. Defaults to the storage backend's own file.
+        max_age (float, optional): Caps the response cache TTL, 0 always goes to the network.
+        cancel (threading.Event, optional): Set it to stop the refresh before it stores, e.g. when the caller
+            lost the right to write.
+
+    Returns:
+        dict: The number of 'inserted' and 'updated' events.
+    """
+    processed = []
+    events = fetch_economic_events(skip_unchanged=True, processed=processed, max_age=max_age)
+    if cancel is not None and cancel.is_set():
+        print("Refresh cancelled before storing its events")
+        return {'inserted': 0, 'updated': 0}
+    result = shared_backend(db_name=db_name).store_events(events) if events else {'inserted': 0, 'updated': 0}
+    mark_processed(processed)
+    return result
+
+class RefreshJob:
+    """
+    One refresh run that any number of callers can wait on.
+    """
+
+    def __init__(self, cancel=None):
+        self.cancel = cancel
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to finish.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the job finished.
+        """
+        return self.done.wait(timeout)
+
+class RefreshScheduler:
+    """
+    Process-wide scheduler that refreshes the events table in the background.
+
+    A single daemon thread runs the refresh every `interval` seconds, switching
+    to `fast_interval` when a high-volatility event is less than `lead_time`
+    seconds away or was released less than `release_window` seconds ago.
+    Refresh requests made while a refresh is running join the running job
+    instead of starting another one. Refreshes inside that fast window bypass
+    the response cache, so released actuals show up on the next run.
+
+    Args:
+        interval (int): Seconds between refreshes when nothing important is close.
+        fast_interval (int): Seconds between refreshes around high-volatility events.
+        lead_time (int): How long before a high-volatility event the fast interval starts.
+        release_window (int): How long after a high-volatility event the fast interval lasts.
+        db_name (str, optional): The database file. Defaults to the storage backend's own file.
+        refresh (callable, optional): Function called with db_name, max_age and cancel to run one refresh.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, fast_interval=DEFAULT_FAST_INTERVAL, lead_time=DEFAULT_LEAD_TIME,
+                 release_window=DEFAULT_RELEASE_WINDOW, db_name=None, refresh=refresh_events):
+        self.interval = interval
+        self.fast_interval = fast_interval
+        self.lead_time = lead_time
+        self.release_window = release_window
+        self.db_name = db_name
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self._current = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._status = {
+            'status': 'never run',
+            'last_run': None,
+            'duration': None,
+            'error': None,
+            'result': None,
+            'next_run': None,
+        }
+
+    def start(self):
+        """
+        Start the background thread if it is not running yet.
+
+        Returns:
+            RefreshScheduler: The scheduler itself.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run_forever, name="refresh-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop the background thread.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait for the thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        """
+        Return the last run's time, duration, status, error and result.
+
+        Returns:
+            dict: A copy of the scheduler status.
+        """
+        with self._lock:
+            return dict(self._status)
+
+    def refresh(self, wait=True, timeout=None, cancel=None):
+        """
+        Request a refresh, joining the running one if there is one.
+
+        Args:
+            wait (bool): Block until the refresh finishes.
+            timeout (float, optional): Maximum number of seconds to wait.
+            cancel (threading.Event, optional): Passed to the refresh this call starts; set it to stop that
+                refresh before it stores. A call joining a running refresh cannot cancel it.
+
+        Returns:
+            RefreshJob: The job serving the request.
+        """
+        with self._lock:
+            job = self._current
+            start = job is None
+            if start:
+                job = self._current = RefreshJob(cancel)
+                self._status['status'] = 'running'
+        if start:
+            threading.Thread(target=self._run_job, args=(job,), name="refresh-job", daemon=True).start()
+        if wait:
+            job.wait(timeout)
+        return job
+
+    def _run_job(self, job):
+        started = time.time()
+        try:
+            max_age = 0 if self.in_fast_window(started) else None
+            job.result = self._refresh(self.db_name, max_age=max_age, cancel=job.cancel)
+        except Exception as e:
+            print(f"Background refresh failed: {e}")
+            job.error = e
+        with self._lock:
+            self._status.update({
+                'status': 'error' if job.error else 'ok',
+                'last_run': datetime.fromtimestamp(started),
+                'duration': time.time() - started,
+                'error': str(job.error) if job.error else None,
+                'result': job.result,
+            })
+            self._current = None
+        job.done.set()
+
+    def next_interval(self, now=None):
+        """
+        Return the number of seconds to wait before the next refresh.
+
+        Args:
+            now (float, optional): Current epoch seconds. Defaults to time.time().
+
+        Returns:
+            float: Seconds until the next refresh.
+        """
+        now = time.time() if now is None else now
+        try:
+            next_event = shared_backend(db_name=self.db_name).next_event_timestamp(now - self.release_window, ['High'])
+        except Exception as e:
+            print(f"Could not read the next high-volatility event: {e}")
+            return self.interval
+        if next_event is None:
+            return self.interval
+        # Wake up when the fast window of the next high-volatility event opens
+        return min(self.interval, max(self.fast_interval, next_event - self.lead_time - now))
+
+    def in_fast_window(self, now=None):
+        """
+        Return whether a high-volatility event is less than lead_time away or inside its release window.
+
+        Args:
+            now (float, optional): Current epoch seconds. Defaults to time.time().
+
+        Returns:
+            bool: True if refreshes should run at the fast interval.
+        """
+        now = time.time() if now is None else now
+        try:
+            next_event = shared_backend(db_name=self.db_name).next_event_timestamp(now - self.release_window, ['High'])
+        except Exception as e:
+            print(f"Could not read the next high-volatility event: {e}")
+            return False
+        return next_event is not None and next_event - self.lead_time <= now
+
+    def _run_forever(self):
+        while not self._stop.is_set():
+            self.refresh(wait=True)
+            delay = self.next_interval()
+            with self._lock:
+                self._status['next_run'] = datetime.fromtimestamp(time.time() + delay)
+            self._stop.wait(delay)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Seconds a cached response stays fresh, per calendar tab
+TAB_TTLS = {
+    'thisWeek': 300,
+    'nextWeek': 1800,
+    'custom': 86400,
+}
+DEFAULT_TTL = 300
+
+def content_hash(body):
+    """
+    Return the SHA-256 hex digest of a response body.
+
+    Args:
+        body (str or None): The response body.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256((body or '').encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    On-disk cache of calendar responses with per-tab TTLs and LRU eviction.
+
+    Entries are JSON files named after a hash of the URL plus the form payload.
+    Reading an entry refreshes its modification time, which is the LRU order
+    used when the cache grows beyond max_entries or max_bytes. The cache also
+    remembers the content hash of the last body handed to the parser for each
+    key, so callers can skip parsing and storing bodies that did not change.
+    The directory is created by the first put, so creating a cache has no side effects.
+    """
+
+    def __init__(self, directory='.http_cache', tab_ttls=None, default_ttl=DEFAULT_TTL, max_entries=256, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.tab_ttls = dict(TAB_TTLS if tab_ttls is None else tab_ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._processed = {}
+        self._counters = {'hits': 0, 'misses': 0, 'skips': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url, data):
+        """
+        Return the cache key for a request.
+
+        Args:
+            url (str): The request URL.
+            data (dict): The form payload.
+
+        Returns:
+            str: The SHA-256 hex digest of the URL and payload.
+        """
+        raw = json.dumps([url, data], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, data):
+        """
+        Return the TTL in seconds for a form payload, based on its currentTab.
+        """
+        return self.tab_ttls.get(data.get('currentTab'), self.default_ttl)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key, ttl):
+        """
+        Return a fresh cached payload, or None on a miss.
+
+        Args:
+            key (str): The cache key.
+            ttl (int): Maximum age of the entry in seconds.
+
+        Returns:
+            dict or None: The cached JSON payload.
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            stored_at = entry['stored_at']
+        except (OSError, ValueError, KeyError):
+            self._count('misses')
+            return None
+        if time.time() - stored_at > ttl:
+            self._count('misses')
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count('hits')
+        return entry['payload']
+
+    def put(self, key, payload):
+        """
+        Store a payload and evict least recently used entries beyond the size bounds.
+
+        Args:
+            key (str): The cache key.
+            payload (dict): The JSON payload to store.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stored_at': time.time(), 'payload': payload}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self._count('evictions')
+
+    def is_unchanged(self, key, body):
+        """
+        Check whether a body is identical to the last one processed for the key.
+
+        A match counts as a skip.
+
+        Args:
+            key (str): The cache key.
+            body (str): The response body.
+
+        Returns:
+            bool: True if the body was already processed.
+        """
+        with self._lock:
+            unchanged = self._processed.get(key) == content_hash(body)
+            if unchanged:
+                self._counters['skips'] += 1
+        return unchanged
+
+    def mark_processed(self, key, body):
+        """
+        Record the content hash of a body that was handed to the parser.
+        """
+        with self._lock:
+            self._processed[key] = content_hash(body)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: Counts of hits, misses, skips and evictions.
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def clear(self):
+        """
+        Remove every cached entry and processed hash.
+        """
+        with self._lock:
+            self._processed.clear()
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,410 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+import pandas as pd
+import data_storer
+from ingest_queue import get_ingest_queue
+from data_storer import (EVENT_COLUMNS, EVENTS_TIME_ZONE, FTS5_AVAILABLE, event_timestamp, to_compact_frame,
+                         _build_filters, _check_columns)
+from event_snapshots import PYARROW_AVAILABLE, EXPORT_FORMATS
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as ipc
+    from event_snapshots import snapshot_schema
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# Parts of the natural key that may be missing; the DuckDB backend stores them as '' so keys still match
+NULLABLE_KEY_COLUMNS = ['Time', 'Currency', 'Event']
+KEY_COLUMNS = ['Date'] + NULLABLE_KEY_COLUMNS
+# Columns an aggregate can be grouped by
+AGGREGATE_COLUMNS = ['Day', 'Currency', 'Volatility']
+# Day of an events row as 'YYYY-MM-DD' in the events time zone, from its Timestamp; '' when it has none
+DUCKDB_DAY_SQL = ("CASE WHEN Timestamp IS NULL THEN '' ELSE "
+                  f"strftime(timezone('{EVENTS_TIME_ZONE.key}', to_timestamp(Timestamp)), '%Y-%m-%d') END")
+# Rows per record batch when exporting from DuckDB
+EXPORT_BATCH_ROWS = 65536
+# Separates the event and currency names of a series in DuckDB search filters
+SERIES_SEPARATOR = '\x1f'
+
+class SQLiteBackend:
+    """
+    Row-store backend on the SQLite database used by the rest of the application.
+
+    Writes go through the process-wide ingest queue of the database, aggregates
+    read the event_rollups table maintained by data_storer, and full-event
+    loads and exports read the columnar snapshot.
+
+    Args:
+        db_name (str): The name of the database file.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, db_name='economic_events.db'):
+        self.db_name = db_name
+
+    def create_table(self):
+        data_storer.create_table(self.db_name)
+
+    def store_events(self, events):
+        return get_ingest_queue(self.db_name).store(events)
+
+    def get_events(self):
+        return data_storer.get_events(self.db_name)
+
+    def query_events(self, **kwargs):
+        return data_storer.query_events(db_name=self.db_name, **kwargs)
+
+    def count_events(self, **filters):
+        return data_storer.count_events(db_name=self.db_name, **filters)
+
+    def aggregate_events(self, group_by=('Currency', 'Volatility'), **filters):
+        return data_storer.query_rollups(group_by=group_by, db_name=self.db_name, **filters)
+
+    def distinct_values(self, column, start_date=None, end_date=None):
+        return data_storer.get_distinct_values(column, start_date, end_date, self.db_name)
+
+    def date_bounds(self):
+        return data_storer.get_date_bounds(self.db_name)
+
+    def next_event_timestamp(self, after, volatilities=None):
+        return data_storer.get_next_event_timestamp(after, volatilities, self.db_name)
+
+    def data_version(self):
+        return data_storer.get_data_version(self.db_name)
+
+    def load_events(self):
+        return data_storer.load_snapshot_events(self.db_name)
+
+    def export_events(self, sink, fmt='arrow'):
+        data_storer.export_events(sink, fmt, self.db_name)
+
+class DuckDBBackend:
+    """
+    Embedded columnar backend on DuckDB, for multi-year history.
+
+    Filters and aggregates run vectorized inside DuckDB, and writes are applied
+    as set operations against a registered pandas frame: one UPDATE ... FROM
+    for changed events and one anti-join INSERT for new ones. Currency and
+    Event stay text columns, which DuckDB already dictionary-compresses.
+    Searches run the FTS5 query of data_storer.search_series against an
+    in-memory index of the distinct (event, currency) pairs, rebuilt when the
+    data version changes. The interface and return values match SQLiteBackend.
+
+    Args:
+        db_name (str): The name of the DuckDB database file.
+
+    Raises:
+        ImportError: If duckdb is not installed.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, db_name='economic_events.duckdb'):
+        if not DUCKDB_AVAILABLE:
+            raise ImportError("The duckdb backend requires the duckdb package.")
+        self.db_name = db_name
+        self._conn = duckdb.connect(db_name)
+        self._lock = threading.Lock()
+        # (data version, series, index) of the last search index built
+        self._search_index = None
+
+    def create_table(self):
+        with self._lock:
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS events
+                                  (Date VARCHAR NOT NULL, Time VARCHAR NOT NULL, Currency VARCHAR NOT NULL,
+                                   Volatility VARCHAR, Event VARCHAR NOT NULL, Forecast VARCHAR, Previous VARCHAR,
+                                   Timestamp BIGINT)''')
+            # Files written before the Actual column existed
+            self._conn.execute('ALTER TABLE events ADD COLUMN IF NOT EXISTS Actual VARCHAR')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS metadata (Key VARCHAR PRIMARY KEY, Value BIGINT)')
+
+    def store_events(self, events):
+        """
+        Upsert events with the semantics of data_storer.store_events.
+
+        Parameters:
+        events (list of dict): The events to store.
+
+        Returns:
+        dict: The number of 'inserted' and 'updated' events.
+        """
+        if not events:
+            return {'inserted': 0, 'updated': 0}
+        # Events from older callers may carry no Actual value
+        staged = pd.DataFrame([[event.get(column) for column in EVENT_COLUMNS[:-1]] for event in events], columns=EVENT_COLUMNS[:-1])
+        staged[NULLABLE_KEY_COLUMNS] = staged[NULLABLE_KEY_COLUMNS].fillna('')
+        staged['Timestamp'] = pd.array([event_timestamp(date_str, time_str) for date_str, time_str in zip(staged['Date'], staged['Time'])],
+                                       dtype='Int64')
+        # The last occurrence of an event in a batch wins, as with the SQLite upsert
+        staged = staged.drop_duplicates(KEY_COLUMNS, keep='last')
+        key_match = ' AND '.join(f'events.{column} = staged.{column}' for column in KEY_COLUMNS)
+        with self._lock:
+            self._conn.register('staged', staged)
+            try:
+                self._conn.begin()
+                updated = self._conn.execute(f'''
+                    UPDATE events SET Volatility = staged.Volatility, Forecast = staged.Forecast, Previous = staged.Previous,
+                                      Actual = staged.Actual
+                    FROM staged
+                    WHERE {key_match}
+                      AND (events.Volatility IS DISTINCT FROM staged.Volatility
+                           OR events.Forecast IS DISTINCT FROM staged.Forecast
+                           OR events.Previous IS DISTINCT FROM staged.Previous
+                           OR events.Actual IS DISTINCT FROM staged.Actual)
+                ''').fetchone()[0]
+                inserted = self._conn.execute(f'''
+                    INSERT INTO events ({', '.join(EVENT_COLUMNS)})
+                    SELECT {', '.join(EVENT_COLUMNS)} FROM staged
+                    WHERE NOT EXISTS (SELECT 1 FROM events WHERE {key_match})
+                ''').fetchone()[0]
+                if inserted or updated:
+                    # Bumped like the SQLite data version, so cached query results are invalidated
+                    self._conn.execute("INSERT INTO metadata VALUES ('data_version', 1) "
+                                       "ON CONFLICT (Key) DO UPDATE SET Value = Value + 1")
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                self._conn.unregister('staged')
+        return {'inserted': inserted, 'updated': updated}
+
+    def _select_list(self, columns):
+        return ', '.join(f"NULLIF({column}, '') AS {column}" if column in NULLABLE_KEY_COLUMNS else column for column in columns)
+
+    def _fetch_frame(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).df()
+
+    def data_version(self):
+        with self._lock:
+            row = self._conn.execute("SELECT Value FROM metadata WHERE Key = 'data_version'").fetchone()
+        return row[0] if row else 0
+
+    def _match_series(self, search):
+        """
+        Return the event and currency names of the stored series matching a text search, joined by SERIES_SEPARATOR.
+        """
+        version = self.data_version()
+        if self._search_index is None or self._search_index[0] != version:
+            with self._lock:
+                series = self._conn.execute('SELECT DISTINCT Event, Currency FROM events ORDER BY Event, Currency').fetchall()
+            self._search_index = (version, series, _series_index(series))
+        version, series, index = self._search_index
+        return [event + SERIES_SEPARATOR + currency for event, currency in _search_series(series, index, search)]
+
+    def _filters(self, currencies=None, volatilities=None, start_date=None, end_date=None, event_names=None, search=None):
+        """
+        Build the WHERE clause of _build_filters, keeping only the events of the series matching search.
+        """
+        where_sql, params = _build_filters(currencies, volatilities, start_date, end_date, event_names)
+        if search and search.strip():
+            keys = self._match_series(search)
+            clause = f"list_contains(?, Event || '{SERIES_SEPARATOR}' || Currency)" if keys else 'FALSE'
+            where_sql = f"{where_sql} AND {clause}" if where_sql else f" WHERE {clause}"
+            if keys:
+                params = params + [keys]
+        return where_sql, params
+
+    def get_events(self):
+        return self.query_events(order_by=None)
+
+    def query_events(self, currencies=None, volatilities=None, start_date=None, end_date=None, columns=None,
+                     order_by='Timestamp', descending=False, limit=None, offset=None, event_names=None, search=None):
+        """
+        Retrieve events matching the filters, with the semantics of data_storer.query_events.
+        """
+        selected = _check_columns(columns or EVENT_COLUMNS)
+        where_sql, params = self._filters(currencies, volatilities, start_date, end_date, event_names, search)
+        sql = f"SELECT {self._select_list(selected)} FROM events{where_sql}"
+        if order_by:
+            # SQLite sorts NULLs as the smallest values; DuckDB puts them last unless told otherwise
+            direction = ' DESC NULLS LAST' if descending else ' NULLS FIRST'
+            order_columns = _check_columns([order_by] if isinstance(order_by, str) else order_by)
+            sql += ' ORDER BY ' + ', '.join(f'events.{column}{direction}' for column in order_columns + ['rowid'])
+        if limit is not None or offset is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [2**62 if limit is None else int(limit), int(offset or 0)]
+        return to_compact_frame(self._fetch_frame(sql, params))
+
+    def count_events(self, **filters):
+        where_sql, params = self._filters(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM events{where_sql}", params).fetchone()[0]
+
+    def aggregate_events(self, group_by=('Currency', 'Volatility'), **filters):
+        """
+        Count the events matching the filters per group, with the output of data_storer.query_rollups.
+        """
+        group_by = list(group_by)
+        unknown = [column for column in group_by if column not in AGGREGATE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown rollup columns: {unknown}")
+        expressions = {
+            'Day': f"{DUCKDB_DAY_SQL} AS Day",
+            'Currency': "NULLIF(Currency, '') AS Currency",
+            'Volatility': 'Volatility',
+        }
+        where_sql, params = _build_filters(**filters)
+        select_sql = ', '.join([expressions[column] for column in group_by] + ['COUNT(*) AS Count'])
+        group_sql = f" GROUP BY ALL ORDER BY {', '.join(column + ' NULLS FIRST' for column in group_by)}" if group_by else ''
+        df = self._fetch_frame(f"SELECT {select_sql} FROM events{where_sql}{group_sql}", params)
+        return df[df['Count'] > 0].reset_index(drop=True)
+
+    def distinct_values(self, column, start_date=None, end_date=None):
+        column = _check_columns([column])[0]
+        where_sql, params = _build_filters(start_date=start_date, end_date=end_date)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT {self._select_list([column])} FROM events{where_sql}", params).fetchall()
+        # Same order as data_storer.get_distinct_values: None first, then ascending values
+        return sorted((row[0] for row in rows), key=lambda value: (value is not None, value))
+
+    def date_bounds(self):
+        with self._lock:
+            first, last = self._conn.execute('SELECT MIN(Timestamp), MAX(Timestamp) FROM events').fetchone()
+        if first is None:
+            return None, None
+        return (datetime.fromtimestamp(first, EVENTS_TIME_ZONE).date(),
+                datetime.fromtimestamp(last, EVENTS_TIME_ZONE).date())
+
+    def next_event_timestamp(self, after, volatilities=None):
+        where_sql, params = _build_filters(volatilities=volatilities)
+        where_sql = f"{where_sql} AND Timestamp >= ?" if where_sql else " WHERE Timestamp >= ?"
+        with self._lock:
+            return self._conn.execute(f"SELECT MIN(Timestamp) FROM events{where_sql}", params + [int(after)]).fetchone()[0]
+
+    def load_events(self):
+        return self.query_events()
+
+    def export_events(self, sink, fmt='arrow'):
+        """
+        Stream every event into a file with the schema of the snapshot export, one record batch at a time.
+
+        Parameters:
+        sink (str or file-like): Path or writable binary file to write to.
+        fmt (str): 'arrow' for an Arrow IPC stream, or 'csv'.
+
+        Raises:
+        ImportError: If pyarrow is not installed.
+        ValueError: If the format is not supported.
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Exporting events requires the pyarrow package.")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        schema = snapshot_schema()
+        writer_class = ipc.new_stream if fmt == 'arrow' else pa_csv.CSVWriter
+        sql = f"SELECT {self._select_list(EVENT_COLUMNS)} FROM events ORDER BY Timestamp NULLS FIRST, rowid"
+        with self._lock, writer_class(sink, schema) as writer:
+            result = self._conn.execute(sql)
+            # DuckDB releases that have to_arrow_reader deprecate fetch_record_batch in its favour
+            reader = (result.to_arrow_reader(EXPORT_BATCH_ROWS) if hasattr(result, 'to_arrow_reader')
+                      else result.fetch_record_batch(EXPORT_BATCH_ROWS))
+            for batch in reader:
+                for cast in pa.Table.from_batches([batch]).cast(schema).to_batches():
+                    writer.write_batch(cast)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Function to index the series of a DuckDB database for text search
+def _series_index(series):
+    """
+    Build an in-memory FTS5 index over the names of (event, currency) pairs, laid out like the event_search
+    table of data_storer, or return None without FTS5. Row i + 1 of the index is series[i].
+    """
+    if not FTS5_AVAILABLE:
+        return None
+    index = sqlite3.connect(':memory:', check_same_thread=False)
+    index.execute("CREATE VIRTUAL TABLE event_search USING fts5(Event, Currency, prefix='2 3')")
+    index.executemany('INSERT INTO event_search (rowid, Event, Currency) VALUES (?, ?, ?)',
+                      [(rowid, event or None, currency or None) for rowid, (event, currency) in enumerate(series, 1)])
+    return index
+
+# Function to run a text search over indexed series
+def _search_series(series, index, search):
+    """
+    Return the (event, currency) pairs matching search, with the query semantics of data_storer.search_series.
+    """
+    if index is not None:
+        try:
+            rows = index.execute('SELECT rowid FROM event_search WHERE event_search MATCH ?', (search,)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {search!r}: {e}") from e
+        return [series[rowid - 1] for rowid, in rows]
+    words = [word.strip('"*').lower() for word in search.split()]
+    return [(event, currency) for event, currency in series if all(word in f"{event} {currency}".lower() for word in words)]
+
+# Registry of available storage backends
+STORAGE_BACKENDS = {'sqlite': SQLiteBackend}
+if DUCKDB_AVAILABLE:
+    STORAGE_BACKENDS['duckdb'] = DuckDBBackend
+
+DEFAULT_BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlite')
+
+def register_backend(name, factory):
+    """
+    Register a storage backend.
+
+    Parameters:
+    name (str): The backend name used to select it.
+    factory (callable): A class or function taking a db_name and returning a backend.
+    """
+    STORAGE_BACKENDS[name] = factory
+
+def get_backend(name=None, db_name=None):
+    """
+    Create a storage backend with its table ready.
+
+    Parameters:
+    name (str): Name of the backend. Default is DEFAULT_BACKEND, set by the STORAGE_BACKEND environment variable.
+    db_name (str): The database file. Default is the backend's own default.
+
+    Returns:
+    object: The backend, with create_table, store_events, get_events, query_events, count_events,
+    aggregate_events, distinct_values, date_bounds, next_event_timestamp, data_version, load_events
+    and export_events methods.
+
+    Raises:
+    ValueError: If the backend is not registered.
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    backend = STORAGE_BACKENDS[name](db_name) if db_name else STORAGE_BACKENDS[name]()
+    backend.create_table()
+    return backend
+
+# Backends shared by the readers and writers of this process, by name and database file
+_SHARED_BACKENDS = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_backend(name=None, db_name=None):
+    """
+    Return the process-wide backend for a database, creating it on first use.
+
+    The dashboard queries and the background refresh both go through it, so
+    the STORAGE_BACKEND environment variable switches them together.
+
+    Parameters:
+    name (str): Name of the backend. Default is DEFAULT_BACKEND.
+    db_name (str): The database file. Default is the backend's own default.
+
+    Returns:
+    object: The backend, as returned by get_backend.
+    """
+    key = (name or DEFAULT_BACKEND, db_name)
+    with _SHARED_LOCK:
+        if key not in _SHARED_BACKENDS:
+            _SHARED_BACKENDS[key] = get_backend(*key)
+        return _SHARED_BACKENDS[key]
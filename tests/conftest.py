@@ -1,6 +1,57 @@
 import sys
 import os
+import pytest
 
 # Insert the parent directory of the current file into the system path
 # This allows importing modules from the parent directory
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_storer import create_table
+
+@pytest.fixture(scope='session', autouse=True)
+def run_directory(tmp_path_factory):
+    """
+    Run the tests from a temporary directory.
+
+    Databases opened by a relative name, such as test_economic_events.db and
+    the default economic_events.db, are then created there instead of in the
+    repository root.
+    """
+    directory = tmp_path_factory.mktemp('run')
+    previous = os.getcwd()
+    os.chdir(directory)
+    yield directory
+    os.chdir(previous)
+
+@pytest.fixture
+def db_name(tmp_path):
+    """
+    Create an empty database in a temporary directory.
+    """
+    name = str(tmp_path / 'events.db')
+    create_table(name)
+    return name
+
+def pytest_addoption(parser):
+    """
+    Add the --run-reports option that enables the performance report tests.
+    """
+    parser.addoption('--run-reports', action='store_true', default=False,
+                     help="Run the performance report tests marked with 'report'.")
+
+def pytest_configure(config):
+    """
+    Register the report marker.
+    """
+    config.addinivalue_line('markers', 'report: performance report on synthetic data, skipped unless --run-reports is given')
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Skip the report tests unless --run-reports is given.
+    """
+    if config.getoption('--run-reports'):
+        return
+    skip_report = pytest.mark.skip(reason="Performance report; use --run-reports to run it.")
+    for item in items:
+        if 'report' in item.keywords:
+            item.add_marker(skip_report)
@@ -0,0 +1,26 @@
+# Shared builders for the test events
+
+def make_event(date_str, time_str, currency, volatility, name, forecast='1'):
+    """
+    Build a test event.
+    """
+    return {
+        'Date': date_str,
+        'Time': time_str,
+        'Currency': currency,
+        'Volatility': volatility,
+        'Event': name,
+        'Forecast': forecast,
+        'Previous': '0'
+    }
+
+# Events around a year boundary, with a missing time, currency and volatility and an unparseable date
+EVENTS = [
+    make_event('12/29/23', '08:30', 'USD', 'High', 'Payrolls'),
+    make_event('12/30/23', '09:00', 'EUR', 'Low', 'Sentiment'),
+    make_event('12/31/23', None, 'JPY', None, 'Holiday'),
+    make_event('01/02/24', '23:59', 'USD', 'Moderate', 'Late Release'),
+    make_event('01/02/24', '10:00', 'EUR', 'High', 'Rate Decision'),
+    make_event('01/03/24', '00:00', None, 'Low', 'Housing'),
+    make_event('not a date', '08:30', 'USD', 'High', 'Undated'),
+]
@@ -0,0 +1,111 @@
+import json
+import os
+from datetime import date
+from unittest.mock import AsyncMock
+from urllib.parse import parse_qs
+import httpx
+import pytest
+import data_fetcher
+from backfill import backfill, split_windows, load_checkpoint, window_key
+from data_storer import create_table, get_events
+
+# Sample calendar HTML returned for every page
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'calendar.html')
+with open(FIXTURE_PATH, encoding='utf-8') as fixture:
+    CALENDAR_HTML = fixture.read()
+
+def page(more):
+    """
+    Build a calendar JSON payload, optionally asking for another page.
+    """
+    return {'data': CALENDAR_HTML, 'rows_num': 6, 'last_time_scope': 1719792000, 'bind_scroll_handler': more}
+
+def test_split_windows():
+    """
+    Test that a date range is split into consecutive inclusive windows.
+    """
+    windows = split_windows(date(2024, 1, 1), date(2024, 1, 10), window_days=4)
+    assert windows == [
+        (date(2024, 1, 1), date(2024, 1, 4)),
+        (date(2024, 1, 5), date(2024, 1, 8)),
+        (date(2024, 1, 9), date(2024, 1, 10)),
+    ]
+    with pytest.raises(ValueError):
+        split_windows(date(2024, 1, 1), date(2024, 1, 2), window_days=0)
+
+def test_backfill_follows_paging_and_checkpoints(mocker, tmp_path):
+    """
+    Test a backfill over two windows.
+
+    This test checks the following:
+    1. Paging follows limit_from until the endpoint stops asking for more rows.
+    2. Every window is recorded in the checkpoint.
+    3. Events are stored in the database.
+    """
+    db_name = str(tmp_path / 'backfill.db')
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    create_table(db_name)
+    # Each window returns two pages: the first asks for more rows, the second does not
+    mock_fetch = mocker.patch('data_fetcher.fetch_page_async', new=AsyncMock(side_effect=[page(True), page(False), page(True), page(False)]))
+
+    summary = backfill('2024-07-01', '2024-07-14', window_days=7, concurrency=1,
+                       checkpoint_path=checkpoint, db_name=db_name, batch_size=4)
+
+    assert summary == {'windows': 2, 'skipped': 0, 'completed': 2, 'failed': 0, 'events': 24}
+    assert [call.args[2]['limit_from'] for call in mock_fetch.call_args_list] == ['0', '1', '0', '1']
+    assert mock_fetch.call_args_list[1].args[2]['last_time_scope'] == 1719792000
+    with open(checkpoint, encoding='utf-8') as f:
+        assert json.load(f)['completed'] == ['2024-07-01/2024-07-07', '2024-07-08/2024-07-14']
+    assert len(get_events(db_name)) == 6
+
+def test_backfill_resumes_from_checkpoint(mocker, tmp_path):
+    """
+    Test that a failed window is retried on the next run while completed windows are skipped.
+    """
+    db_name = str(tmp_path / 'backfill.db')
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    create_table(db_name)
+
+    # First run: the second window fails
+    mocker.patch('data_fetcher.fetch_page_async', new=AsyncMock(side_effect=[page(False), None]))
+    summary = backfill('2024-07-01', '2024-07-14', window_days=7, concurrency=1, checkpoint_path=checkpoint, db_name=db_name)
+    assert summary['completed'] == 1
+    assert summary['failed'] == 1
+    assert load_checkpoint(checkpoint) == {window_key((date(2024, 7, 1), date(2024, 7, 7)))}
+
+    # Second run: only the failed window is requested again
+    mock_fetch = mocker.patch('data_fetcher.fetch_page_async', new=AsyncMock(side_effect=[page(False)]))
+    summary = backfill('2024-07-01', '2024-07-14', window_days=7, concurrency=1, checkpoint_path=checkpoint, db_name=db_name)
+    assert summary['skipped'] == 1
+    assert summary['completed'] == 1
+    assert mock_fetch.call_args.args[2]['dateFrom'] == '2024-07-08'
+    assert len(load_checkpoint(checkpoint)) == 2
+
+def test_streamed_backfill_matches_buffered(monkeypatch, tmp_path):
+    """
+    Test that a streaming backfill parses bodies arriving in small chunks into the same events and pages.
+    """
+    db_name = str(tmp_path / 'backfill.db')
+    create_table(db_name)
+    requests = []
+
+    def handler(request):
+        form = parse_qs(request.content.decode())
+        requests.append(form['limit_from'][0])
+        body = json.dumps(page(form['limit_from'][0] == '0')).replace('/', '\\/').encode()
+
+        async def chunks():
+            for start in range(0, len(body), 100):
+                yield body[start:start + 100]
+
+        return httpx.Response(200, content=chunks())
+
+    monkeypatch.setattr(data_fetcher, 'RESPONSE_CACHE', None)
+    monkeypatch.setattr(data_fetcher, '_async_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    summary = backfill('2024-07-01', '2024-07-07', window_days=7, checkpoint_path=str(tmp_path / 'checkpoint.json'),
+                       db_name=db_name, batch_size=4, stream=True)
+
+    assert summary == {'windows': 1, 'skipped': 0, 'completed': 1, 'failed': 0, 'events': 12}
+    assert requests == ['0', '1']
+    assert get_events(db_name)['Event'].tolist() == [event['Event'] for event in data_fetcher.parse_html(CALENDAR_HTML)]
@@ -1,5 +1,7 @@
+import os
 import pytest
 from data_fetcher import fetch_economic_events
+from event_parser import parse_html, PARSER_BACKENDS
 from data_storer import store_events, get_events
 import platform
 
@@ -12,6 +14,11 @@ STORE_EVENTS_TIME_LIMIT = 2
 GET_EVENTS_TIME_LIMIT = 2
 SEND_EMAIL_TIME_LIMIT = 2
 
+# Sample calendar page repeated to the size of a backfill response
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'calendar.html')
+with open(FIXTURE_PATH, encoding='utf-8') as fixture:
+    LARGE_CALENDAR_HTML = fixture.read() * 50
+
 # Benchmark for fetching economic events
 def test_fetch_economic_events_benchmark(benchmark):
     result = benchmark.pedantic(fetch_economic_events, iterations=1, rounds=5)
@@ -39,6 +46,12 @@ def test_get_events_benchmark(benchmark):
     assert not result.empty
     assert len(result) > 0
 
+# Benchmark for each HTML parser backend
+@pytest.mark.parametrize('backend', sorted(PARSER_BACKENDS))
+def test_parse_html_benchmark(benchmark, backend):
+    result = benchmark(parse_html, LARGE_CALENDAR_HTML, backend)
+    assert len(result) == 300
+
 @pytest.mark.skipif(platform.system() != "Windows", reason="Email sending is only supported on Windows.")
 def test_send_email_benchmark(mocker, benchmark):
     test_events = [
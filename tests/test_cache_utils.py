@@ -0,0 +1,41 @@
+from cache_utils import LRUCache
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    Test that the entry used least recently is evicted when the cache is full.
+    """
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_lru_cache_size_bound():
+    """
+    Test that the total size bound evicts entries and rejects values larger than the bound.
+    """
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'yyyy')
+    cache.put('c', 'zzzz')
+    assert len(cache) == 2
+    assert cache.get('a') is None
+
+    cache.put('big', 'x' * 11)
+    assert cache.get('big') is None
+    assert cache.stats()['bytes'] == 8
+
+def test_lru_cache_get_or_compute():
+    """
+    Test that get_or_compute only calls the compute function on a miss.
+    """
+    cache = LRUCache()
+    calls = []
+    assert cache.get_or_compute('k', lambda: calls.append(1) or 'value') == 'value'
+    assert cache.get_or_compute('k', lambda: calls.append(1) or 'other') == 'value'
+    assert len(calls) == 1
@@ -0,0 +1,116 @@
+import pandas as pd
+from data_storer import EVENTS_TIME_ZONE, event_timestamp, to_compact_frame
+from chart_worker import (build_time_and_currency_figure, build_currency_and_volatility_figure, aggregate_time_and_currency,
+                          aggregate_day_counts, choose_time_bin, volatility_scores, cached_figure, FIGURE_CACHE, prepare_currency_and_volatility_counts)
+
+def events_frame(days, per_day):
+    """
+    Build a compact events frame with per_day events on each of days consecutive days.
+    """
+    rows = []
+    for day in pd.date_range('2023-01-01', periods=days, freq='D'):
+        for slot in range(per_day):
+            date_str = day.strftime('%m/%d/%y')
+            time_str = f"{slot % 24:02d}:{(slot // 24) % 4 * 15:02d}"
+            rows.append({
+                'Date': date_str,
+                'Time': time_str,
+                'Currency': ['USD', 'EUR', 'JPY'][slot % 3],
+                'Volatility': ['Low', 'Moderate', 'High', None][slot % 4],
+                'Event': f"Event {slot}",
+                'Forecast': '1',
+                'Previous': '0',
+                'Timestamp': event_timestamp(date_str, time_str),
+            })
+    return to_compact_frame(pd.DataFrame(rows))
+
+def test_volatility_scores():
+    """
+    Test that volatility levels map to scores, with 0 for missing levels.
+    """
+    scores = volatility_scores(pd.Series(['High', 'Moderate', 'Low', None], dtype='category'))
+    assert list(scores) == [3, 2, 1, 0]
+
+def test_choose_time_bin_bounds_the_number_of_buckets():
+    """
+    Test that the chosen bucket size keeps the number of buckets under the limit.
+    """
+    start = pd.Timestamp('2023-01-01')
+    assert choose_time_bin(start, start + pd.Timedelta(hours=12), max_bins=100) == '15min'
+    assert choose_time_bin(start, start + pd.Timedelta(days=20), max_bins=100) == '6h'
+    assert choose_time_bin(start, start + pd.Timedelta(days=3650), max_bins=100) == 'QS'
+
+def test_small_selection_uses_webgl_markers():
+    """
+    Test that selections under the threshold are drawn as one WebGL marker per event.
+    """
+    df = events_frame(days=2, per_day=12)
+    fig = build_time_and_currency_figure(df, max_points=100)
+
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    assert sum(len(trace.x) for trace in fig.data) == len(df)
+
+def test_large_selection_is_aggregated_with_bounded_payload():
+    """
+    Test that selections over the threshold become a bounded heatmap.
+
+    This test performs the following checks:
+    1. The figure is a single heatmap with one row per currency.
+    2. The number of time buckets stays under the limit.
+    3. The cells add up to the total volatility score.
+    4. The payload does not grow with the number of events in the same range.
+    """
+    df = events_frame(days=120, per_day=48)
+    fig = build_time_and_currency_figure(df, max_points=1000, max_bins=50)
+    heatmap = fig.data[0]
+
+    assert len(fig.data) == 1 and heatmap.type == 'heatmap'
+    assert list(heatmap.y) == ['EUR', 'JPY', 'USD']
+    assert len(heatmap.x) <= 50
+    assert heatmap.z.sum() == volatility_scores(df['Volatility']).sum()
+
+    sparse = build_time_and_currency_figure(df.iloc[::4], max_points=1000, max_bins=50)
+    assert len(fig.to_json()) < 2 * len(sparse.to_json())
+
+def test_aggregate_time_and_currency_ignores_undated_events():
+    """
+    Test that events without a Timestamp are left out of the aggregation.
+    """
+    df = events_frame(days=1, per_day=6)
+    df.loc[0, 'Timestamp'] = pd.NaT
+    intensity = aggregate_time_and_currency(df)
+    assert intensity.to_numpy().sum() == volatility_scores(df['Volatility'].iloc[1:]).sum()
+
+def test_aggregate_day_counts_matches_the_events():
+    """
+    Test that daily rollup counts give the same totals per currency as the events, in at most max_bins day buckets.
+    """
+    df = events_frame(days=120, per_day=48)
+    days = df['Timestamp'].dt.tz_convert(EVENTS_TIME_ZONE).dt.strftime('%Y-%m-%d')
+    day_counts = df.assign(Day=days).groupby(['Day', 'Currency', 'Volatility'], observed=True, dropna=False).size().reset_index(name='Count')
+    day_counts.loc[len(day_counts)] = ['', 'USD', 'High', 5]
+
+    intensity = aggregate_day_counts(day_counts, max_bins=50)
+
+    assert len(intensity.columns) <= 50
+    expected = df.assign(Score=volatility_scores(df['Volatility'])).groupby('Currency', observed=True)['Score'].sum()
+    assert intensity.sum(axis=1).to_dict() == expected.to_dict()
+
+def test_cached_figure_builds_once_per_key(mocker):
+    """
+    Test that figures are built once per cache key and rebuilt from JSON afterwards.
+    """
+    FIGURE_CACHE.clear()
+    df = events_frame(days=2, per_day=12)
+    build = mocker.Mock(side_effect=lambda: build_currency_and_volatility_figure(prepare_currency_and_volatility_counts(df)))
+
+    first = cached_figure('currency_and_volatility', ('version 1', 'USD'), build)
+    second = cached_figure('currency_and_volatility', ('version 1', 'USD'), build)
+    cached_figure('currency_and_volatility', ('version 2', 'USD'), build)
+
+    assert build.call_count == 2
+    assert second.to_dict() == first.to_dict()
+
+    # Without a key the cache is bypassed
+    cached_figure('currency_and_volatility', None, build)
+    assert build.call_count == 3
@@ -0,0 +1,297 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+import pytest
+import pandas as pd
+import compaction
+import data_storer
+from compaction import hot_cutoff, months_to_archive, archive_month, compact_events
+from data_storer import (EVENTS_TIME_ZONE, create_table, store_events, query_events, count_events, query_rollups,
+                         get_distinct_values, get_date_bounds, get_archives, get_events, load_snapshot_events, archive_path,
+                         get_data_version, get_revisions_since)
+from helpers import make_event
+from db_connection import get_connection
+
+NOW = datetime(2024, 3, 20, 12, 0, tzinfo=EVENTS_TIME_ZONE)
+
+# Events spread over the archived and hot months
+ARCHIVE_EVENTS = [
+    make_event('12/29/23', '08:30', 'USD', 'High', 'Payrolls'),
+    make_event('12/31/23', None, 'JPY', None, 'Holiday'),
+    make_event('01/02/24', '23:59', 'USD', 'Moderate', 'Late Release'),
+    make_event('01/02/24', '10:00', None, 'High', 'Rate Decision'),
+    make_event('01/15/24', '10:00', 'EUR', 'Low', 'Sentiment'),
+    make_event('03/01/24', '08:30', 'GBP', 'High', 'GDP'),
+    make_event('03/19/24', '14:00', 'USD', 'Low', 'Auction'),
+    make_event('not a date', '08:30', 'USD', 'High', 'Undated'),
+]
+
+@pytest.fixture
+def db_name(db_name):
+    """
+    Store ARCHIVE_EVENTS in the temporary database.
+    """
+    store_events(ARCHIVE_EVENTS, db_name)
+    return db_name
+
+def hot_count(db_name):
+    """
+    Return the number of rows left in the main events table.
+    """
+    return get_connection(db_name).execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+def read_everything(db_name):
+    """
+    Read the database through every query function that could see archived months.
+    """
+    range_filters = {'start_date': date(2023, 12, 30), 'end_date': date(2024, 3, 1)}
+    return {
+        'all': query_events(db_name=db_name),
+        'events': get_events(db_name).sort_values('Timestamp', ignore_index=True),
+        'range': query_events(db_name=db_name, **range_filters),
+        'by currency': query_events(db_name=db_name, order_by=['Currency', 'Timestamp'], descending=True),
+        'page': query_events(db_name=db_name, order_by=['Currency', 'Timestamp'], limit=3, offset=2),
+        'count': count_events(db_name=db_name, **range_filters),
+        'rollups': query_rollups(db_name=db_name, group_by=['Day', 'Currency']),
+        'currencies': get_distinct_values('Currency', db_name=db_name),
+        'range currencies': get_distinct_values('Currency', db_name=db_name, **range_filters),
+        'search': query_events(search='Sentiment OR Payrolls OR Currency:JPY', db_name=db_name),
+        'search count': count_events(search='Sentiment OR Payrolls OR Currency:JPY', db_name=db_name),
+        'bounds': get_date_bounds(db_name),
+        'snapshot': load_snapshot_events(db_name),
+    }
+
+def assert_same_results(before, after):
+    """
+    Assert that two read_everything results are identical.
+    """
+    for key, value in before.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(after[key], value, obj=key)
+        else:
+            assert after[key] == value, key
+
+def test_months_to_archive_stop_at_the_hot_window(db_name):
+    """
+    Test that only whole months older than the hot window are due for archiving.
+    """
+    assert hot_cutoff(8, NOW) == '2024-01'
+    assert months_to_archive(8, db_name, NOW) == ['2023-12']
+    assert months_to_archive(4, db_name, NOW) == ['2023-12', '2024-01']
+
+def test_compaction_is_transparent_to_queries(db_name):
+    """
+    Test that archiving months moves their rows out of the main table without changing any query result.
+    """
+    before = read_everything(db_name)
+
+    assert compact_events(4, db_name, NOW) == {'2023-12': 2, '2024-01': 3}
+
+    assert get_archives(db_name=db_name) == ['2023-12', '2024-01']
+    assert hot_count(db_name) == 3
+    assert_same_results(before, read_everything(db_name))
+    # Nothing left to move
+    assert compact_events(4, db_name, NOW) == {}
+
+def test_archived_rollups_are_recounted_with_timestamp_days(db_name):
+    """
+    Test that create_table recounts the rollups of archived months in a database written before the days came from the Timestamp.
+    """
+    compact_events(4, db_name, NOW)
+    before = read_everything(db_name)
+    conn = sqlite3.connect(db_name)
+    # Databases of that time have no offsets table and triggers that do not read it
+    for trigger in ('events_rollup_insert', 'events_rollup_delete', 'events_rollup_update'):
+        conn.execute(f'DROP TRIGGER {trigger}')
+    conn.execute('DROP TABLE time_zone_offsets')
+    conn.execute('DELETE FROM event_rollups')
+    conn.commit()
+    conn.close()
+
+    create_table(db_name)
+
+    assert_same_results(before, read_everything(db_name))
+
+def test_date_range_reads_only_the_archives_it_touches(db_name):
+    """
+    Test that a date range attaches only the archived months it overlaps.
+    """
+    compact_events(4, db_name, NOW)
+
+    query_events(db_name=db_name, start_date=date(2024, 1, 10), end_date=date(2024, 3, 31))
+
+    attached = [row[1] for row in get_connection(db_name).execute('PRAGMA database_list')]
+    assert attached == ['main', 'archive_2024_01']
+
+def test_queries_beyond_the_attach_limit(db_name):
+    """
+    Test that archives are read in groups when they do not all fit within the attach limit.
+    """
+    before = read_everything(db_name)
+    compact_events(4, db_name, NOW)
+    get_connection(db_name).setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 1)
+    try:
+        assert_same_results(before, read_everything(db_name))
+    finally:
+        get_connection(db_name).setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 10)
+
+def test_store_events_writes_archived_months_to_their_archive(db_name):
+    """
+    Test that events of an archived month are upserted into the archive and still counted.
+    """
+    compact_events(4, db_name, NOW)
+    version = get_data_version(db_name)
+
+    result = store_events([
+        make_event('01/15/24', '10:00', 'EUR', 'High', 'Sentiment', forecast='2'),
+        make_event('01/20/24', '09:00', 'CHF', 'Low', 'Retail Sales'),
+        make_event('03/20/24', '09:00', 'USD', 'Low', 'Claims'),
+    ], db_name)
+
+    assert result == {'inserted': 2, 'updated': 1}
+    assert hot_count(db_name) == 4
+    archived = get_connection(archive_path('2024-01', db_name)).execute('SELECT COUNT(*) FROM events').fetchone()[0]
+    assert archived == 4
+    january = query_events(db_name=db_name, start_date=date(2024, 1, 1), end_date=date(2024, 1, 31))
+    assert january.loc[january['Event'] == 'Sentiment', 'Volatility'].tolist() == ['High']
+    assert count_events(db_name=db_name, start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)) == 4
+    assert count_events(db_name=db_name, volatilities=['Low'], start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)) == 1
+    assert query_events(search='Retail', db_name=db_name)['Currency'].tolist() == ['CHF']
+    revisions = get_revisions_since(version, db_name)
+    assert revisions[['Change', 'Event']].values.tolist() == [['update', 'Sentiment'], ['insert', 'Retail Sales'], ['insert', 'Claims']]
+    assert revisions.loc[0, ['Volatility', 'OldVolatility']].tolist() == ['High', 'Low']
+    pd.testing.assert_frame_equal(load_snapshot_events(db_name), query_events(db_name=db_name))
+
+def test_failed_main_write_leaves_archives_unchanged(monkeypatch, db_name):
+    """
+    Test that a failure in the main database write rolls back the archive writes of the same call.
+
+    This test performs the following checks:
+    1. After the failure neither the archive, the rollups nor the data version changed.
+    2. Retrying the same call stores every event and counts it once.
+    """
+    compact_events(4, db_name, NOW)
+    version = get_data_version(db_name)
+    before = read_everything(db_name)
+    events = [
+        make_event('01/15/24', '10:00', 'EUR', 'High', 'Sentiment', forecast='2'),
+        make_event('01/20/24', '09:00', 'CHF', 'Low', 'Retail Sales'),
+        make_event('03/20/24', '09:00', 'USD', 'Low', 'Claims'),
+    ]
+
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    # Fail after the archive and main rows were upserted, while the rollups are updated
+    with monkeypatch.context() as patch:
+        patch.setattr(data_storer, '_recount_month_rollups', fail)
+        with pytest.raises(sqlite3.OperationalError):
+            store_events(events, db_name)
+
+    assert get_data_version(db_name) == version
+    assert get_connection(archive_path('2024-01', db_name)).execute('SELECT COUNT(*) FROM events').fetchone()[0] == 3
+    assert_same_results(before, read_everything(db_name))
+
+    assert store_events(events, db_name) == {'inserted': 2, 'updated': 1}
+    assert get_data_version(db_name) == version + 1
+    assert count_events(db_name=db_name, start_date=date(2024, 1, 1), end_date=date(2024, 1, 31)) == 4
+    assert len(get_revisions_since(version, db_name)) == 3
+
+def test_store_events_beyond_the_attach_limit(db_name):
+    """
+    Test that a call touching more archived months than can be attached at once still stores every event.
+    """
+    compact_events(4, db_name, NOW)
+    version = get_data_version(db_name)
+    get_connection(db_name).setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 1)
+    try:
+        result = store_events([
+            make_event('12/20/23', '10:00', 'EUR', 'Low', 'Sentiment'),
+            make_event('01/20/24', '09:00', 'CHF', 'Low', 'Retail Sales'),
+            make_event('03/20/24', '09:00', 'USD', 'Low', 'Claims'),
+        ], db_name)
+    finally:
+        get_connection(db_name).setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 10)
+
+    assert result == {'inserted': 3, 'updated': 0}
+    assert len(get_revisions_since(version, db_name)) == 3
+    assert count_events(db_name=db_name, start_date=date(2023, 12, 1), end_date=date(2024, 1, 31)) == 7
+    pd.testing.assert_frame_equal(load_snapshot_events(db_name), query_events(db_name=db_name))
+
+def test_archives_storing_names_are_migrated(db_name):
+    """
+    Test that create_table moves an archive written with Currency and Event names onto dimension ids.
+    """
+    before = read_everything(db_name)
+    compact_events(4, db_name, NOW)
+    # Rewrite an archive as it was stored before the dimension tables existed
+    archive = sqlite3.connect(archive_path('2024-01', db_name))
+    archive.execute('ATTACH DATABASE ? AS main_db', (db_name,))
+    archive.executescript('''
+        CREATE TABLE events_names AS
+            SELECT events.Date, events.Time, currencies.Name AS Currency, events.Volatility, event_types.Name AS Event,
+                   events.Forecast, events.Previous, events.Timestamp
+            FROM events
+            LEFT JOIN main_db.currencies AS currencies ON currencies.Id = events.CurrencyId
+            LEFT JOIN main_db.event_types AS event_types ON event_types.Id = events.EventId
+            ORDER BY events.rowid;
+        DROP TABLE events;
+        ALTER TABLE events_names RENAME TO events;
+    ''')
+    archive.close()
+
+    create_table(db_name)
+
+    columns = [row[1] for row in get_connection(archive_path('2024-01', db_name)).execute('PRAGMA table_info(events)')]
+    assert 'EventId' in columns and 'Event' not in columns
+    assert 'RowHash' in columns
+    assert_same_results(before, read_everything(db_name))
+
+def test_archive_month_gives_up_while_the_data_keeps_changing(monkeypatch, db_name):
+    """
+    Test that a month is left in the main table when writes land between the copy and the move.
+    """
+    write_archive = compaction._write_archive
+    revisions = iter(range(10, 100))
+
+    def write_archive_then_store(path, rows):
+        write_archive(path, rows)
+        store_events([make_event('03/19/24', '14:00', 'USD', 'Low', 'Auction', forecast=str(next(revisions)))], db_name)
+
+    monkeypatch.setattr(compaction, '_write_archive', write_archive_then_store)
+
+    assert archive_month('2023-12', db_name) == 0
+    assert get_archives(db_name=db_name) == []
+    assert hot_count(db_name) == len(ARCHIVE_EVENTS)
+
+def test_archive_month_moves_on_the_ingest_writer(monkeypatch, db_name):
+    """
+    Test that the move transaction runs on the database's ingest queue writer thread.
+    """
+    move_month = compaction._move_month
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+        return move_month(*args)
+
+    monkeypatch.setattr(compaction, '_move_month', record_thread)
+
+    assert archive_month('2023-12', db_name) == 2
+    assert threads == ['ingest-writer']
+
+def test_failed_move_removes_the_archive_file(db_name):
+    """
+    Test that an archive file put in place is removed again when the move transaction rolls back.
+    """
+    conn = get_connection(db_name)
+    conn.execute("CREATE TRIGGER fail_archive BEFORE INSERT ON archives BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    conn.commit()
+
+    with pytest.raises(sqlite3.DatabaseError):
+        archive_month('2023-12', db_name)
+
+    assert not os.path.exists(archive_path('2023-12', db_name))
+    assert get_archives(db_name=db_name) == []
+    assert hot_count(db_name) == len(ARCHIVE_EVENTS)
@@ -1,5 +1,24 @@
+import json
+import os
+import httpx
 import pytest
-from data_fetcher import fetch_economic_events
+import data_fetcher
+from data_fetcher import fetch_economic_events, split_countries, PayloadStream, COUNTRIES
+from response_cache import ResponseCache
+
+# Sample calendar HTML used by the offline tests
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'calendar.html')
+with open(FIXTURE_PATH, encoding='utf-8') as fixture:
+    CALENDAR_HTML = fixture.read()
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache(tmp_path, monkeypatch):
+    """
+    Give every test an empty response cache so cached bodies never leak between tests.
+    """
+    cache = ResponseCache(str(tmp_path / 'http_cache'))
+    monkeypatch.setattr(data_fetcher, 'RESPONSE_CACHE', cache)
+    return cache
 
 # Test function for fetching economic events
 def test_fetch_economic_events():
@@ -35,14 +54,119 @@ def test_fetch_economic_events_network_error(mocker):
     Test the fetch_economic_events function to handle network errors gracefully.
 
     This test checks the following:
-    1. The httpx.Client.post method is mocked to raise an Exception simulating a network error.
+    1. The httpx.AsyncClient.post method is mocked to raise an Exception simulating a network error.
     2. The fetch_economic_events function should return an empty list when a network error occurs.
     """
-    # Mock the httpx.Client.post method to raise an Exception with the message "Network Error"
-    mocker.patch('httpx.Client.post', side_effect=Exception("Network Error"))
+    # Mock the httpx.AsyncClient.post method to raise an Exception with the message "Network Error"
+    mocker.patch('httpx.AsyncClient.post', side_effect=Exception("Network Error"))
 
     # Fetch economic events
     events = fetch_economic_events()
 
     # Assert that the function returns an empty list in case of a network error
     assert events == []
+
+def test_fetch_economic_events_concurrent_tabs(mocker):
+    """
+    Test that both week tabs are requested through the shared async client and merged.
+
+    This test checks the following:
+    1. One request is sent per tab.
+    2. Events returned by both tabs are deduplicated in the merged result.
+    """
+    # Both tabs return the same page, so every event is a duplicate
+    mock_post = mocker.patch('httpx.AsyncClient.post', return_value=httpx.Response(200, json={'data': CALENDAR_HTML}))
+
+    events = fetch_economic_events()
+
+    assert mock_post.call_count == 2
+    tabs = sorted(call.kwargs['data']['currentTab'] for call in mock_post.call_args_list)
+    assert tabs == ['nextWeek', 'thisWeek']
+    assert len(events) == 6
+    assert len({(e['Date'], e['Time'], e['Currency'], e['Event']) for e in events}) == 6
+
+def test_fetch_economic_events_country_groups(mocker):
+    """
+    Test that the country list can be fanned out into parallel per-group requests.
+
+    This test checks the following:
+    1. One request is sent per tab and country group.
+    2. Every country is requested exactly once per tab.
+    """
+    mock_post = mocker.patch('httpx.AsyncClient.post', return_value=httpx.Response(200, json={'data': CALENDAR_HTML}))
+
+    events = fetch_economic_events(tabs=('thisWeek',), country_groups=4)
+
+    assert mock_post.call_count == 4
+    requested = sorted(c for call in mock_post.call_args_list for c in call.kwargs['data']['country[]'])
+    assert requested == sorted(COUNTRIES)
+    assert len(events) == 6
+
+def test_split_countries():
+    """
+    Test that split_countries covers every country with balanced, non-empty groups.
+    """
+    groups = split_countries(COUNTRIES, 3)
+    assert [len(group) for group in groups] == [7, 7, 6]
+    assert sum(groups, []) == COUNTRIES
+    assert split_countries(["1", "2"], 5) == [["1"], ["2"]]
+
+def test_fetch_economic_events_uses_response_cache(mocker, fresh_response_cache):
+    """
+    Test that a second refresh within the TTL is served from the response cache.
+
+    This test checks the following:
+    1. The first refresh sends one request per tab.
+    2. The second refresh sends no request and returns the same events.
+    3. The cache counters record the hits and misses.
+    """
+    mock_post = mocker.patch('httpx.AsyncClient.post', return_value=httpx.Response(200, json={'data': CALENDAR_HTML}))
+
+    first = fetch_economic_events()
+    second = fetch_economic_events()
+
+    assert mock_post.call_count == 2
+    assert first == second
+    assert fresh_response_cache.stats()['hits'] == 2
+    assert fresh_response_cache.stats()['misses'] == 2
+
+def test_fetch_economic_events_skips_unchanged_bodies(mocker, fresh_response_cache):
+    """
+    Test that pages whose body did not change are not parsed again when skip_unchanged is set.
+    """
+    mocker.patch('httpx.AsyncClient.post', return_value=httpx.Response(200, json={'data': CALENDAR_HTML}))
+    mock_parse = mocker.patch('data_fetcher.parse_html', wraps=data_fetcher.parse_html)
+
+    assert len(fetch_economic_events(skip_unchanged=True)) == 6
+    assert fetch_economic_events(skip_unchanged=True) == []
+
+    assert mock_parse.call_count == 2
+    assert fresh_response_cache.stats()['skips'] == 2
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 6, 7, 11, 64, 4096])
+def test_payload_stream_decodes_data_in_chunks(chunk_size):
+    """
+    Test that the streamed data field and the rest of the payload decode like json.loads for any chunk boundaries.
+
+    The body escapes slashes like the calendar endpoint, and holds non-ASCII
+    text, a character outside the BMP and braces inside strings.
+    """
+    html = CALENDAR_HTML + 'Caf\u00e9 \U0001F4C8 "quoted" back\\slash {not an object}'
+    body = json.dumps({'data': html, 'rows_num': 6, 'extra': {'data': '}', 'list': [1, '"']}, 'bind_scroll_handler': True})
+    body = body.replace('/', '\\/')
+    stream = PayloadStream()
+
+    decoded = ''.join(stream.feed(body[start:start + chunk_size]) for start in range(0, len(body), chunk_size))
+
+    assert decoded == html
+    assert stream.close() == {'rows_num': 6, 'extra': {'data': '}', 'list': [1, '"']}, 'bind_scroll_handler': True}
+
+def test_payload_stream_rejects_truncated_body():
+    """
+    Test that a body cut off inside the data field raises a ValueError when closed.
+    """
+    stream = PayloadStream()
+    stream.feed('{"data": "<table>')
+
+    with pytest.raises(ValueError):
+        stream.close()
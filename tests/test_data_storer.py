@@ -1,6 +1,12 @@
 import pytest
+import pandas as pd
 import sqlite3
-from data_storer import create_table, store_events, get_events
+import threading
+from datetime import date
+import data_storer
+from data_storer import create_table, store_events, get_events, get_events_between, get_date_bounds, event_timestamp, query_events, get_distinct_values, count_events, query_rollups, lookup_ids, get_data_version, get_revisions_since, row_hash, VOLATILITY_DTYPE
+from db_connection import close_connections, get_connection
+from helpers import make_event, EVENTS
 
 # Define the name of the test database
 TEST_DB = 'test_economic_events.db'
@@ -71,6 +77,500 @@ def test_store_and_get_events():
     assert event.iloc[0]['Forecast'] == '123'
     assert event.iloc[0]['Previous'] == '100'
 
+def test_store_events_upsert_counts_and_revisions():
+    """
+    Test that store_events upserts events and reports inserted and updated counts.
+
+    This test performs the following checks:
+    1. New events are counted as inserted.
+    2. Storing the same events again changes nothing.
+    3. A revised Forecast/Previous/Volatility updates the stored row instead of being dropped.
+    4. Events without a time are still deduplicated.
+    """
+    test_events = [
+        {
+            'Date': '12/25/23',
+            'Time': '08:30',
+            'Currency': 'USD',
+            'Volatility': 'High',
+            'Event': 'Test Event',
+            'Forecast': '123',
+            'Previous': '100'
+        },
+        {
+            'Date': '12/25/23',
+            'Time': None,
+            'Currency': 'USD',
+            'Volatility': None,
+            'Event': 'Christmas Day',
+            'Forecast': None,
+            'Previous': None
+        }
+    ]
+    assert store_events(test_events, TEST_DB) == {'inserted': 2, 'updated': 0}
+    assert store_events(test_events, TEST_DB) == {'inserted': 0, 'updated': 0}
+
+    revised = dict(test_events[0], Forecast='125', Previous='101', Volatility='Moderate')
+    assert store_events([revised], TEST_DB) == {'inserted': 0, 'updated': 1}
+
+    events = get_events(TEST_DB)
+    assert len(events) == 2
+    row = events[events['Event'] == 'Test Event'].iloc[0]
+    assert row['Forecast'] == '125'
+    assert row['Previous'] == '101'
+    assert row['Volatility'] == 'Moderate'
+
+def test_migrate_unique_key_removes_duplicates(tmp_path):
+    """
+    Test that the unique key migration deduplicates an existing database, keeping the newest row.
+    """
+    db_name = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(db_name)
+    conn.execute('''CREATE TABLE events
+                    (Date TEXT, Time TEXT, Currency TEXT, Volatility TEXT, Event TEXT, Forecast TEXT, Previous TEXT)''')
+    rows = [
+        ('12/25/23', '08:30', 'USD', 'High', 'Test Event', '1', '0'),
+        ('12/25/23', '08:30', 'USD', 'High', 'Test Event', '2', '0'),
+        ('12/26/23', '08:30', 'USD', 'High', 'Test Event', '3', '0'),
+    ]
+    conn.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+    # The legacy table is moved to dimension ids first, then deduplicated by migrate_unique_key
+    create_table(db_name)
+    stored = get_connection(db_name).execute('SELECT Date, Forecast FROM events ORDER BY Date').fetchall()
+
+    assert stored == [('12/25/23', '2'), ('12/26/23', '3')]
+
+def usd_event(date_str, time_str, name):
+    """
+    Build a high volatility USD test event for the given date, time and name.
+    """
+    return make_event(date_str, time_str, 'USD', 'High', name)
+
+def test_event_timestamp():
+    """
+    Test that Date/Time pairs are converted to UTC epoch seconds in the events time zone.
+    """
+    # 08:30 Eastern Standard Time is 13:30 UTC
+    assert event_timestamp('12/25/23', '08:30') == 1703511000
+    # Non-clock times map to the start of the day
+    assert event_timestamp('12/25/23', 'All Day') == event_timestamp('12/25/23', '00:00')
+    assert event_timestamp('12/25/23', None) == event_timestamp('12/25/23', '00:00')
+    assert event_timestamp('not a date', '08:30') is None
+
+def test_get_events_between_across_year_boundary():
+    """
+    Test that date range queries are correct across a year boundary.
+
+    String comparison of '%m/%d/%y' dates would put 01/02/24 before 12/30/23;
+    the Timestamp column keeps the range chronological.
+    """
+    store_events([
+        usd_event('12/29/23', '08:30', 'Before Range'),
+        usd_event('12/30/23', '08:30', 'Start Of Range'),
+        usd_event('01/02/24', '23:59', 'End Of Range'),
+        usd_event('01/03/24', '00:00', 'After Range'),
+    ], TEST_DB)
+
+    events = get_events_between(date(2023, 12, 30), date(2024, 1, 2), TEST_DB)
+
+    assert list(events['Event']) == ['Start Of Range', 'End Of Range']
+    assert get_date_bounds(TEST_DB) == (date(2023, 12, 29), date(2024, 1, 3))
+
+def test_query_events_filters_projection_and_paging():
+    """
+    Test that query_events pushes filters, projection, ordering and paging down to SQL.
+
+    This test performs the following checks:
+    1. Currency, volatility and date filters are combined.
+    2. Only the requested columns are returned.
+    3. Ordering, limit and offset select the expected page.
+    4. None in the volatility list matches events without a volatility.
+    5. Unknown column names are rejected.
+    """
+    eur = dict(usd_event('12/26/23', '09:00', 'Euro Event'), Currency='EUR', Volatility='Low')
+    holiday = dict(usd_event('12/26/23', 'All Day', 'Holiday'), Volatility=None)
+    store_events([
+        usd_event('12/25/23', '08:30', 'First'),
+        usd_event('12/26/23', '08:30', 'Second'),
+        usd_event('12/27/23', '08:30', 'Third'),
+        eur,
+        holiday,
+    ], TEST_DB)
+
+    usd_high = query_events(currencies=['USD'], volatilities=['High'], start_date=date(2023, 12, 26), db_name=TEST_DB)
+    assert list(usd_high['Event']) == ['Second', 'Third']
+
+    projected = query_events(columns=['Event', 'Currency'], order_by='Event', descending=True, limit=2, offset=1, db_name=TEST_DB)
+    assert list(projected.columns) == ['Event', 'Currency']
+    assert list(projected['Event']) == ['Second', 'Holiday']
+
+    with_null = query_events(volatilities=['Low', None], db_name=TEST_DB)
+    assert sorted(with_null['Event']) == ['Euro Event', 'Holiday']
+    assert query_events(currencies=[], db_name=TEST_DB).empty
+
+    assert get_distinct_values('Currency', db_name=TEST_DB) == ['EUR', 'USD']
+    assert get_distinct_values('Currency', date(2023, 12, 25), date(2023, 12, 25), db_name=TEST_DB) == ['USD']
+
+    with pytest.raises(ValueError, match="Unknown event columns"):
+        query_events(columns=['Event; DROP TABLE events'], db_name=TEST_DB)
+
+def test_count_events_and_pages_cover_every_row_once():
+    """
+    Test that paging through tied sort keys neither repeats nor skips events.
+
+    Every event shares the same Timestamp, so the page boundaries depend on
+    the rowid tiebreaker.
+    """
+    store_events([usd_event('12/25/23', '08:30', f'Event {i:02d}') for i in range(23)], TEST_DB)
+
+    assert count_events(db_name=TEST_DB) == 23
+    assert count_events(currencies=['EUR'], db_name=TEST_DB) == 0
+    assert count_events(start_date=date(2023, 12, 25), end_date=date(2023, 12, 25), db_name=TEST_DB) == 23
+
+    for descending in (False, True):
+        pages = [query_events(order_by='Timestamp', descending=descending, limit=5, offset=offset, db_name=TEST_DB)
+                 for offset in range(0, 25, 5)]
+        names = [name for page in pages for name in page['Event']]
+        assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+        assert sorted(names) == [f'Event {i:02d}' for i in range(23)]
+
+def test_get_events_returns_a_compact_frame():
+    """
+    Test that get_events returns typed columns that filter like the plain frame and use less memory.
+    """
+    store_events(EVENTS + [usd_event(f"11/{day:02d}/23", f"{hour:02d}:00", 'Claims')
+                           for day in range(1, 29) for hour in range(24)], TEST_DB)
+    plain = pd.read_sql_query('SELECT * FROM named_events', get_connection(TEST_DB))
+    compact = get_events(TEST_DB)
+
+    assert compact['Currency'].dtype == 'category'
+    assert compact['Volatility'].dtype == VOLATILITY_DTYPE
+    assert str(compact['Timestamp'].dtype) == 'datetime64[ns, UTC]'
+    plain_filtered = plain[plain['Currency'].isin(['USD', 'EUR']) & plain['Volatility'].isin(['Moderate', 'High'])]
+    compact_filtered = compact[compact['Currency'].isin(['USD', 'EUR']) & (compact['Volatility'] >= 'Moderate')]
+    assert sorted(compact_filtered['Event']) == sorted(plain_filtered['Event'])
+    assert compact.memory_usage(deep=True).sum() < plain.memory_usage(deep=True).sum() / 2
+
+def test_migrate_timestamp_fills_legacy_rows(tmp_path):
+    """
+    Test that create_table adds and fills the Timestamp column on a database created without it.
+    """
+    db_name = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(db_name)
+    conn.execute('''CREATE TABLE events
+                    (Date TEXT, Time TEXT, Currency TEXT, Volatility TEXT, Event TEXT, Forecast TEXT, Previous TEXT)''')
+    conn.execute("INSERT INTO events VALUES ('12/25/23', '08:30', 'USD', 'High', 'Test Event', '123', '100')")
+    conn.commit()
+    conn.close()
+
+    create_table(db_name)
+
+    events = get_events(db_name)
+    assert events.iloc[0]['Timestamp'].timestamp() == event_timestamp('12/25/23', '08:30')
+    indexes = get_connection(db_name).execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()
+    assert ('idx_events_timestamp',) in indexes
+
+def rollup_counts(db_name):
+    """
+    Read the rollup table as a {(day, currency, volatility): count} dict.
+    """
+    return {(row.Day, row.Currency, row.Volatility): row.Count
+            for row in query_rollups(group_by=['Day', 'Currency', 'Volatility'], db_name=db_name).itertuples()}
+
+def test_rollups_follow_inserts_updates_and_deletes():
+    """
+    Test that the rollup table is maintained in the same transaction as every write.
+
+    This test performs the following checks:
+    1. Inserts add to the count of their day, currency and volatility.
+    2. An upsert that changes the volatility moves the event between rollup rows.
+    3. Deletes decrement the counts and remove rows that reach zero.
+    4. Events without a volatility or a parseable date are counted too.
+    """
+    store_events([
+        usd_event('12/25/23', '08:30', 'First'),
+        usd_event('12/25/23', '10:00', 'Second'),
+        dict(usd_event('12/26/23', '09:00', 'Euro Event'), Currency='EUR', Volatility=None),
+        usd_event('not a date', '08:30', 'Undated'),
+    ], TEST_DB)
+    assert rollup_counts(TEST_DB) == {
+        ('', 'USD', 'High'): 1,
+        ('2023-12-25', 'USD', 'High'): 2,
+        ('2023-12-26', 'EUR', None): 1,
+    }
+
+    store_events([dict(usd_event('12/25/23', '10:00', 'Second'), Volatility='Low')], TEST_DB)
+    assert rollup_counts(TEST_DB)[('2023-12-25', 'USD', 'High')] == 1
+    assert rollup_counts(TEST_DB)[('2023-12-25', 'USD', 'Low')] == 1
+
+    with get_connection(TEST_DB) as conn:
+        conn.execute("DELETE FROM events WHERE EventId IN (SELECT Id FROM event_types WHERE Name IN ('First', 'Undated'))")
+    assert rollup_counts(TEST_DB) == {
+        ('2023-12-25', 'USD', 'Low'): 1,
+        ('2023-12-26', 'EUR', None): 1,
+    }
+
+def test_rollup_queries_match_event_queries():
+    """
+    Test that count_events and query_rollups agree with filtering the events themselves.
+    """
+    store_events([
+        usd_event('12/30/23', '08:30', 'First'),
+        usd_event('01/02/24', '23:59', 'Second'),
+        dict(usd_event('01/02/24', '09:00', 'Euro Event'), Currency='EUR', Volatility='Low'),
+        dict(usd_event('01/03/24', 'All Day', 'Holiday'), Volatility=None),
+        usd_event('not a date', '08:30', 'Undated'),
+    ], TEST_DB)
+
+    for filters in [
+        {},
+        {'currencies': ['USD']},
+        {'volatilities': ['Low', None]},
+        {'volatilities': []},
+        {'start_date': date(2023, 12, 31)},
+        {'end_date': date(2024, 1, 2), 'currencies': ['USD', 'EUR']},
+    ]:
+        events = query_events(db_name=TEST_DB, **filters)
+        assert count_events(db_name=TEST_DB, **filters) == len(events), filters
+        counts = query_rollups(db_name=TEST_DB, **filters)
+        expected = events.groupby(['Currency', 'Volatility'], observed=True, dropna=False).size()
+        assert counts['Count'].sum() == expected.sum(), filters
+        assert counts.fillna('').set_index(['Currency', 'Volatility'])['Count'].to_dict() == \
+            expected.rename(index=lambda name: '' if pd.isna(name) else name).to_dict(), filters
+
+    by_currency = query_rollups(group_by=['Currency'], start_date=date(2024, 1, 1), db_name=TEST_DB)
+    assert by_currency.to_dict('records') == [{'Currency': 'EUR', 'Count': 1}, {'Currency': 'USD', 'Count': 2}]
+    with pytest.raises(ValueError, match="Unknown rollup columns"):
+        query_rollups(group_by=['Event'], db_name=TEST_DB)
+
+def test_migrate_rollups_fills_existing_events(tmp_path):
+    """
+    Test that create_table fills the rollup table from events stored before it existed.
+    """
+    db_name = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(db_name)
+    conn.execute('''CREATE TABLE events
+                    (Date TEXT, Time TEXT, Currency TEXT, Volatility TEXT, Event TEXT, Forecast TEXT, Previous TEXT)''')
+    conn.executemany("INSERT INTO events VALUES (?, ?, 'USD', 'High', ?, '1', '0')",
+                     [('12/25/23', '08:30', 'First'), ('12/25/23', '10:00', 'Second')])
+    conn.commit()
+    conn.close()
+
+    create_table(db_name)
+
+    assert rollup_counts(db_name) == {('2023-12-25', 'USD', 'High'): 2}
+    store_events([usd_event('12/25/23', '12:00', 'Third')], db_name)
+    assert rollup_counts(db_name) == {('2023-12-25', 'USD', 'High'): 3}
+
+def test_rollup_days_follow_the_timestamp(tmp_path):
+    """
+    Test that rollup days are the Timestamp's date in the events time zone, also before 2000 and near midnight.
+    """
+    db_name = str(tmp_path / 'days.db')
+    create_table(db_name)
+    # 23:30 EST is already the next day in UTC, and 00:00 EDT is still the previous one
+    store_events([usd_event('12/31/99', '23:30', 'Old'), usd_event('07/04/24', '00:00', 'Summer')], db_name)
+
+    assert rollup_counts(db_name) == {('1999-12-31', 'USD', 'High'): 1, ('2024-07-04', 'USD', 'High'): 1}
+    assert count_events(start_date=date(1999, 12, 31), end_date=date(1999, 12, 31), db_name=db_name) == 1
+
+def test_rollups_with_two_digit_year_days_are_recounted(tmp_path):
+    """
+    Test that create_table recounts rollups written before the days came from the Timestamp.
+    """
+    db_name = str(tmp_path / 'legacy_days.db')
+    create_table(db_name)
+    store_events([usd_event('12/31/99', '23:30', 'Old')], db_name)
+    conn = sqlite3.connect(db_name)
+    # Databases of that time have no offsets table and triggers that do not read it
+    for trigger in ('events_rollup_insert', 'events_rollup_delete', 'events_rollup_update'):
+        conn.execute(f'DROP TRIGGER {trigger}')
+    conn.execute('DROP TABLE time_zone_offsets')
+    conn.execute("UPDATE event_rollups SET Day = '2099-12-31'")
+    conn.commit()
+    conn.close()
+
+    create_table(db_name)
+
+    assert rollup_counts(db_name) == {('1999-12-31', 'USD', 'High'): 1}
+    store_events([usd_event('12/31/99', '23:45', 'Later')], db_name)
+    assert rollup_counts(db_name) == {('1999-12-31', 'USD', 'High'): 2}
+
+def test_names_are_interned_in_dimension_tables(tmp_path):
+    """
+    Test that Currency and Event names are stored once in their dimension tables and referenced by id.
+    """
+    db_name = str(tmp_path / 'dimensions.db')
+    create_table(db_name)
+    store_events([usd_event('12/25/23', '08:30', 'Payrolls'), usd_event('12/26/23', '08:30', 'Payrolls')], db_name)
+    store_events([dict(usd_event('12/26/23', '09:00', 'Payrolls'), Currency='EUR'),
+                  dict(usd_event('12/26/23', '10:00', None), Currency=None)], db_name)
+    conn = get_connection(db_name)
+
+    assert conn.execute('SELECT Name FROM currencies ORDER BY Id').fetchall() == [('USD',), ('EUR',)]
+    assert conn.execute('SELECT Name FROM event_types').fetchall() == [('Payrolls',)]
+    assert conn.execute('SELECT DISTINCT typeof(CurrencyId) FROM events WHERE CurrencyId IS NOT NULL').fetchall() == [('integer',)]
+    assert lookup_ids('Currency', ['EUR', 'CHF', 'USD'], db_name) == [2, 1]
+    assert conn.execute('SELECT Currency, Event FROM named_events ORDER BY Timestamp').fetchall() == [
+        ('USD', 'Payrolls'), ('USD', 'Payrolls'), ('EUR', 'Payrolls'), (None, None)]
+
+def test_query_events_reads_dimension_names(tmp_path):
+    """
+    Test that filters, ordering and categoricals on Currency and Event follow the names, not the ids.
+    """
+    db_name = str(tmp_path / 'dimensions.db')
+    create_table(db_name)
+    # USD gets the lower id, so ordering by id would put it first
+    store_events([usd_event('12/25/23', '08:30', 'Payrolls')], db_name)
+    store_events([dict(usd_event('12/26/23', '08:30', 'Payrolls'), Currency='EUR'),
+                  dict(usd_event('12/27/23', '08:30', 'Claims'), Currency=None)], db_name)
+
+    events = query_events(order_by='Currency', db_name=db_name)
+    assert events['Currency'].tolist()[1:] == ['EUR', 'USD']
+    assert events['Currency'].isna().tolist() == [True, False, False]
+    assert list(events['Currency'].cat.categories) == ['EUR', 'USD']
+    history = query_events(event_names=['Payrolls'], db_name=db_name)
+    assert history['Date'].tolist() == ['12/25/23', '12/26/23']
+    assert query_events(event_names=['Unknown'], currencies=['EUR'], db_name=db_name).empty
+    assert get_distinct_values('Event', db_name=db_name) == ['Claims', 'Payrolls']
+
+def test_migrate_dimensions_moves_names_to_ids(tmp_path):
+    """
+    Test that create_table moves the names of a table storing them as text into the dimension tables.
+    """
+    db_name = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(db_name)
+    conn.execute('''CREATE TABLE events
+                    (Date TEXT, Time TEXT, Currency TEXT, Volatility TEXT, Event TEXT, Forecast TEXT, Previous TEXT)''')
+    conn.executemany("INSERT INTO events VALUES (?, '08:30', ?, 'High', ?, '1', '0')",
+                     [('12/25/23', 'USD', 'First'), ('12/26/23', 'EUR', 'Second'), ('12/27/23', None, 'First')])
+    conn.commit()
+    conn.close()
+
+    create_table(db_name)
+
+    columns = [row[1] for row in get_connection(db_name).execute('PRAGMA table_info(events)')]
+    assert columns == ['Date', 'Time', 'CurrencyId', 'Volatility', 'EventId', 'Forecast', 'Previous', 'Timestamp',
+                       'Actual', 'RowHash']
+    events = get_events(db_name)
+    assert events['Currency'].tolist()[:2] == ['USD', 'EUR']
+    assert events['Event'].tolist() == ['First', 'Second', 'First']
+    assert rollup_counts(db_name)[('2023-12-26', 'EUR', 'High')] == 1
+    assert query_events(search='First', db_name=db_name)['Date'].tolist() == ['12/25/23', '12/27/23']
+    # Upserts hit the migrated rows
+    assert store_events([dict(usd_event('12/26/23', '08:30', 'Second'), Currency='EUR')], db_name) == {'inserted': 0, 'updated': 0}
+
+def test_revisions_log_inserts_and_changed_values(tmp_path):
+    """
+    Test that every insert and revision lands in the revisions log under the data version that wrote it.
+
+    This test checks the following:
+    1. New events are logged as inserts without old values.
+    2. Re-storing unchanged events writes nothing and logs nothing.
+    3. A published actual and a revised forecast are logged with the values they replaced.
+    4. Two versions of one event in the same call are logged in order, each against the one before.
+    """
+    db_name = str(tmp_path / 'revisions.db')
+    create_table(db_name)
+    events = [usd_event('12/25/23', '08:30', 'Payrolls'), usd_event('12/25/23', '10:00', 'Sentiment')]
+    store_events(events, db_name)
+    first_version = get_data_version(db_name)
+
+    assert store_events(events, db_name) == {'inserted': 0, 'updated': 0}
+    assert get_data_version(db_name) == first_version
+    released = dict(events[0], Actual='2', Forecast='1.5')
+    assert store_events([released, dict(released, Actual='2.1')], db_name) == {'inserted': 0, 'updated': 2}
+
+    log = get_revisions_since(db_name=db_name)
+    assert log['Change'].tolist() == ['insert', 'insert', 'update', 'update']
+    assert log['Version'].tolist() == [first_version] * 2 + [first_version + 1] * 2
+    assert log['OldForecast'].isna().tolist()[:2] == [True, True]
+    changes = get_revisions_since(first_version, db_name)
+    assert changes['Event'].tolist() == ['Payrolls', 'Payrolls']
+    assert changes[['Forecast', 'Actual', 'OldForecast', 'OldActual']].values.tolist() == [
+        ['1.5', '2', '1', None], ['1.5', '2.1', '1.5', '2']]
+    assert query_events(db_name=db_name)['Actual'].tolist() == ['2.1', None]
+    assert get_revisions_since(get_data_version(db_name), db_name).empty
+
+def test_row_hash_covers_the_revised_fields(tmp_path):
+    """
+    Test that the stored RowHash follows the revised fields and tells a missing value from an empty one.
+    """
+    db_name = str(tmp_path / 'hashes.db')
+    create_table(db_name)
+    event = usd_event('12/25/23', '08:30', 'Payrolls')
+    store_events([event], db_name)
+    conn = get_connection(db_name)
+
+    assert conn.execute('SELECT RowHash FROM events').fetchone()[0] == row_hash(('High', '1', '0', None))
+    assert row_hash(('High', '1', '0', None)) != row_hash(('High', '1', '0', ''))
+    assert store_events([dict(event, Actual='')], db_name) == {'inserted': 0, 'updated': 1}
+    assert conn.execute('SELECT RowHash FROM events').fetchone()[0] == row_hash(('High', '1', '0', ''))
+
+@pytest.fixture
+def search_db(tmp_path):
+    """
+    Create a database holding a few releases to search.
+    """
+    db_name = str(tmp_path / 'search.db')
+    create_table(db_name)
+    store_events([
+        usd_event('12/01/23', '08:30', 'Nonfarm Payrolls'),
+        usd_event('12/12/23', '08:30', 'CPI (MoM)'),
+        dict(usd_event('12/19/23', '05:00', 'CPI (MoM)'), Currency='EUR'),
+        usd_event('12/20/23', '10:00', 'Core CPI (YoY)'),
+        usd_event('12/21/23', '08:30', 'Payrolls Revision'),
+        usd_event('not a date', '08:30', 'Undated Payrolls'),
+    ], db_name)
+    return db_name
+
+@pytest.mark.parametrize('search, expected', [
+    ('CPI', ['CPI (MoM)', 'CPI (MoM)', 'Core CPI (YoY)']),
+    ('cpi Currency:EUR', ['CPI (MoM)']),
+    ('"Nonfarm Payrolls"', ['Nonfarm Payrolls']),
+    ('Payroll*', ['Undated Payrolls', 'Nonfarm Payrolls', 'Payrolls Revision']),
+    ('Payrolls NOT Nonfarm', ['Undated Payrolls', 'Payrolls Revision']),
+    ('GDP', []),
+])
+def test_query_events_full_text_search(search_db, search, expected):
+    """
+    Test that word, column, phrase, prefix and boolean searches return the matching events and their count.
+    """
+    events = query_events(search=search, db_name=search_db)
+
+    assert events['Event'].tolist() == expected
+    assert count_events(search=search, db_name=search_db) == len(expected)
+
+def test_search_combines_with_filters_and_follows_writes(search_db):
+    """
+    Test that a search is combined with the other filters and sees events stored afterwards.
+    """
+    assert query_events(search='CPI', currencies=['USD'], start_date=date(2023, 12, 15), db_name=search_db)['Event'].tolist() == ['Core CPI (YoY)']
+    assert count_events(search='CPI', volatilities=['Low'], db_name=search_db) == 0
+    assert query_events(search='  ', db_name=search_db).shape[0] == 6
+
+    store_events([dict(usd_event('01/10/24', '08:30', 'CPI (MoM)'), Currency='JPY')], search_db)
+    assert query_events(search='CPI Currency:JPY', db_name=search_db)['Date'].tolist() == ['01/10/24']
+
+def test_invalid_search_raises_value_error(search_db):
+    """
+    Test that a query FTS5 cannot parse is reported as a ValueError.
+    """
+    with pytest.raises(ValueError, match="Invalid search query"):
+        query_events(search='"unbalanced', db_name=search_db)
+
+def test_search_without_fts5_matches_words(monkeypatch, search_db):
+    """
+    Test that without FTS5 a search keeps the events whose names contain every word.
+    """
+    monkeypatch.setattr(data_storer, 'FTS5_AVAILABLE', False)
+
+    assert query_events(search='cpi eur', db_name=search_db)['Event'].tolist() == ['CPI (MoM)']
+    assert count_events(search='Payroll', db_name=search_db) == 3
+
 def test_store_events_database_error(mocker):
     """
     Test the store_events function to handle database errors gracefully.
@@ -79,6 +579,8 @@ def test_store_events_database_error(mocker):
     1. Mock the sqlite3.connect method to raise an Exception simulating a database error.
     2. Ensure the store_events function raises an Exception with the expected message.
     """
+    # Drop the reused connection so the next call has to connect again
+    close_connections(TEST_DB)
     # Mock the sqlite3.connect method to raise an Exception with the message "Database Error"
     mocker.patch('sqlite3.connect', side_effect=Exception("Database Error"))
 
@@ -107,9 +609,46 @@ def test_get_events_database_error(mocker):
     1. Mock the sqlite3.connect method to raise an Exception simulating a database error.
     2. Ensure the get_events function raises an Exception with the expected message.
     """
+    # Drop the reused connection so the next call has to connect again
+    close_connections(TEST_DB)
     # Mock the sqlite3.connect method to raise an Exception with the message "Database Error"
     mocker.patch('sqlite3.connect', side_effect=Exception("Database Error"))
 
     # Ensure the get_events function raises an Exception with the expected message
     with pytest.raises(Exception, match="Database Error"):
         get_events(TEST_DB)
+
+def test_connection_is_reused_and_tuned():
+    """
+    Test that the connection manager reuses one tuned connection per thread.
+
+    This test performs the following checks:
+    1. Repeated calls in the same thread return the same connection.
+    2. The connection runs in WAL mode with synchronous=NORMAL and a busy timeout.
+    """
+    conn = get_connection(TEST_DB)
+    assert get_connection(TEST_DB) is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] > 0
+
+def test_connections_are_per_thread():
+    """
+    Test that another thread gets its own connection and can read while this thread holds a write transaction.
+    """
+    conn = get_connection(TEST_DB)
+    results = {}
+
+    def reader():
+        other = get_connection(TEST_DB)
+        results['same'] = other is conn
+        results['count'] = other.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute("INSERT INTO events (Date, Time, Volatility, Forecast, Previous) VALUES ('12/25/23', '09:00', 'Low', '', '')")
+    thread = threading.Thread(target=reader)
+    thread.start()
+    thread.join(timeout=5)
+    conn.rollback()
+
+    assert results == {'same': False, 'count': 0}
@@ -0,0 +1,90 @@
+import os
+import pytest
+from event_parser import parse_html, parse_html_bs4, iter_events, PARSER_BACKENDS, LXML_AVAILABLE
+
+# Sample calendar HTML with two day headers, a holiday row and HTML entities
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'calendar.html')
+with open(FIXTURE_PATH, encoding='utf-8') as fixture:
+    CALENDAR_HTML = fixture.read()
+
+def test_parse_html_reference_backend():
+    """
+    Test the BeautifulSoup reference backend against the sample calendar page.
+
+    This test checks the following:
+    1. Every event row is parsed.
+    2. Fields, volatility and dates are extracted as expected.
+    3. Rows without a time or volatility cell get None for those fields.
+    """
+    events = parse_html_bs4(CALENDAR_HTML)
+
+    assert len(events) == 6
+    assert events[0] == {
+        'Date': '07/01/24',
+        'Time': '02:30',
+        'Currency': 'CHF',
+        'Volatility': 'Low',
+        'Event': 'Retail Sales (YoY)  (May)',
+        'Forecast': '0.7%',
+        'Previous': '0.0%',
+        'Actual': '-0.1%'
+    }
+    assert [event['Volatility'] for event in events] == ['Low', 'Moderate', 'High', None, 'High', 'Moderate']
+    assert events[3]['Date'] == '07/02/24'
+    assert events[3]['Time'] is None
+
+@pytest.mark.parametrize('backend', sorted(PARSER_BACKENDS))
+def test_parser_backends_parity(backend):
+    """
+    Test that every registered backend produces exactly the events of the reference backend.
+    """
+    assert parse_html(CALENDAR_HTML, backend=backend) == parse_html_bs4(CALENDAR_HTML)
+
+@pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml is not installed.")
+def test_lxml_backend_parity_on_large_page():
+    """
+    Test backend parity on a page with many repeated days and rows.
+    """
+    html = CALENDAR_HTML * 50
+    assert parse_html(html, backend='lxml') == parse_html_bs4(html)
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 17, 256])
+def test_stream_parser_matches_reference_in_chunks(chunk_size):
+    """
+    Test that the stream parser produces the reference events however the page is cut into chunks.
+    """
+    html = CALENDAR_HTML * 3
+    chunks = [html[start:start + chunk_size] for start in range(0, len(html), chunk_size)]
+
+    assert list(iter_events(chunks)) == parse_html_bs4(html)
+
+def test_stream_parser_yields_rows_before_the_page_ends():
+    """
+    Test that the first event is yielded once its row closes, before the rest of the page is fed.
+    """
+    fed = []
+
+    def chunks():
+        for start in range(0, len(CALENDAR_HTML), 500):
+            fed.append(start)
+            yield CALENDAR_HTML[start:start + 500]
+
+    events = iter_events(chunks())
+    first = next(events)
+
+    assert first == parse_html_bs4(CALENDAR_HTML)[0]
+    assert len(fed) < len(CALENDAR_HTML) // 500
+
+def test_parse_html_empty_content():
+    """
+    Test that every backend returns an empty list for empty content.
+    """
+    for backend in PARSER_BACKENDS:
+        assert parse_html('', backend=backend) == []
+
+def test_parse_html_unknown_backend():
+    """
+    Test that selecting an unknown backend raises a ValueError.
+    """
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        parse_html(CALENDAR_HTML, backend='missing')
@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import pytest
+import pandas as pd
+import data_storer
+import event_snapshots
+from helpers import make_event, EVENTS
+from event_snapshots import PYARROW_AVAILABLE, list_partitions, read_manifest, write_manifest
+from data_storer import (store_events, query_events, get_data_version, load_snapshot_events, export_events,
+                         snapshot_dir)
+
+pytestmark = pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow is not installed.")
+
+def test_store_events_writes_month_partitions(db_name):
+    """
+    Test that a commit leaves a snapshot per month matching the table and the data version.
+    """
+    store_events(EVENTS, db_name)
+
+    directory = snapshot_dir(db_name)
+    assert list_partitions(directory) == ['undated', '2023-12', '2024-01']
+    assert read_manifest(directory) == get_data_version(db_name)
+    pd.testing.assert_frame_equal(load_snapshot_events(db_name), query_events(db_name=db_name))
+
+def test_partitions_follow_the_timestamp_month(db_name):
+    """
+    Test that events land in the month of their Timestamp in the events time zone, also before 2000.
+    """
+    # 23:30 EST on New Year's Eve is already January in UTC
+    store_events([make_event('12/31/99', '23:30', 'USD', 'High', 'Old'), make_event('02/01/24', '00:00', 'USD', 'High', 'New')],
+                 db_name)
+
+    assert list_partitions(snapshot_dir(db_name)) == ['1999-12', '2024-02']
+    pd.testing.assert_frame_equal(load_snapshot_events(db_name), query_events(db_name=db_name))
+
+def test_store_events_rewrites_only_touched_months(mocker, db_name):
+    """
+    Test that a commit rewrites the partitions of its events and leaves the other months alone.
+    """
+    store_events(EVENTS, db_name)
+    spy = mocker.spy(data_storer, 'write_partition')
+
+    store_events([make_event('01/02/24', '10:00', 'EUR', 'High', 'Rate Decision', forecast='2')], db_name)
+    assert [call.args[1] for call in spy.call_args_list] == ['2024-01']
+    # Nothing changed, so nothing is rewritten
+    store_events([EVENTS[0]], db_name)
+    assert spy.call_count == 1
+
+    loaded = load_snapshot_events(db_name)
+    assert loaded.loc[loaded['Event'] == 'Rate Decision', 'Forecast'].tolist() == ['2']
+    pd.testing.assert_frame_equal(loaded, query_events(db_name=db_name))
+
+def test_stale_snapshot_is_rebuilt(db_name):
+    """
+    Test that a snapshot behind the data version is rebuilt instead of being read.
+    """
+    store_events(EVENTS, db_name)
+    directory = snapshot_dir(db_name)
+    # Simulate a writer whose refresh never ran: the rows changed but the snapshot did not
+    with data_storer.transaction(db_name) as conn:
+        conn.execute("DELETE FROM events WHERE Date = '12/29/23'")
+        conn.execute("UPDATE metadata SET Value = Value + 1 WHERE Key = 'data_version'")
+    write_manifest(directory, get_data_version(db_name) - 1)
+
+    loaded = load_snapshot_events(db_name)
+
+    assert 'Payrolls' not in loaded['Event'].tolist()
+    assert read_manifest(directory) == get_data_version(db_name)
+    pd.testing.assert_frame_equal(loaded, query_events(db_name=db_name))
+
+def test_snapshot_of_an_older_layout_is_rebuilt(db_name):
+    """
+    Test that a manifest written without the current column list is not trusted.
+    """
+    store_events(EVENTS, db_name)
+    directory = snapshot_dir(db_name)
+    with open(os.path.join(directory, event_snapshots.MANIFEST_FILE), 'w') as f:
+        json.dump({'data_version': get_data_version(db_name)}, f)
+
+    assert read_manifest(directory) is None
+    loaded = load_snapshot_events(db_name)
+
+    assert list(loaded.columns) == data_storer.EVENT_COLUMNS
+    assert read_manifest(directory) == get_data_version(db_name)
+
+def test_incremental_refresh_after_missed_commit_rebuilds(db_name):
+    """
+    Test that a commit following a missed refresh rebuilds every partition rather than only its own.
+    """
+    store_events(EVENTS[:1], db_name)
+    write_manifest(snapshot_dir(db_name), None)
+    store_events(EVENTS[1:], db_name)
+
+    pd.testing.assert_frame_equal(load_snapshot_events(db_name), query_events(db_name=db_name))
+
+@pytest.mark.parametrize('fmt', ['csv', 'arrow'])
+def test_export_events(db_name, fmt):
+    """
+    Test that the export holds every stored event.
+    """
+    store_events(EVENTS, db_name)
+    buffer = io.BytesIO()
+
+    export_events(buffer, fmt, db_name)
+
+    buffer.seek(0)
+    if fmt == 'csv':
+        exported = pd.read_csv(buffer, keep_default_na=False)
+    else:
+        exported = event_snapshots.ipc.open_stream(buffer).read_all().to_pandas()
+    assert list(exported.columns) == data_storer.EVENT_COLUMNS
+    assert sorted(exported['Event']) == sorted(event['Event'] for event in EVENTS)
+
+def test_export_events_rejects_unknown_format(db_name):
+    """
+    Test that an unsupported export format raises a ValueError.
+    """
+    with pytest.raises(ValueError):
+        export_events(io.BytesIO(), 'xlsx', db_name)
+
+def test_load_without_pyarrow_falls_back(monkeypatch, db_name):
+    """
+    Test that events are read from the table when pyarrow is missing.
+    """
+    monkeypatch.setattr(data_storer, 'PYARROW_AVAILABLE', False)
+    store_events(EVENTS, db_name)
+
+    assert not os.path.exists(snapshot_dir(db_name))
+    pd.testing.assert_frame_equal(load_snapshot_events(db_name), query_events(db_name=db_name))
@@ -0,0 +1,63 @@
+import itertools
+from datetime import date
+import pytest
+from helpers import make_event, EVENTS
+from data_storer import store_events, query_events, get_distinct_values
+from filter_index import FilterIndex
+from query_cache import cached_filter_index
+
+@pytest.fixture
+def db_name(db_name):
+    """
+    Store the test events in the temporary database.
+    """
+    store_events(EVENTS, db_name)
+    return db_name
+
+def test_filter_index_matches_sql_filters(db_name):
+    """
+    Test that every combination of filters selects the same events as query_events.
+
+    The combinations cover None (keep all), empty lists, None inside the
+    volatility list, events without a Timestamp and a range across a year boundary.
+    """
+    index = FilterIndex(query_events(db_name=db_name))
+    currency_choices = [None, [], ['USD'], ['EUR', 'GBP'], ['CHF']]
+    volatility_choices = [None, [], ['High'], ['Low', None], [None]]
+    date_choices = [(None, None), (date(2023, 12, 30), date(2024, 1, 2)), (date(2024, 1, 2), None), (None, date(2023, 12, 29))]
+
+    for currencies, volatilities, (start_date, end_date) in itertools.product(currency_choices, volatility_choices, date_choices):
+        filters = dict(currencies=currencies, volatilities=volatilities, start_date=start_date, end_date=end_date)
+        expected = sorted(query_events(db_name=db_name, **filters)['Event'])
+        assert sorted(index.select(**filters)['Event']) == expected, filters
+        assert index.count(**filters) == len(expected), filters
+
+def test_filter_index_options_match_distinct_values(db_name):
+    """
+    Test that the option lists match get_distinct_values for every date range.
+    """
+    index = FilterIndex(query_events(db_name=db_name))
+    for start_date, end_date in [(None, None), (date(2023, 12, 30), date(2024, 1, 2)), (date(2024, 1, 3), date(2024, 1, 3)), (date(2025, 1, 1), None)]:
+        for column in ('Currency', 'Volatility'):
+            assert index.options(column, start_date, end_date) == get_distinct_values(column, start_date, end_date, db_name)
+
+def test_filter_index_selects_in_chronological_order(db_name):
+    """
+    Test that selected events are returned in Timestamp order.
+    """
+    index = FilterIndex(query_events(db_name=db_name))
+    selected = index.select(start_date=date(2024, 1, 2), end_date=date(2024, 1, 3))
+    assert list(selected['Event']) == ['Rate Decision', 'Late Release', 'Housing']
+
+def test_cached_filter_index_is_rebuilt_per_data_version(db_name):
+    """
+    Test that the index is built once per data version and rebuilt after a write.
+    """
+    first = cached_filter_index(db_name)
+    assert cached_filter_index(db_name) is first
+
+    store_events([make_event('01/04/24', '08:30', 'CHF', 'High', 'New Event')], db_name)
+    second = cached_filter_index(db_name)
+
+    assert second is not first
+    assert 'CHF' in second.options('Currency')
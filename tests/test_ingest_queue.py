@@ -0,0 +1,139 @@
+import queue
+import threading
+import pytest
+from helpers import make_event
+from ingest_queue import IngestQueue
+from data_storer import store_event_batches, query_events
+
+def numbered_event(index, forecast='1'):
+    """
+    Build a distinct test event for the given index.
+    """
+    return make_event(f"01/{index % 28 + 1:02d}/24", f"{index % 24:02d}:{index // 24 % 60:02d}", 'USD', 'High',
+                      f"Event {index}", forecast=forecast)
+
+@pytest.fixture
+def ingest_queue(db_name):
+    """
+    Start an ingest queue on the test database and stop it afterwards.
+    """
+    ingest_queue = IngestQueue(db_name, max_delay=0.05).start()
+    yield ingest_queue
+    ingest_queue.stop()
+
+def test_concurrent_producers_share_transactions(ingest_queue, db_name):
+    """
+    Test that submissions from many threads are all stored in fewer transactions than submissions.
+    """
+    results = []
+
+    def produce(worker):
+        for i in range(10):
+            start = (worker * 10 + i) * 5
+            results.append(ingest_queue.store([numbered_event(index) for index in range(start, start + 5)]))
+
+    threads = [threading.Thread(target=produce, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{'inserted': 5, 'updated': 0}] * 80
+    assert len(query_events(db_name=db_name)) == 400
+    stats = ingest_queue.stats()
+    assert stats['submitted'] == 80
+    assert stats['events'] == 400
+    assert stats['transactions'] < 80
+
+def test_duplicates_across_submissions_count_as_updates(db_name):
+    """
+    Test that a later submission in the same batch updates the row an earlier one inserted.
+    """
+    ingest_queue = IngestQueue(db_name)
+    first = ingest_queue.submit([numbered_event(1)])
+    second = ingest_queue.submit([numbered_event(1, forecast='2'), numbered_event(2)])
+    ingest_queue.start().stop()
+
+    assert first.result == {'inserted': 1, 'updated': 0}
+    assert second.result == {'inserted': 1, 'updated': 1}
+    assert ingest_queue.stats()['transactions'] == 1
+    assert query_events(db_name=db_name)['Forecast'].tolist() == ['2', '1']
+
+def test_full_queue_pushes_back(db_name):
+    """
+    Test that a non-blocking submit raises queue.Full once max_pending submissions are waiting.
+    """
+    ingest_queue = IngestQueue(db_name, max_pending=2)
+    ingest_queue.submit([numbered_event(1)])
+    ingest_queue.submit([numbered_event(2)])
+
+    with pytest.raises(queue.Full):
+        ingest_queue.submit([numbered_event(3)], block=False)
+    assert ingest_queue.pending() == 2
+
+    ingest_queue.start()
+    assert ingest_queue.flush(timeout=5)
+    assert ingest_queue.pending() == 0
+    assert len(query_events(db_name=db_name)) == 2
+    ingest_queue.stop()
+
+def test_flush_waits_for_earlier_submissions(ingest_queue, db_name):
+    """
+    Test that flush returns only after every earlier submission is committed.
+    """
+    tickets = [ingest_queue.submit([numbered_event(index)]) for index in range(20)]
+
+    assert ingest_queue.flush(timeout=5)
+
+    assert all(ticket.done.is_set() for ticket in tickets)
+    assert len(query_events(db_name=db_name)) == 20
+
+def test_failed_submission_does_not_fail_its_batch(db_name):
+    """
+    Test that a submission whose store raises fails alone while the rest of its batch is written.
+    """
+    def store(batches, db_name):
+        if any(event['Event'] == 'Broken' for events in batches for event in events):
+            raise ValueError("broken event")
+        return store_event_batches(batches, db_name)
+
+    ingest_queue = IngestQueue(db_name, store=store)
+    good = ingest_queue.submit([numbered_event(1)])
+    bad = ingest_queue.submit([dict(numbered_event(2), Event='Broken')])
+    ingest_queue.start()
+
+    with pytest.raises(ValueError):
+        ingest_queue.store([dict(numbered_event(3), Event='Broken')])
+    ingest_queue.stop()
+
+    assert good.result == {'inserted': 1, 'updated': 0}
+    assert isinstance(bad.error, ValueError)
+    assert ingest_queue.stats()['errors'] == 2
+    assert query_events(db_name=db_name)['Event'].tolist() == ['Event 1']
+
+def test_empty_store_skips_the_queue(db_name):
+    """
+    Test that storing no events returns zero counts without waiting for the writer.
+    """
+    ingest_queue = IngestQueue(db_name)
+
+    assert ingest_queue.store([]) == {'inserted': 0, 'updated': 0}
+    assert ingest_queue.stats()['submitted'] == 0
+
+def test_run_calls_the_task_on_the_writer_after_earlier_submissions(ingest_queue, db_name):
+    """
+    Test that run calls its task on the writer thread once earlier submissions are committed, and raises its error.
+    """
+    ingest_queue.submit([numbered_event(index) for index in range(5)])
+
+    def count_on_writer():
+        return threading.current_thread().name, len(query_events(db_name=db_name))
+
+    assert ingest_queue.run(count_on_writer, timeout=5) == ('ingest-writer', 5)
+
+    def fail():
+        raise ValueError("task failed")
+
+    with pytest.raises(ValueError):
+        ingest_queue.run(fail, timeout=5)
+    assert ingest_queue.store([numbered_event(5)]) == {'inserted': 1, 'updated': 0}
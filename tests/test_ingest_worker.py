@@ -0,0 +1,173 @@
+import os
+import subprocess
+import sys
+import time
+import sqlite3
+import threading
+import pytest
+import refresh_scheduler
+from helpers import make_event
+from data_storer import create_table, count_events
+from ingest_worker import create_lease_table, acquire_lease, release_lease, get_lease, run_worker, INGEST_LEASE
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker process that records every refresh it runs instead of fetching upstream
+WORKER_SCRIPT = '''
+import sqlite3, sys, threading, time
+from ingest_worker import run_worker
+
+db_name, holder, deadline = sys.argv[1], sys.argv[2], float(sys.argv[3])
+
+def record(name, max_age=None, cancel=None):
+    conn = sqlite3.connect(name, timeout=5)
+    with conn:
+        conn.execute('INSERT INTO runs (Holder, RanAt) VALUES (?, ?)', (holder, time.time()))
+    conn.close()
+    return {'inserted': 0, 'updated': 0}
+
+stop_event = threading.Event()
+threading.Timer(max(deadline - time.time(), 0), stop_event.set).start()
+run_worker(holder=holder, lease_ttl=1.5, interval=0.1, fast_interval=0.1, db_name=db_name, refresh=record, stop_event=stop_event,
+           lease_db=db_name)
+'''
+
+@pytest.fixture
+def db_name(db_name):
+    """
+    Add an empty leases table to the temporary database.
+    """
+    create_lease_table(db_name)
+    return db_name
+
+def test_lease_is_exclusive_until_it_expires(db_name):
+    """
+    Test that only one holder owns the lease until it expires or is released.
+
+    This test performs the following checks:
+    1. The first caller takes the lease and can renew it.
+    2. Another caller is refused while the lease is valid.
+    3. Another caller takes over once the lease has expired.
+    4. Releasing the lease lets the next caller take it at once.
+    """
+    now = 1000.0
+    assert acquire_lease(INGEST_LEASE, 'a', ttl=10, db_name=db_name, now=now)
+    assert acquire_lease(INGEST_LEASE, 'a', ttl=10, db_name=db_name, now=now + 5)
+    assert not acquire_lease(INGEST_LEASE, 'b', ttl=10, db_name=db_name, now=now + 10)
+    assert get_lease(db_name=db_name, now=now + 10)['holder'] == 'a'
+
+    # The renewal at now + 5 expires at now + 15
+    assert acquire_lease(INGEST_LEASE, 'b', ttl=10, db_name=db_name, now=now + 16)
+    assert not acquire_lease(INGEST_LEASE, 'a', ttl=10, db_name=db_name, now=now + 17)
+
+    # Only the holder can release the lease
+    release_lease(INGEST_LEASE, 'a', db_name)
+    assert get_lease(db_name=db_name, now=now + 17)['holder'] == 'b'
+    release_lease(INGEST_LEASE, 'b', db_name)
+    assert get_lease(db_name=db_name, now=now + 17) is None
+    assert acquire_lease(INGEST_LEASE, 'a', ttl=10, db_name=db_name, now=now + 17)
+
+def test_only_one_worker_process_refreshes(db_name, tmp_path):
+    """
+    Test that several worker processes sharing a database elect a single leader.
+
+    Three workers run at the same time until a shared deadline. Every refresh
+    they run is recorded, and all of them must come from one worker.
+    """
+    conn = sqlite3.connect(db_name)
+    with conn:
+        conn.execute('CREATE TABLE runs (Holder TEXT, RanAt REAL)')
+    conn.close()
+
+    # Each worker imports data_storer, which sets up the default database in its working directory;
+    # set it up once here so the workers do not race to create it
+    create_table(str(tmp_path / 'economic_events.db'))
+    deadline = time.time() + 8
+    workers = [
+        subprocess.Popen([sys.executable, '-c', WORKER_SCRIPT, db_name, f'worker-{i}', str(deadline)],
+                         cwd=tmp_path, env=dict(os.environ, PYTHONPATH=REPO_ROOT))
+        for i in range(3)
+    ]
+    for worker in workers:
+        assert worker.wait(timeout=60) == 0
+
+    conn = sqlite3.connect(db_name)
+    # Leave out the last moments, when the leader may stop and hand over just before the others stop
+    holders = {row[0] for row in conn.execute('SELECT Holder FROM runs WHERE RanAt < ?', (deadline - 0.5,))}
+    runs = conn.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+    conn.close()
+
+    assert len(holders) == 1
+    assert runs > 1
+
+def test_lease_is_kept_during_a_refresh_longer_than_its_ttl(db_name):
+    """
+    Test that the leader renews its lease while a refresh outlasts the lease TTL.
+
+    A second worker keeps trying to take the lease during the refresh and
+    must be refused every time.
+    """
+    started = threading.Event()
+    finished = threading.Event()
+    stop_event = threading.Event()
+
+    def slow_refresh(name, max_age=None, cancel=None):
+        started.set()
+        time.sleep(2)
+        finished.set()
+        return {'inserted': 0, 'updated': 0}
+
+    worker = threading.Thread(target=run_worker, kwargs={
+        'holder': 'leader', 'lease_ttl': 0.6, 'interval': 3600, 'db_name': db_name, 'refresh': slow_refresh,
+        'stop_event': stop_event, 'lease_db': db_name})
+    worker.start()
+    try:
+        assert started.wait(5)
+        takeovers = []
+        while not finished.is_set():
+            takeovers.append(acquire_lease(INGEST_LEASE, 'other', ttl=0.6, db_name=db_name))
+            time.sleep(0.1)
+        assert len(takeovers) > 10
+        assert not any(takeovers)
+    finally:
+        stop_event.set()
+        worker.join(timeout=5)
+    assert get_lease(db_name=db_name) is None
+
+def test_refresh_stops_before_storing_once_the_lease_is_lost(monkeypatch, db_name):
+    """
+    Test that a leader whose lease is taken during a refresh stores nothing and goes back to polling.
+
+    The fetch hands the lease to another holder, as if this worker had
+    stalled past its TTL, and returns only once the heartbeat noticed.
+    """
+    fetches = []
+    stop_event = threading.Event()
+
+    def fetch_after_losing_the_lease(**kwargs):
+        fetches.append(time.time())
+        conn = sqlite3.connect(db_name)
+        with conn:
+            conn.execute('UPDATE leases SET Holder = ?, ExpiresAt = ? WHERE Name = ?', ('other', time.time() + 60, INGEST_LEASE))
+        conn.close()
+        time.sleep(1)
+        return [make_event('01/02/24', '10:00', 'EUR', 'High', 'Rate Decision')]
+
+    monkeypatch.setattr(refresh_scheduler, 'fetch_economic_events', fetch_after_losing_the_lease)
+    worker = threading.Thread(target=run_worker, kwargs={
+        'holder': 'leader', 'lease_ttl': 0.6, 'interval': 0.1, 'fast_interval': 0.1, 'db_name': db_name,
+        'stop_event': stop_event, 'lease_db': db_name})
+    worker.start()
+    try:
+        deadline = time.time() + 5
+        while not fetches and time.time() < deadline:
+            time.sleep(0.05)
+        # Leave time for the cancelled refresh to finish and for further refreshes, which must not happen
+        time.sleep(2)
+    finally:
+        stop_event.set()
+        worker.join(timeout=5)
+
+    assert len(fetches) == 1
+    assert count_events(db_name=db_name) == 0
+    assert get_lease(db_name=db_name)['holder'] == 'other'
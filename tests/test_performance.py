@@ -1,7 +1,24 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
 import time
+import tracemalloc
 import pytest
-from data_fetcher import fetch_economic_events
-from data_storer import store_events, get_events
+import pandas as pd
+from datetime import date, datetime, timedelta
+from data_fetcher import fetch_economic_events, PayloadStream
+from data_storer import (EVENTS_TIME_ZONE, create_table, store_events, get_events, query_events, query_rollups,
+                         load_snapshot_events, to_compact_frame, get_data_version, get_revisions_since)
+from compaction import compact_events
+from ingest_queue import IngestQueue
+from db_connection import get_connection
+from filter_index import FilterIndex
+from storage_backends import get_backend, DUCKDB_AVAILABLE
+from event_snapshots import PYARROW_AVAILABLE
+from event_parser import EventStreamParser, parse_html, parse_html_bs4
 import platform
 
 if platform.system() == "Windows":
@@ -13,6 +30,69 @@ STORE_EVENTS_TIME_LIMIT = 2   # Maximum acceptable time for storing events
 GET_EVENTS_TIME_LIMIT = 2     # Maximum acceptable time for retrieving events
 SEND_EMAIL_TIME_LIMIT = 2     # Maximum acceptable time for sending an email
 
+# Size of the synthetic events table used by the memory reports
+SYNTHETIC_ROWS = 200_000
+SYNTHETIC_CURRENCIES = ['USD', 'EUR', 'JPY', 'GBP', 'CHF', 'CAD', 'AUD', 'NZD', 'CNY', 'BRL',
+                        'MXN', 'INR', 'KRW', 'ZAR', 'SEK', 'NOK', 'DKK', 'PLN', 'HKD', 'SGD']
+SYNTHETIC_VOLATILITIES = ['Low', 'Moderate', 'High']
+# Size of the backend comparison; set BACKEND_BENCHMARK_ROWS=5000000 for a multi-year, multi-million-row run
+BACKEND_BENCHMARK_ROWS = int(os.environ.get('BACKEND_BENCHMARK_ROWS', SYNTHETIC_ROWS))
+
+# Loads the events table one way in a fresh interpreter and reports its time and peak memory
+LOAD_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, sys.argv[3])
+import pandas as pd
+import pyarrow
+from data_storer import query_events, load_snapshot_events
+from db_connection import get_connection
+loaders = {
+    'read_sql_query': lambda db_name: pd.read_sql_query('SELECT * FROM named_events', get_connection(db_name)),
+    'query_events': lambda db_name: query_events(db_name=db_name),
+    'snapshot': load_snapshot_events,
+}
+def memory_kb(field):
+    # Unlike ru_maxrss, /proc/self/status is not carried over from the parent process
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field + ':'))
+baseline = memory_kb('VmRSS')
+start = time.time()
+frame = loaders[sys.argv[1]](sys.argv[2])
+seconds = time.time() - start
+print(json.dumps({'rows': len(frame), 'seconds': seconds,
+                  'peak_kb': memory_kb('VmHWM') - baseline, 'resident_kb': memory_kb('VmRSS') - baseline}))
+'''
+
+def synthetic_events(count, events_per_day=200):
+    """
+    Generate unique synthetic events spread over consecutive days.
+    """
+    first_day = date(2020, 1, 1)
+    events = []
+    for index in range(count):
+        day, slot = divmod(index, events_per_day)
+        events.append({
+            'Date': (first_day + timedelta(days=day)).strftime('%m/%d/%y'),
+            'Time': f"{(slot % 96) // 4:02d}:{(slot % 4) * 15:02d}",
+            'Currency': SYNTHETIC_CURRENCIES[slot % len(SYNTHETIC_CURRENCIES)],
+            'Volatility': SYNTHETIC_VOLATILITIES[index % 3],
+            'Event': f"Indicator {(day * 7 + slot) % 300}",
+            'Forecast': f"{index % 50 / 10:.1f}%",
+            'Previous': f"{index % 40 / 10:.1f}%",
+        })
+    return events
+
+def median_time(read, runs=5):
+    """
+    Call read several times and return the median duration in seconds with the result of the last call.
+    """
+    durations = []
+    for _ in range(runs):
+        start_time = time.time()
+        result = read()
+        durations.append(time.time() - start_time)
+    return sorted(durations)[len(durations) // 2], result
+
 # Test function for performance of fetching economic events
 def test_fetch_economic_events_performance():
     """
@@ -63,6 +143,476 @@ def test_get_events_performance():
     assert elapsed_time < GET_EVENTS_TIME_LIMIT, f"get_events took {elapsed_time} seconds, exceeding the limit of {GET_EVENTS_TIME_LIMIT} seconds"
     assert not events.empty  # Ensure the retrieved DataFrame is not empty
 
+# Memory and time report for the compact, typed events frame
+@pytest.mark.report
+def test_compact_frame_memory_report(tmp_path):
+    """
+    Compare the plain object-string frame with the compact typed frame returned by get_events.
+
+    The report covers load time, memory footprint and the time of a typical
+    currency/volatility filter. The compact frame must use less than half the memory.
+    """
+    db_name = str(tmp_path / 'synthetic.db')
+    create_table(db_name)
+    store_events(synthetic_events(SYNTHETIC_ROWS), db_name)
+
+    start_time = time.time()
+    plain = pd.read_sql_query('SELECT * FROM named_events', get_connection(db_name))
+    plain_load = time.time() - start_time
+    start_time = time.time()
+    compact = get_events(db_name)
+    compact_load = time.time() - start_time
+
+    plain_memory = plain.memory_usage(deep=True).sum()
+    compact_memory = compact.memory_usage(deep=True).sum()
+
+    start_time = time.time()
+    plain_filtered = plain[plain['Currency'].isin(['USD', 'EUR']) & plain['Volatility'].isin(['Moderate', 'High'])]
+    plain_filter = time.time() - start_time
+    start_time = time.time()
+    compact_filtered = compact[compact['Currency'].isin(['USD', 'EUR']) & (compact['Volatility'] >= 'Moderate')]
+    compact_filter = time.time() - start_time
+
+    print(f"\nCompact frame report ({SYNTHETIC_ROWS} rows)")
+    print(f"  memory: {plain_memory / 1e6:.1f} MB -> {compact_memory / 1e6:.1f} MB ({compact_memory / plain_memory:.0%})")
+    print(f"  load:   {plain_load:.3f} s -> {compact_load:.3f} s")
+    print(f"  filter: {plain_filter * 1000:.1f} ms -> {compact_filter * 1000:.1f} ms")
+
+    assert len(compact_filtered) == len(plain_filtered)
+    assert compact_memory < plain_memory / 2
+
+# Time report for the bitmap filter index
+@pytest.mark.report
+def test_filter_index_report(tmp_path):
+    """
+    Compare pandas masks over the full frame with the bitmap filter index.
+
+    The report covers the one-off index build, a currency/volatility/date
+    selection and the option lists for a date range. Both must agree.
+    """
+    db_name = str(tmp_path / 'synthetic.db')
+    create_table(db_name)
+    store_events(synthetic_events(SYNTHETIC_ROWS), db_name)
+    frame = get_events(db_name)
+    currencies = ['USD', 'EUR', 'JPY']
+    volatilities = ['Moderate', 'High']
+    start_date, end_date = date(2020, 3, 1), date(2020, 6, 30)
+
+    start_time = time.time()
+    index = FilterIndex(frame)
+    build = time.time() - start_time
+
+    start_time = time.time()
+    start = pd.Timestamp(start_date, tz='America/New_York')
+    end = pd.Timestamp(end_date + timedelta(days=1), tz='America/New_York')
+    in_range = (frame['Timestamp'] >= start) & (frame['Timestamp'] < end)
+    masked = frame[frame['Currency'].isin(currencies) & frame['Volatility'].isin(volatilities) & in_range]
+    masked_options = sorted(frame.loc[in_range, 'Currency'].unique())
+    mask_time = time.time() - start_time
+
+    start_time = time.time()
+    selected = index.select(currencies=currencies, volatilities=volatilities, start_date=start_date, end_date=end_date)
+    index_options = index.options('Currency', start_date, end_date)
+    index_time = time.time() - start_time
+
+    print(f"\nFilter index report ({SYNTHETIC_ROWS} rows)")
+    print(f"  build:  {build * 1000:.1f} ms (once per data version)")
+    print(f"  filter: {mask_time * 1000:.1f} ms -> {index_time * 1000:.1f} ms")
+
+    assert len(selected) == len(masked)
+    assert index_options == masked_options
+
+# Time report for the rollup table
+@pytest.mark.report
+def test_rollup_report(tmp_path):
+    """
+    Compare counting events per currency and volatility from the loaded events with reading the rollup table.
+
+    Both must agree.
+    """
+    db_name = str(tmp_path / 'synthetic.db')
+    create_table(db_name)
+    start_time = time.time()
+    store_events(synthetic_events(SYNTHETIC_ROWS), db_name)
+    store = time.time() - start_time
+
+    start_time = time.time()
+    grouped = get_events(db_name).groupby(['Currency', 'Volatility'], observed=True).size()
+    group_time = time.time() - start_time
+
+    start_time = time.time()
+    counts = query_rollups(db_name=db_name)
+    rollup_time = time.time() - start_time
+
+    print(f"\nRollup report ({SYNTHETIC_ROWS} rows, stored in {store:.2f} s with the rollup triggers)")
+    print(f"  counts: {group_time * 1000:.1f} ms -> {rollup_time * 1000:.1f} ms")
+
+    assert counts.set_index(['Currency', 'Volatility'])['Count'].to_dict() == grouped.to_dict()
+
+# Time report for hot/cold partitioning
+@pytest.mark.report
+def test_compaction_report(tmp_path):
+    """
+    Compare writes and recent reads on a table holding all history with the same table after compaction.
+
+    The report covers storing a batch of new events, reading the last week,
+    reading the first page of the full history and the compaction itself.
+    Results must not change.
+    """
+    db_name = str(tmp_path / 'synthetic.db')
+    create_table(db_name)
+    events = synthetic_events(SYNTHETIC_ROWS)
+    store_events(events, db_name)
+    last_day = datetime.strptime(events[-1]['Date'], '%m/%d/%y').date()
+    now = datetime.combine(last_day, datetime.min.time(), EVENTS_TIME_ZONE)
+    revisions = iter(range(100))
+
+    def measure():
+        # Median of a few runs, each storing a refresh-sized batch of new events for the last day
+        runs = []
+        for _ in range(5):
+            revision = next(revisions)
+            batch = [dict(event, Event=f"{event['Event']} revision {revision}") for event in events[-200:]]
+            timings = {}
+            start_time = time.time()
+            store_events(batch, db_name)
+            timings['store'] = time.time() - start_time
+            start_time = time.time()
+            # The week before the new events, so both sides read the same rows
+            week = query_events(start_date=last_day - timedelta(days=7), end_date=last_day - timedelta(days=1), db_name=db_name)
+            timings['last week'] = time.time() - start_time
+            start_time = time.time()
+            page = query_events(limit=50, offset=0, db_name=db_name)
+            timings['first page'] = time.time() - start_time
+            runs.append(timings)
+        return {operation: sorted(run[operation] for run in runs)[len(runs) // 2] for operation in runs[0]}, week, page
+
+    hot_timings, hot_week, hot_page = measure()
+    start_time = time.time()
+    moved = compact_events(8, db_name, now)
+    compaction_time = time.time() - start_time
+    cold_timings, cold_week, cold_page = measure()
+
+    print(f"\nCompaction report ({SYNTHETIC_ROWS} rows, {len(moved)} months and {sum(moved.values())} events archived "
+          f"in {compaction_time:.2f} s): all hot -> compacted")
+    for operation in hot_timings:
+        print(f"  {operation + ':':11} {hot_timings[operation] * 1000:8.1f} ms -> {cold_timings[operation] * 1000:8.1f} ms")
+
+    pd.testing.assert_frame_equal(cold_page, hot_page)
+    pd.testing.assert_frame_equal(cold_week, hot_week)
+    assert len(get_events(db_name)) == SYNTHETIC_ROWS + 10 * 200
+
+# Size and time report for the dimension tables
+@pytest.mark.report
+def test_dimension_tables_report(tmp_path):
+    """
+    Compare the events table storing Currency and Event names on every row with the dimension-table layout.
+
+    The names-per-row copy is built from the same rows, with the indexes the
+    table had before the dimension tables. The report covers the database
+    file size, reading one event type's history and loading every event.
+    The dimension layout must be smaller and return the same frames.
+    """
+    db_name = str(tmp_path / 'dimensions.db')
+    create_table(db_name)
+    store_events(synthetic_events(SYNTHETIC_ROWS), db_name)
+    conn = get_connection(db_name)
+    text_db = str(tmp_path / 'names.db')
+    conn.execute('VACUUM INTO ?', (text_db,))
+    text_conn = sqlite3.connect(text_db)
+    text_conn.executescript('''
+        CREATE TABLE events_names AS SELECT * FROM named_events;
+        DROP VIEW named_events;
+        DROP TABLE events;
+        ALTER TABLE events_names RENAME TO events;
+        CREATE UNIQUE INDEX idx_events_natural_key ON events (Date, IFNULL(Time, ''), IFNULL(Currency, ''), IFNULL(Event, ''));
+        CREATE INDEX idx_events_timestamp ON events (Timestamp);
+        CREATE INDEX idx_events_currency_timestamp ON events (Currency, Timestamp);
+        VACUUM;
+    ''')
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    name = 'Indicator 42'
+    text_history_time, text_history = median_time(lambda: to_compact_frame(pd.read_sql_query(
+        'SELECT * FROM events WHERE Event = ? ORDER BY Timestamp, rowid', text_conn, params=[name])))
+    history_time, history = median_time(lambda: query_events(event_names=[name], db_name=db_name))
+    text_load_time, text_all = median_time(lambda: to_compact_frame(pd.read_sql_query(
+        'SELECT * FROM events ORDER BY Timestamp, rowid', text_conn)))
+    load_time, everything = median_time(lambda: query_events(db_name=db_name))
+    text_size, size = os.path.getsize(text_db), os.path.getsize(db_name)
+    text_conn.close()
+
+    print(f"\nDimension tables report ({SYNTHETIC_ROWS} rows): names per row -> dimension ids")
+    print(f"  file size: {text_size / 1e6:8.1f} MB -> {size / 1e6:8.1f} MB ({size / text_size:.0%})")
+    print(f"  history:   {text_history_time * 1000:8.1f} ms -> {history_time * 1000:8.1f} ms ({len(history)} rows)")
+    print(f"  full load: {text_load_time * 1000:8.1f} ms -> {load_time * 1000:8.1f} ms")
+
+    pd.testing.assert_frame_equal(history, text_history)
+    pd.testing.assert_frame_equal(everything, text_all)
+    assert size < text_size
+
+# Time report for the change-detection feed of revised events
+@pytest.mark.report
+def test_revision_feed_report(tmp_path):
+    """
+    Measure a refresh that re-sends the last week of events with a few revisions, and compare a consumer
+    finding those revisions by reloading and diffing every event with reading the revisions log.
+
+    Both must find the same revised events.
+    """
+    db_name = str(tmp_path / 'revisions.db')
+    create_table(db_name)
+    events = synthetic_events(SYNTHETIC_ROWS)
+    store_events(events, db_name)
+    before = query_events(db_name=db_name)
+    version = get_data_version(db_name)
+    week = [dict(event) for event in events[-1400:]]
+    for event in week[::14]:
+        event['Actual'] = '1.0%'
+
+    start_time = time.time()
+    result = store_events(week, db_name)
+    refresh_time = time.time() - start_time
+    start_time = time.time()
+    store_events(week, db_name)
+    unchanged_time = time.time() - start_time
+
+    def reload_and_diff():
+        after = query_events(db_name=db_name)
+        changed = (after['Actual'].fillna('') != before['Actual'].fillna('')) | (after['Forecast'] != before['Forecast'])
+        return after.loc[changed, 'Event'].astype(str).tolist()
+
+    diff_time, diffed = median_time(reload_and_diff)
+    feed_time, feed = median_time(lambda: get_revisions_since(version, db_name)['Event'].astype(str).tolist())
+
+    print(f"\nRevision feed report ({SYNTHETIC_ROWS} rows, {len(week)} re-sent, {result['updated']} revised)")
+    print(f"  refresh with revisions: {refresh_time * 1000:8.1f} ms")
+    print(f"  refresh, no changes:    {unchanged_time * 1000:8.1f} ms")
+    print(f"  reload and diff:        {diff_time * 1000:8.1f} ms")
+    print(f"  revisions since N:      {feed_time * 1000:8.1f} ms")
+
+    assert result == {'inserted': 0, 'updated': 100}
+    assert sorted(feed) == sorted(diffed)
+
+# Time report for the full-text search
+@pytest.mark.report
+def test_search_report(tmp_path):
+    """
+    Compare finding the events of a keyword by loading every event and scanning the names in pandas
+    with the full-text search of query_events.
+
+    The search must return the same events.
+    """
+    db_name = str(tmp_path / 'search.db')
+    create_table(db_name)
+    store_events(synthetic_events(SYNTHETIC_ROWS), db_name)
+
+    def scan():
+        events = get_events(db_name)
+        matches = events[events['Event'].astype(str).str.contains(r'\bIndicator 42\b')]
+        return matches.sort_values('Timestamp', kind='stable', ignore_index=True)
+
+    scan_time, scanned = median_time(scan)
+    search_time, found = median_time(lambda: query_events(search='"Indicator 42"', db_name=db_name))
+    prefix_time, prefixed = median_time(lambda: query_events(search='Indicator 4*', db_name=db_name, limit=50))
+
+    print(f"\nSearch report ({SYNTHETIC_ROWS} rows, {len(found)} matches)")
+    print(f"  load and scan:   {scan_time * 1000:8.1f} ms")
+    print(f"  phrase search:   {search_time * 1000:8.1f} ms")
+    print(f"  prefix, 1 page:  {prefix_time * 1000:8.1f} ms")
+
+    pd.testing.assert_frame_equal(found, scanned, check_categorical=False)
+    assert len(prefixed) == 50
+
+# Throughput report for concurrent writers, with and without the ingest queue
+@pytest.mark.report
+def test_ingest_queue_report(tmp_path):
+    """
+    Compare many threads calling store_events directly with the same threads going through an IngestQueue.
+
+    The report covers the total time, the slowest single store and the
+    'database is locked' errors. Every event must be stored through the queue.
+    """
+    threads_count, submissions, batch_size = 16, 20, 50
+    events = synthetic_events(threads_count * submissions * batch_size)
+
+    def run(store, db_name):
+        slowest, locked = [0.0], [0]
+
+        def produce(worker):
+            for i in range(submissions):
+                start = (worker * submissions + i) * batch_size
+                start_time = time.time()
+                try:
+                    store(events[start:start + batch_size])
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    locked[0] += 1
+                slowest[0] = max(slowest[0], time.time() - start_time)
+
+        threads = [threading.Thread(target=produce, args=(worker,)) for worker in range(threads_count)]
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {'total': time.time() - start_time, 'slowest': slowest[0], 'locked': locked[0],
+                'rows': len(get_events(db_name))}
+
+    direct_db = str(tmp_path / 'direct.db')
+    create_table(direct_db)
+    direct = run(lambda batch: store_events(batch, direct_db), direct_db)
+
+    queued_db = str(tmp_path / 'queued.db')
+    create_table(queued_db)
+    ingest_queue = IngestQueue(queued_db).start()
+    queued = run(ingest_queue.store, queued_db)
+    ingest_queue.stop()
+    stats = ingest_queue.stats()
+
+    print(f"\nIngest report ({threads_count} threads x {submissions} stores of {batch_size} events): direct -> queued")
+    print(f"  total:        {direct['total']:8.2f} s -> {queued['total']:8.2f} s")
+    print(f"  slowest:      {direct['slowest'] * 1000:8.1f} ms -> {queued['slowest'] * 1000:8.1f} ms")
+    print(f"  locked:       {direct['locked']:8d}   -> {queued['locked']:8d}")
+    print(f"  transactions: {threads_count * submissions:8d}   -> {stats['transactions']:8d}")
+
+    assert queued['locked'] == 0
+    assert queued['rows'] == len(events)
+
+# Time report comparing the storage backends on history analytics
+@pytest.mark.report
+@pytest.mark.skipif(not DUCKDB_AVAILABLE, reason="duckdb is not installed.")
+def test_storage_backend_report(tmp_path):
+    """
+    Compare the SQLite and DuckDB backends on loading and querying synthetic history.
+
+    The report covers bulk loading, a full-history aggregate per currency and
+    volatility, a per-day aggregate over one year, a filtered scan over one
+    year and a full load. Both backends must return the same results.
+    """
+    events = synthetic_events(BACKEND_BENCHMARK_ROWS)
+    year_filters = {'start_date': date(2021, 1, 1), 'end_date': date(2021, 12, 31)}
+    scan_filters = dict(year_filters, currencies=['USD', 'EUR', 'JPY'], volatilities=['High'])
+    operations = {
+        'aggregate': lambda backend: backend.aggregate_events(),
+        'daily aggregate': lambda backend: backend.aggregate_events(group_by=['Day', 'Currency'], **year_filters),
+        'filtered scan': lambda backend: backend.query_events(**scan_filters),
+        'full load': lambda backend: backend.get_events(),
+    }
+    timings = {}
+    results = {}
+    for name, db_name in (('sqlite', 'history.db'), ('duckdb', 'history.duckdb')):
+        backend = get_backend(name, str(tmp_path / db_name))
+        start_time = time.time()
+        for offset in range(0, len(events), 100_000):
+            backend.store_events(events[offset:offset + 100_000])
+        timings[(name, 'store')] = time.time() - start_time
+        for operation, run in operations.items():
+            start_time = time.time()
+            results[(name, operation)] = run(backend)
+            timings[(name, operation)] = time.time() - start_time
+
+    print(f"\nStorage backend report ({BACKEND_BENCHMARK_ROWS} rows): sqlite -> duckdb")
+    for operation in ['store'] + list(operations):
+        print(f"  {operation + ':':17} {timings[('sqlite', operation)] * 1000:9.1f} ms -> {timings[('duckdb', operation)] * 1000:9.1f} ms")
+
+    for operation in ('aggregate', 'daily aggregate'):
+        assert results[('duckdb', operation)].values.tolist() == results[('sqlite', operation)].values.tolist()
+    assert len(results[('duckdb', 'filtered scan')]) == len(results[('sqlite', 'filtered scan')])
+    assert len(results[('duckdb', 'full load')]) == len(results[('sqlite', 'full load')]) == BACKEND_BENCHMARK_ROWS
+
+# Load time and memory report for the columnar snapshot
+@pytest.mark.report
+@pytest.mark.skipif(not PYARROW_AVAILABLE or platform.system() != "Linux",
+                    reason="Needs pyarrow and /proc/self/status.")
+def test_snapshot_load_report(tmp_path):
+    """
+    Compare loading every event through the sqlite3 cursor with loading the memory-mapped snapshot.
+
+    Each load runs in a fresh interpreter so its peak and final resident
+    memory can be measured. Every load must return every row.
+    """
+    db_name = str(tmp_path / 'snapshot.db')
+    create_table(db_name)
+    store_events(synthetic_events(SYNTHETIC_ROWS), db_name)
+    repo = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+    reports = {}
+    for loader in ('read_sql_query', 'query_events', 'snapshot'):
+        output = subprocess.run([sys.executable, '-c', LOAD_SCRIPT, loader, db_name, repo],
+                                capture_output=True, text=True, check=True).stdout
+        reports[loader] = json.loads(output.splitlines()[-1])
+
+    print(f"\nSnapshot load report ({SYNTHETIC_ROWS} rows)")
+    for loader, report in reports.items():
+        print(f"  {loader + ':':15} {report['seconds']:.3f} s, peak RSS +{report['peak_kb'] / 1024:.1f} MB, "
+              f"resident +{report['resident_kb'] / 1024:.1f} MB")
+
+    assert all(report['rows'] == SYNTHETIC_ROWS for report in reports.values())
+
+# Time and memory report for parsing a calendar page while it downloads
+@pytest.mark.report
+def test_stream_parse_report():
+    """
+    Compare buffering a large calendar response before decoding and parsing it with parsing it chunk by chunk.
+
+    The body is replayed in 64 KiB chunks, as a download would deliver it.
+    The report covers the time to the first event, the total time and the
+    peak of Python allocations. Both must return the same events, and the
+    stream must hold less memory at its peak than the BeautifulSoup tree. lxml
+    allocates outside the Python allocator, so its tree is not in its peak.
+    """
+    fixture = os.path.join(os.path.dirname(__file__), 'fixtures', 'calendar.html')
+    with open(fixture, encoding='utf-8') as f:
+        html = f.read() * 400
+    body = json.dumps({'data': html, 'rows_num': 2400, 'bind_scroll_handler': False}).replace('/', '\\/')
+    chunks = [body[start:start + 65536] for start in range(0, len(body), 65536)]
+
+    def buffered(parse):
+        def run():
+            payload = json.loads(''.join(chunks))
+            events = parse(payload['data'])
+            return events, None
+        return run
+
+    def streamed():
+        decoder, parser = PayloadStream(), EventStreamParser()
+        events, first = [], None
+        for chunk in chunks:
+            parser.feed(decoder.feed(chunk))
+            events.extend(parser.pop_events())
+            if first is None and events:
+                first = time.perf_counter()
+        parser.close()
+        decoder.close()
+        events.extend(parser.pop_events())
+        return events, first
+
+    def measure(run):
+        start_time = time.perf_counter()
+        events, first = run()
+        total = time.perf_counter() - start_time
+        # Allocations are traced in a second run, so tracing does not slow the timed one
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return events, (first or start_time + total) - start_time, total, peak
+
+    reports = {'buffered bs4': measure(buffered(parse_html_bs4)), 'buffered default': measure(buffered(parse_html)),
+               'streamed': measure(streamed)}
+
+    print(f"\nStream parse report ({len(body) / 1e6:.1f} MB body, {len(reports['streamed'][0])} events)")
+    for name, (events, first, total, peak) in reports.items():
+        print(f"  {name + ':':17} first row {first * 1000:8.1f} ms, total {total * 1000:8.1f} ms, "
+              f"peak {peak / 1e6:6.1f} MB")
+
+    streamed_events, first, total, peak = reports['streamed']
+    assert streamed_events == reports['buffered bs4'][0]
+    assert peak < reports['buffered bs4'][3]
+
 @pytest.mark.skipif(platform.system() != "Windows", reason="Email sending is only supported on Windows.")
 def test_send_email_performance(mocker):
     """
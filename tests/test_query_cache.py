@@ -0,0 +1,69 @@
+import pytest
+import data_storer
+from query_cache import cached_query_events, cached_distinct_values, data_fingerprint, QUERY_CACHE
+from data_storer import store_events, get_data_version
+
+TEST_EVENT = {
+    'Date': '12/25/23',
+    'Time': '08:30',
+    'Currency': 'USD',
+    'Volatility': 'High',
+    'Event': 'Test Event',
+    'Forecast': '123',
+    'Previous': '100'
+}
+
+@pytest.fixture
+def db_name(db_name):
+    """
+    Start every test with an empty query cache.
+    """
+    QUERY_CACHE.clear()
+    return db_name
+
+def test_cached_query_reuses_results(mocker, db_name):
+    """
+    Test that repeated queries with the same parameters are served from memory.
+    """
+    store_events([TEST_EVENT], db_name)
+    spy = mocker.spy(data_storer, 'query_events')
+
+    first = cached_query_events(db_name=db_name, currencies=['USD'])
+    second = cached_query_events(db_name=db_name, currencies=['USD'])
+    other = cached_query_events(db_name=db_name, currencies=['EUR'])
+
+    assert second is first
+    assert other.empty
+    assert spy.call_count == 2
+
+def test_store_events_invalidates_cached_results(db_name):
+    """
+    Test that a write bumps the data version so cached results are not reused.
+
+    This test performs the following checks:
+    1. A write that changes rows bumps the data version.
+    2. A write that changes nothing leaves the version untouched.
+    3. Queries after a write see the new rows.
+    """
+    assert cached_query_events(db_name=db_name).empty
+    assert cached_distinct_values('Currency', db_name=db_name) == []
+    version = get_data_version(db_name)
+
+    store_events([TEST_EVENT], db_name)
+    assert get_data_version(db_name) == version + 1
+    store_events([TEST_EVENT], db_name)
+    assert get_data_version(db_name) == version + 1
+
+    assert len(cached_query_events(db_name=db_name)) == 1
+    assert cached_distinct_values('Currency', db_name=db_name) == ['USD']
+
+def test_data_fingerprint_tracks_version_and_filters(db_name):
+    """
+    Test that the selection fingerprint changes with the filters and with every write.
+    """
+    fingerprint = data_fingerprint(db_name=db_name, currencies=['USD'])
+    assert data_fingerprint(db_name=db_name, currencies=['USD']) == fingerprint
+    assert data_fingerprint(db_name=db_name, currencies=['EUR']) != fingerprint
+
+    store_events([TEST_EVENT], db_name)
+    assert data_fingerprint(db_name=db_name, currencies=['USD']) != fingerprint
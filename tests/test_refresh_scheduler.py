@@ -0,0 +1,164 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import httpx
+import pytest
+import data_fetcher
+from data_storer import store_events, count_events
+from ingest_queue import get_ingest_queue
+from refresh_scheduler import RefreshScheduler, refresh_events
+from response_cache import ResponseCache
+
+# Sample calendar HTML used by the offline tests
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'calendar.html')
+with open(FIXTURE_PATH, encoding='utf-8') as fixture:
+    CALENDAR_HTML = fixture.read()
+
+def test_concurrent_refresh_requests_are_coalesced(db_name):
+    """
+    Test that refresh requests made while a refresh is running join it.
+
+    This test performs the following checks:
+    1. Several concurrent requests run the refresh function only once.
+    2. Every caller receives the same job and result.
+    3. A request after the job finished starts a new refresh.
+    """
+    release = threading.Event()
+    calls = []
+
+    def slow_refresh(name, max_age=None, cancel=None):
+        calls.append(name)
+        release.wait(5)
+        return {'inserted': 1, 'updated': 0}
+
+    scheduler = RefreshScheduler(db_name=db_name, refresh=slow_refresh)
+    jobs = [scheduler.refresh(wait=False) for _ in range(5)]
+    assert scheduler.status()['status'] == 'running'
+    release.set()
+    for job in jobs:
+        assert job.wait(5)
+
+    assert all(job is jobs[0] for job in jobs)
+    assert calls == [db_name]
+    assert jobs[0].result == {'inserted': 1, 'updated': 0}
+
+    scheduler.refresh(wait=True, timeout=5)
+    assert len(calls) == 2
+
+def test_refresh_status_records_runs_and_errors(db_name):
+    """
+    Test that the status reports the last run time, duration and errors.
+    """
+    def failing_refresh(name, max_age=None, cancel=None):
+        raise RuntimeError("upstream down")
+
+    scheduler = RefreshScheduler(db_name=db_name, refresh=failing_refresh)
+    assert scheduler.status()['status'] == 'never run'
+
+    job = scheduler.refresh(wait=True, timeout=5)
+    status = scheduler.status()
+
+    assert isinstance(job.error, RuntimeError)
+    assert status['status'] == 'error'
+    assert status['error'] == "upstream down"
+    assert status['last_run'] is not None
+    assert status['duration'] >= 0
+
+def test_next_interval_speeds_up_near_high_volatility_events(db_name):
+    """
+    Test that the refresh interval shortens as a high-volatility event approaches.
+    """
+    scheduler = RefreshScheduler(interval=900, fast_interval=60, lead_time=1800, release_window=900, db_name=db_name)
+    store_events([{
+        'Date': '12/25/23',
+        'Time': '08:30',
+        'Currency': 'USD',
+        'Volatility': 'High',
+        'Event': 'Test Event',
+        'Forecast': '123',
+        'Previous': '100'
+    }], db_name)
+    # 08:30 EST on 12/25/23
+    event_time = 1703511000
+
+    # Far from the event: the normal interval
+    assert scheduler.next_interval(now=event_time - 10000) == 900
+    # Slightly more than the lead time away: wake up when the fast window opens
+    assert scheduler.next_interval(now=event_time - 1800 - 300) == 300
+    # Inside the lead time and just after the release: the fast interval
+    assert scheduler.next_interval(now=event_time - 600) == 60
+    assert scheduler.next_interval(now=event_time + 600) == 60
+    # Well after the release window: back to the normal interval
+    assert scheduler.next_interval(now=event_time + 3600) == 900
+
+def test_scheduler_thread_runs_refresh(db_name):
+    """
+    Test that the background thread runs a refresh after start and stops cleanly.
+    """
+    ran = threading.Event()
+
+    def refresh(name, max_age=None, cancel=None):
+        ran.set()
+        return {'inserted': 0, 'updated': 0}
+
+    scheduler = RefreshScheduler(interval=3600, db_name=db_name, refresh=refresh).start()
+    assert ran.wait(5)
+    scheduler.stop(timeout=5)
+    assert scheduler.status()['status'] == 'ok'
+
+def test_failed_store_is_retried_with_unchanged_body(db_name, mocker, tmp_path, monkeypatch):
+    """
+    Test that a page whose events failed to store is not skipped as unchanged by the next refresh.
+
+    This test performs the following checks:
+    1. The first refresh raises when the store fails.
+    2. The retry, with the same upstream body, stores the events.
+    3. A refresh after the successful store skips the unchanged body.
+    """
+    monkeypatch.setattr(data_fetcher, 'RESPONSE_CACHE', ResponseCache(str(tmp_path / 'http_cache')))
+    mocker.patch('httpx.AsyncClient.post', return_value=httpx.Response(200, json={'data': CALENDAR_HTML}))
+    queue = get_ingest_queue(db_name)
+    store = queue.store
+    mocker.patch.object(queue, 'store', side_effect=RuntimeError("disk full"))
+
+    with pytest.raises(RuntimeError):
+        refresh_events(db_name)
+    assert count_events(db_name=db_name) == 0
+
+    mocker.patch.object(queue, 'store', side_effect=store)
+    assert refresh_events(db_name)['inserted'] == 6
+    assert count_events(db_name=db_name) == 6
+    assert refresh_events(db_name) == {'inserted': 0, 'updated': 0}
+
+def test_fast_window_refresh_bypasses_response_cache(db_name, mocker, tmp_path, monkeypatch):
+    """
+    Test that refreshes close to a high-volatility release go to the network instead of the response cache.
+
+    This test performs the following checks:
+    1. Outside the fast window a second refresh is served from the response cache.
+    2. Once a high-volatility event is inside the lead time, the scheduler's refresh requests every tab again.
+    """
+    monkeypatch.setattr(data_fetcher, 'RESPONSE_CACHE', ResponseCache(str(tmp_path / 'http_cache')))
+    mock_post = mocker.patch('httpx.AsyncClient.post', return_value=httpx.Response(200, json={'data': CALENDAR_HTML}))
+    scheduler = RefreshScheduler(lead_time=1800, db_name=db_name, refresh=refresh_events)
+
+    scheduler.refresh(wait=True, timeout=5)
+    scheduler.refresh(wait=True, timeout=5)
+    assert mock_post.call_count == 2
+
+    release = datetime.now(ZoneInfo('America/New_York')) + timedelta(minutes=10)
+    store_events([{
+        'Date': release.strftime('%m/%d/%y'),
+        'Time': release.strftime('%H:%M'),
+        'Currency': 'USD',
+        'Volatility': 'High',
+        'Event': 'Nonfarm Payrolls',
+        'Forecast': '180K',
+        'Previous': '175K'
+    }], db_name)
+    assert scheduler.in_fast_window()
+
+    scheduler.refresh(wait=True, timeout=5)
+    assert scheduler.status()['status'] == 'ok'
+    assert mock_post.call_count == 4
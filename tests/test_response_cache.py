@@ -0,0 +1,81 @@
+import os
+import time
+from response_cache import ResponseCache
+
+URL = "https://example.com/calendar"
+
+def test_cache_key_depends_on_url_and_payload():
+    """
+    Test that the cache key is stable for equal requests and differs for different payloads.
+    """
+    key = ResponseCache.key(URL, {'currentTab': 'thisWeek', 'country[]': ['1', '2']})
+    assert key == ResponseCache.key(URL, {'country[]': ['1', '2'], 'currentTab': 'thisWeek'})
+    assert key != ResponseCache.key(URL, {'currentTab': 'nextWeek', 'country[]': ['1', '2']})
+    assert key != ResponseCache.key(URL + "?x", {'currentTab': 'thisWeek', 'country[]': ['1', '2']})
+
+def test_cache_hit_miss_and_ttl(tmp_path):
+    """
+    Test that entries are served while fresh and counted as misses once expired.
+    """
+    cache = ResponseCache(str(tmp_path))
+    key = cache.key(URL, {'currentTab': 'thisWeek'})
+
+    assert cache.get(key, ttl=60) is None
+    cache.put(key, {'data': '<tr></tr>'})
+    assert cache.get(key, ttl=60) == {'data': '<tr></tr>'}
+
+    # Age the entry beyond the TTL
+    time.sleep(0.01)
+    assert cache.get(key, ttl=0) is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'skips': 0, 'evictions': 0}
+
+def test_cache_directory_is_created_on_first_put(tmp_path):
+    """
+    Test that creating and reading a cache leaves the file system alone until a response is stored.
+    """
+    directory = str(tmp_path / 'http_cache')
+    cache = ResponseCache(directory)
+    key = cache.key(URL, {'currentTab': 'thisWeek'})
+
+    assert cache.get(key, ttl=60) is None
+    cache.clear()
+    assert not os.path.exists(directory)
+
+    cache.put(key, {'data': '<tr></tr>'})
+    assert os.path.isdir(directory)
+    assert cache.get(key, ttl=60) == {'data': '<tr></tr>'}
+
+def test_cache_per_tab_ttl(tmp_path):
+    """
+    Test that the TTL is chosen from the payload's currentTab.
+    """
+    cache = ResponseCache(str(tmp_path), tab_ttls={'thisWeek': 10}, default_ttl=99)
+    assert cache.ttl_for({'currentTab': 'thisWeek'}) == 10
+    assert cache.ttl_for({'currentTab': 'custom'}) == 99
+
+def test_cache_lru_eviction(tmp_path):
+    """
+    Test that the least recently used entry is evicted when the cache is full.
+    """
+    cache = ResponseCache(str(tmp_path), max_entries=2)
+    cache.put('a', {'data': 'a'})
+    cache.put('b', {'data': 'b'})
+    # Make 'a' older than 'b', then read it so it becomes the most recently used
+    os.utime(os.path.join(str(tmp_path), 'a.json'), (1, 1))
+    os.utime(os.path.join(str(tmp_path), 'b.json'), (2, 2))
+    assert cache.get('a', ttl=3600) == {'data': 'a'}
+    cache.put('c', {'data': 'c'})
+
+    assert sorted(os.listdir(str(tmp_path))) == ['a.json', 'c.json']
+    assert cache.stats()['evictions'] == 1
+
+def test_cache_unchanged_body_is_skipped(tmp_path):
+    """
+    Test that a body identical to the last processed one is reported as unchanged.
+    """
+    cache = ResponseCache(str(tmp_path))
+    assert not cache.is_unchanged('k', '<tr>1</tr>')
+    cache.mark_processed('k', '<tr>1</tr>')
+    assert cache.is_unchanged('k', '<tr>1</tr>')
+    assert not cache.is_unchanged('k', '<tr>2</tr>')
+    assert cache.stats()['skips'] == 1
@@ -0,0 +1,153 @@
+import io
+from datetime import date
+import pytest
+import storage_backends
+from helpers import make_event, EVENTS
+from event_snapshots import PYARROW_AVAILABLE
+from query_cache import cached_query_events, cached_count_events, cached_date_bounds, cached_distinct_values
+from storage_backends import get_backend, register_backend, shared_backend, STORAGE_BACKENDS, DUCKDB_AVAILABLE, SQLiteBackend
+
+if PYARROW_AVAILABLE:
+    import pyarrow.ipc as ipc
+
+BACKENDS = ['sqlite', pytest.param('duckdb', marks=pytest.mark.skipif(not DUCKDB_AVAILABLE, reason="duckdb is not installed."))]
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path):
+    """
+    Create each available backend on an empty database file.
+    """
+    extension = 'db' if request.param == 'sqlite' else 'duckdb'
+    return get_backend(request.param, str(tmp_path / f'backend.{extension}'))
+
+def test_store_events_upserts(backend):
+    """
+    Test that every backend reports inserts and updates the same way.
+    """
+    assert backend.store_events(EVENTS) == {'inserted': 7, 'updated': 0}
+    assert backend.store_events(EVENTS) == {'inserted': 0, 'updated': 0}
+
+    revised = [make_event('12/29/23', '08:30', 'USD', 'High', 'Payrolls', forecast='2'),
+               make_event('01/04/24', '08:30', 'USD', 'High', 'New Event')]
+    assert backend.store_events(revised) == {'inserted': 1, 'updated': 1}
+
+    events = backend.get_events()
+    assert len(events) == 8
+    assert events.loc[events['Event'] == 'Payrolls', 'Forecast'].tolist() == ['2']
+
+def test_queries_match_across_backends(backend, tmp_path):
+    """
+    Test that filters, paging and aggregates return the same results as the SQLite backend.
+    """
+    reference = SQLiteBackend(str(tmp_path / 'reference.db'))
+    reference.create_table()
+    reference.store_events(EVENTS)
+    backend.store_events(EVENTS)
+
+    for filters in [
+        {},
+        {'currencies': ['USD']},
+        {'volatilities': ['Low', None]},
+        {'start_date': date(2023, 12, 31), 'end_date': date(2024, 1, 2)},
+    ]:
+        expected = reference.query_events(**filters)
+        actual = backend.query_events(**filters)
+        assert actual.astype(str).values.tolist() == expected.astype(str).values.tolist(), filters
+        assert backend.count_events(**filters) == len(expected), filters
+        for group_by in (['Currency', 'Volatility'], ['Day']):
+            expected_counts = reference.aggregate_events(group_by=group_by, **filters)
+            actual_counts = backend.aggregate_events(group_by=group_by, **filters)
+            assert actual_counts.values.tolist() == expected_counts.values.tolist(), (filters, group_by)
+
+    page = backend.query_events(columns=['Event'], order_by='Timestamp', descending=True, limit=2, offset=1)
+    assert page['Event'].tolist() == reference.query_events(columns=['Event'], order_by='Timestamp', descending=True, limit=2, offset=1)['Event'].tolist()
+
+    for search in ['Payrolls', 'rate OR housing', 'Late*', '"Rate Decision"', 'Currency:EUR', 'Currency:USD NOT Payrolls', 'Missing']:
+        expected = reference.query_events(search=search)
+        actual = backend.query_events(search=search)
+        assert actual.astype(str).values.tolist() == expected.astype(str).values.tolist(), search
+        assert backend.count_events(search=search, currencies=['USD']) == reference.count_events(search=search, currencies=['USD'])
+
+    for column in ('Currency', 'Volatility', 'Event'):
+        assert backend.distinct_values(column) == reference.distinct_values(column), column
+        assert (backend.distinct_values(column, date(2024, 1, 2), date(2024, 1, 3))
+                == reference.distinct_values(column, date(2024, 1, 2), date(2024, 1, 3))), column
+    assert backend.date_bounds() == reference.date_bounds()
+    assert backend.next_event_timestamp(0, ['High']) == reference.next_event_timestamp(0, ['High'])
+    assert len(backend.load_events()) == len(EVENTS)
+
+def test_search_rejects_invalid_queries(backend):
+    """
+    Test that every backend reports an invalid search query as ValueError.
+    """
+    backend.store_events(EVENTS)
+    with pytest.raises(ValueError, match="Invalid search query"):
+        backend.query_events(search='"unbalanced')
+
+def test_data_version_tracks_changing_writes(backend):
+    """
+    Test that the data version only moves when a write changes rows.
+    """
+    version = backend.data_version()
+    backend.store_events(EVENTS)
+    assert backend.data_version() == version + 1
+    backend.store_events(EVENTS)
+    assert backend.data_version() == version + 1
+
+@pytest.mark.skipif(not DUCKDB_AVAILABLE, reason="duckdb is not installed.")
+def test_dashboard_reads_the_selected_backend(tmp_path, monkeypatch):
+    """
+    Test that the cached dashboard queries read the backend chosen by STORAGE_BACKEND.
+
+    This test performs the following checks:
+    1. Events written to the DuckDB backend are returned by the cached queries.
+    2. A later write to the backend is visible without clearing the cache.
+    """
+    monkeypatch.setattr(storage_backends, 'DEFAULT_BACKEND', 'duckdb')
+    db_name = str(tmp_path / 'history.duckdb')
+    storage = shared_backend(db_name=db_name)
+    assert storage.name == 'duckdb'
+    storage.store_events(EVENTS[:2])
+
+    assert len(cached_query_events(db_name=db_name)) == 2
+    assert cached_count_events(db_name=db_name, search='Payrolls') == 1
+    assert cached_date_bounds(db_name=db_name) == (date(2023, 12, 29), date(2023, 12, 30))
+
+    storage.store_events(EVENTS[2:])
+    assert len(cached_query_events(db_name=db_name)) == len(EVENTS)
+    assert cached_distinct_values('Currency', db_name=db_name) == [None, 'EUR', 'JPY', 'USD']
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow is not installed.")
+@pytest.mark.parametrize('fmt', ['arrow', 'csv'])
+def test_exports_match_across_backends(backend, tmp_path, fmt):
+    """
+    Test that every backend exports the events with the same schema and rows.
+    """
+    reference = SQLiteBackend(str(tmp_path / 'reference.db'))
+    reference.create_table()
+    reference.store_events(EVENTS)
+    backend.store_events(EVENTS)
+
+    expected, actual = io.BytesIO(), io.BytesIO()
+    reference.export_events(expected, fmt)
+    backend.export_events(actual, fmt)
+    if fmt == 'csv':
+        assert actual.getvalue() == expected.getvalue()
+    else:
+        expected_table = ipc.open_stream(expected.getvalue()).read_all()
+        actual_table = ipc.open_stream(actual.getvalue()).read_all()
+        assert actual_table.schema == expected_table.schema
+        assert actual_table.to_pylist() == expected_table.to_pylist()
+
+def test_get_backend_rejects_unknown_names(tmp_path):
+    """
+    Test that unknown backends raise ValueError and registered ones can be selected.
+    """
+    with pytest.raises(ValueError, match="Unknown storage backend"):
+        get_backend('missing')
+
+    register_backend('custom', SQLiteBackend)
+    try:
+        assert isinstance(get_backend('custom', str(tmp_path / 'custom.db')), SQLiteBackend)
+    finally:
+        del STORAGE_BACKENDS['custom']